@@ -0,0 +1,322 @@
+"""
+Local stand-in for the Flickr REST API (flickr.photos.search / flickr.photos.getInfo)
+and the static image CDN, for benchmarks that must not touch the real service.
+
+Photos are generated deterministically per tile of `cell_deg` degrees: the number of
+photos of a tile follows an exponential distribution around `density` (a few hot
+tiles go past the 4,000-result search limit), and every photo has a position, a taken
+date and an upload date, so bbox, taken-date and upload-date filters behave like the
+real API. Responses are JSONP (`jsonFlickrApi({...})`).
+
+    python benchmarks/mock_flickr.py --port 8080 --density 50 --latency-ms 80
+
+then point the CLI at it with FLICKR_API_URL=http://127.0.0.1:8080/services/rest/
+and FLICKR_CDN_URL=http://127.0.0.1:8080. GET /__stats returns the request counters.
+"""
+from __future__ import annotations
+import argparse
+import datetime
+import functools
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+DATE_FMT = "%Y-%m-%d %H:%M:%S"
+SEARCH_LIMIT = 4000             # results reachable through pagination
+MAX_PER_TILE = (1 << 20) - 1    # photo index bits of the photo id
+OFFSET = 1 << 20                # tile coordinates are shifted to stay positive in the id
+IMAGE_PATH = re.compile(r"^/(\d+)/(\d+)_([a-z0-9]+)(?:_([a-z]))?\.(\w+)$")    # any size suffix
+URL_SIZES = {"z": 640, "c": 800, "b": 1024, "h": 1600, "k": 2048}    # url_* extras served (4:3 photos)
+ORIGINAL_SIDE = 4000
+
+
+@dataclass
+class MockConfig:
+    cell_deg: float = 0.01          # tile size; use the grid cell size for per-cell densities
+    density: float = 50.0           # mean photos per tile
+    max_per_tile: int = 20000
+    start_year: int = 2015
+    end_year: int = 2024
+    latency_ms: float = 0.0         # added to every API response (plus up to 50% jitter)
+    cdn_latency_ms: float = 0.0
+    image_kb: int = 200
+    error_rate: float = 0.0         # share of API calls answered with HTTP 500/502/503
+    flickr_error_rate: float = 0.0  # share answered with `stat: fail`, code 105
+    rate_limit: float = 0.0         # API calls per second before HTTP 429 (0 = unlimited)
+    seed: int = 1
+
+
+@dataclass(frozen=True, slots=True)
+class Photo:
+    id: str
+    lon: float
+    lat: float
+    taken: int
+    upload: int
+
+
+class PhotoField:
+    """Deterministic photos of every tile, generated on first use and cached."""
+
+    def __init__(self, cfg: MockConfig) -> None:
+        self.cfg = cfg
+        self.t0 = int(datetime.datetime(cfg.start_year, 1, 1, tzinfo=datetime.UTC).timestamp())
+        self.t1 = int(datetime.datetime(cfg.end_year, 12, 31, 23, 59, 59, tzinfo=datetime.UTC).timestamp())
+        self.tile = functools.lru_cache(maxsize=8192)(self._tile)
+
+    def _tile(self, i: int, j: int) -> tuple[Photo, ...]:
+        rng = random.Random(f"{self.cfg.seed}:{i}:{j}")
+        n = min(int(rng.expovariate(1 / self.cfg.density)) if self.cfg.density else 0,
+                self.cfg.max_per_tile, MAX_PER_TILE)
+        base = (((i + OFFSET) << 21) | (j + OFFSET)) << 20
+        size = self.cfg.cell_deg
+        photos = []
+        for k in range(n):
+            taken = rng.randint(self.t0, self.t1)
+            photos.append(Photo(str(base | k), (i + rng.random()) * size, (j + rng.random()) * size,
+                                taken, taken + rng.randint(0, 30 * 86400)))
+        photos.sort(key=lambda p: p.upload, reverse=True)     # Flickr's default: date-posted-desc
+        return tuple(photos)
+
+    def search(self, bbox: tuple[float, float, float, float], min_taken: int, max_taken: int,
+               min_upload: int) -> list[Photo]:
+        x1, y1, x2, y2 = bbox
+        size = self.cfg.cell_deg
+        hits = [
+            p
+            for i in range(math.floor(x1 / size), math.ceil(x2 / size))
+            for j in range(math.floor(y1 / size), math.ceil(y2 / size))
+            for p in self.tile(i, j)
+            if x1 <= p.lon < x2 and y1 <= p.lat < y2 and min_taken <= p.taken <= max_taken
+            and p.upload >= min_upload
+        ]
+        hits.sort(key=lambda p: p.upload, reverse=True)
+        return hits
+
+    def photo(self, photo_id: str) -> Photo | None:
+        value = int(photo_id)
+        j = ((value >> 20) & ((1 << 21) - 1)) - OFFSET
+        i = (value >> 41) - OFFSET
+        return next((p for p in self.tile(i, j) if p.id == photo_id), None)
+
+
+def _date(value: str | None, default: int) -> int:
+    if not value:
+        return default
+    if value.isdigit():
+        return int(value)
+    return int(datetime.datetime.strptime(value, DATE_FMT).replace(tzinfo=datetime.UTC).timestamp())
+
+
+def _taken_str(ts: int) -> str:
+    return datetime.datetime.fromtimestamp(ts, datetime.UTC).strftime(DATE_FMT)
+
+
+class MockFlickr:
+    """State shared by the request handlers: photo field, counters and the rate limiter."""
+
+    def __init__(self, cfg: MockConfig) -> None:
+        self.cfg = cfg
+        self.field = PhotoField(cfg)
+        self.blob = random.Random(cfg.seed).randbytes(cfg.image_kb * 1024)
+        self.lock = threading.Lock()
+        self.stats = {"search": 0, "getInfo": 0, "cdn": 0, "cdn_bytes": 0,
+                      "http_errors": 0, "flickr_errors": 0, "rate_limited": 0}
+        self._window = time.monotonic()
+        self._calls = 0
+
+    def count(self, key: str, n: int = 1) -> None:
+        with self.lock:
+            self.stats[key] += n
+
+    def rate_limited(self) -> bool:
+        if not self.cfg.rate_limit:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            if now - self._window >= 1.0:
+                self._window, self._calls = now, 0
+            self._calls += 1
+            return self._calls > self.cfg.rate_limit
+
+    def image(self, photo_id: str) -> bytes:
+        # Unique bytes per photo, so content hashes differ
+        return photo_id.encode().ljust(32, b"\0") + self.blob
+
+    # ---------- API payloads ----------
+    def search_payload(self, q: dict[str, str], cdn: str) -> dict:
+        bbox = tuple(float(v) for v in q["bbox"].split(","))
+        hits = self.field.search(bbox, _date(q.get("min_taken_date"), 0), _date(q.get("max_taken_date"), 1 << 62),
+                                 _date(q.get("min_upload_date"), 0))
+        per_page = min(int(q.get("per_page", 100)), 500)
+        page = int(q.get("page", 1))
+        pages = math.ceil(min(len(hits), SEARCH_LIMIT) / per_page)
+        chunk = hits[(page - 1) * per_page: page * per_page] if page <= pages else []
+        extras = set(q.get("extras", "").split(","))
+        return {"photos": {"page": page, "pages": pages, "perpage": per_page, "total": len(hits),
+                           "photo": [self._search_record(p, extras, cdn) for p in chunk]},
+                "stat": "ok"}
+
+    @staticmethod
+    def _search_record(p: Photo, extras: set[str], cdn: str) -> dict:
+        record = {"id": p.id, "owner": f"{int(p.id) % 997}@N00", "secret": "abc123", "server": "65535",
+                  "farm": 66, "title": f"photo {p.id}", "ispublic": 1, "isfriend": 0, "isfamily": 0}
+        if "description" in extras:
+            record["description"] = {"_content": ""}
+        if "date_upload" in extras:
+            record["dateupload"] = str(p.upload)
+        if "date_taken" in extras:
+            record.update(datetaken=_taken_str(p.taken), datetakengranularity=0, datetakenunknown="0")
+        if "owner_name" in extras:
+            record["ownername"] = f"user{int(p.id) % 997}"
+        if "original_format" in extras:
+            record.update(originalsecret="def456", originalformat="jpg")
+        if "geo" in extras:
+            record.update(latitude=f"{p.lat:.6f}", longitude=f"{p.lon:.6f}", accuracy="16", context=0)
+        if "tags" in extras:
+            record["tags"] = "benchmark mock"
+        if "views" in extras:
+            record["views"] = str(int(p.id) % 5000)
+        for size, side in URL_SIZES.items():
+            if f"url_{size}" in extras:
+                record.update({f"url_{size}": f"{cdn}/65535/{p.id}_abc123_{size}.jpg",
+                               f"width_{size}": side, f"height_{size}": side * 3 // 4})
+        if "o_dims" in extras:
+            record.update(o_width=ORIGINAL_SIDE, o_height=ORIGINAL_SIDE * 3 // 4)
+        return record
+
+    def info_payload(self, photo_id: str) -> dict:
+        p = self.field.photo(photo_id)
+        if p is None:
+            return {"stat": "fail", "code": 1, "message": "Photo not found"}
+        return {"photo": {
+            "id": p.id, "secret": "abc123", "server": "65535", "farm": 66, "originalformat": "jpg",
+            "owner": {"nsid": f"{int(p.id) % 997}@N00", "username": f"user{int(p.id) % 997}"},
+            "title": {"_content": f"photo {p.id}"}, "description": {"_content": ""},
+            "dates": {"posted": str(p.upload), "taken": _taken_str(p.taken)},
+            "views": str(int(p.id) % 5000), "comments": {"_content": "0"},
+            "tags": {"tag": [{"_content": "benchmark"}, {"_content": "mock"}]},
+            "location": {"latitude": f"{p.lat:.6f}", "longitude": f"{p.lon:.6f}", "accuracy": "16",
+                         "context": "0", "locality": {"_content": "Mockville"},
+                         "country": {"_content": "Mockland"}},
+        }, "stat": "ok"}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    mock: MockFlickr
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: dict[str, str] | None = None,
+              head: bool = False) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _jsonp(self, data: dict) -> None:
+        self._send(200, f"jsonFlickrApi({json.dumps(data)})".encode(), "text/javascript")
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path == "/__stats":
+            with self.mock.lock:
+                self._send(200, json.dumps(self.mock.stats).encode(), "application/json")
+        elif url.path.rstrip("/").endswith("/services/rest"):
+            self._api({k: v[-1] for k, v in parse_qs(url.query).items()})
+        else:
+            self._image(url.path)
+
+    def do_HEAD(self) -> None:
+        self._image(urlsplit(self.path).path, head=True)
+
+    def _api(self, q: dict[str, str]) -> None:
+        mock, cfg = self.mock, self.mock.cfg
+        if cfg.latency_ms:
+            time.sleep(cfg.latency_ms / 1000 * (1 + random.random() / 2))
+        if mock.rate_limited():
+            mock.count("rate_limited")
+            return self._send(429, b"Too Many Requests", "text/plain", {"Retry-After": "1"})
+        if random.random() < cfg.error_rate:
+            mock.count("http_errors")
+            return self._send(random.choice((500, 502, 503)), b"error", "text/plain")
+        if random.random() < cfg.flickr_error_rate:
+            mock.count("flickr_errors")
+            return self._jsonp({"stat": "fail", "code": 105, "message": "Service currently unavailable"})
+
+        method = q.get("method")
+        if method == "flickr.photos.search":
+            mock.count("search")
+            host = self.headers.get("Host", "127.0.0.1")
+            self._jsonp(mock.search_payload(q, f"http://{host}"))
+        elif method == "flickr.photos.getInfo":
+            mock.count("getInfo")
+            self._jsonp(mock.info_payload(q.get("photo_id", "0")))
+        else:
+            self._jsonp({"stat": "fail", "code": 112, "message": f"Method \"{method}\" not found"})
+
+    def _image(self, path: str, head: bool = False) -> None:
+        match = IMAGE_PATH.match(path)
+        if not match:
+            return self._send(404, b"not found", "text/plain", head=head)
+        if self.mock.cfg.cdn_latency_ms and not head:
+            time.sleep(self.mock.cfg.cdn_latency_ms / 1000)
+        body = self.mock.image(match.group(2))
+        total = len(body)
+
+        start = 0
+        rng = re.match(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if rng and not head:
+            start = int(rng.group(1))
+            if start >= total:
+                return self._send(416, b"", "image/jpeg", {"Content-Range": f"bytes */{total}"})
+            body = body[start:]
+        if not head:
+            self.mock.count("cdn")
+            self.mock.count("cdn_bytes", len(body))
+        headers = {"Content-Range": f"bytes {start}-{total - 1}/{total}"} if start else None
+        self._send(206 if start else 200, body, "image/jpeg", headers, head=head)
+
+
+def serve(cfg: MockConfig, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Starts the server in a daemon thread; `server.server_port` gives the bound port."""
+    handler = type("MockHandler", (Handler,), {"mock": MockFlickr(cfg)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-flickr", daemon=True).start()
+    return server
+
+
+def parse_args(argv: list[str] | None = None) -> tuple[MockConfig, str, int]:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    defaults = MockConfig()
+    for name, value in vars(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    args = vars(parser.parse_args(argv))
+    host, port = args.pop("host"), args.pop("port")
+    return MockConfig(**args), host, port
+
+
+if __name__ == "__main__":
+    config, host, port = parse_args()
+    server = serve(config, host, port)
+    print(f"Mock Flickr on http://{host}:{server.server_port}/services/rest/ "
+          f"(CDN http://{host}:{server.server_port})", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
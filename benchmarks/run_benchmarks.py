@@ -0,0 +1,190 @@
+"""
+Runs both CLI stages (download-grid, download-images) against the mock Flickr server
+for synthetic square zones of increasing size and reports, per stage:
+wall time, API requests/s, images/s, CDN MB/s, peak RSS and the time of a rerun over
+the finished state (what a resume pays to load and skip its checkpoints).
+
+    python benchmarks/run_benchmarks.py --cells 100,1000,10000 --concurrency 8 --workers 8
+
+Every stage runs in its own process, as the real CLI does, so peak RSS is the one of
+the stage. Zones are named bench_<cells> and removed afterwards unless --keep is given.
+"""
+from __future__ import annotations
+import argparse
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import time
+import urllib.request
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+
+from mock_flickr import MockConfig, serve
+
+ROOT = Path(__file__).resolve().parent.parent
+INPUT_DIR = ROOT / "input"
+OUTPUT_DIR = ROOT / "output"
+CLI = [sys.executable, "-c", "from flickr_grid_downloader.cli import app; app()"]
+
+console = Console()
+
+
+@dataclass
+class StageResult:
+    cells: int
+    stage: str
+    seconds: float
+    requests: int
+    images: int
+    mb: float
+    peak_rss_mb: float
+    resume_seconds: float
+    exit_code: int
+
+    @property
+    def requests_per_s(self) -> float:
+        return self.requests / self.seconds if self.seconds else 0.0
+
+    @property
+    def images_per_s(self) -> float:
+        return self.images / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.mb / self.seconds if self.seconds else 0.0
+
+
+def write_zone(zone: str, cells: int, cell_deg: float, input_dir: Path = INPUT_DIR) -> Path:
+    """Square grid of `cells` cells of `cell_deg` degrees, in the default column layout."""
+    side = math.ceil(math.sqrt(cells))
+    path = input_dir / f"{zone}_coordinates.csv"
+    with path.open("w") as f:
+        f.write("id,xx,yx,c,d,xy,yy\n")
+        for n in range(cells):
+            i, j = divmod(n, side)
+            x1, y1 = round(i * cell_deg, 6), round(j * cell_deg, 6)
+            f.write(f"{n + 1},{x1},{y1},,,{round(x1 + cell_deg, 6)},{round(y1 + cell_deg, 6)}\n")
+    return path
+
+
+def clean_zone(zone: str) -> None:
+    (INPUT_DIR / f"{zone}_coordinates.csv").unlink(missing_ok=True)
+    shutil.rmtree(OUTPUT_DIR / zone, ignore_errors=True)
+
+
+def mock_stats(url: str) -> dict[str, int]:
+    with urllib.request.urlopen(f"{url}/__stats") as r:
+        return json.load(r)
+
+
+def run_stage(args: list[str], env: dict[str, str], log_path: Path) -> tuple[float, float, int]:
+    """Runs one CLI command; returns (seconds, peak RSS in MB, exit code)."""
+    start = time.perf_counter()
+    with log_path.open("a") as log:
+        proc = subprocess.Popen(CLI + args, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in KB on Linux
+    return time.perf_counter() - start, usage.ru_maxrss / 1024, proc.returncode
+
+
+def bench_stage(cells: int, stage: str, args: list[str], env: dict[str, str], url: str,
+                log_path: Path) -> StageResult:
+    before = mock_stats(url)
+    seconds, rss, code = run_stage(args, env, log_path)
+    after = mock_stats(url)
+    resume, _, _ = run_stage(args, env, log_path)
+    delta = {key: after[key] - before[key] for key in after}
+    return StageResult(
+        cells=cells, stage=stage, seconds=seconds,
+        requests=delta["search"] + delta["getInfo"],
+        images=delta["cdn"], mb=delta["cdn_bytes"] / 1e6,
+        peak_rss_mb=rss, resume_seconds=resume, exit_code=code,
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cells", default="100,1000,10000,100000", help="Comma-separated zone sizes.")
+    parser.add_argument("--cell-deg", type=float, default=0.01, help="Side of a grid cell in degrees.")
+    parser.add_argument("--density", type=float, default=20, help="Mean photos per cell.")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--cdn-latency-ms", type=float, default=0)
+    parser.add_argument("--image-kb", type=int, default=64)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--flickr-error-rate", type=float, default=0)
+    parser.add_argument("--rate-limit", type=float, default=0, help="Mock API calls per second before HTTP 429.")
+    parser.add_argument("--concurrency", type=int, default=8, help="download-grid --concurrency.")
+    parser.add_argument("--workers", type=int, default=8, help="download-images --workers.")
+    parser.add_argument("--state", default="csv", choices=("csv", "sqlite"))
+    parser.add_argument("--lean", action="store_true", help="Search with --lean (no getInfo calls).")
+    parser.add_argument("--max-images", type=int, default=200_000,
+                        help="Skip download-images when cells × density is above this.")
+    parser.add_argument("--json", type=Path, help="Also write the results to this JSON file.")
+    parser.add_argument("--keep", action="store_true", help="Keep the bench_* zones afterwards.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    mock = MockConfig(cell_deg=args.cell_deg, density=args.density, latency_ms=args.latency_ms,
+                      cdn_latency_ms=args.cdn_latency_ms, image_kb=args.image_kb, error_rate=args.error_rate,
+                      flickr_error_rate=args.flickr_error_rate, rate_limit=args.rate_limit)
+    server = serve(mock)
+    url = f"http://127.0.0.1:{server.server_port}"
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT / "src"), os.environ.get("PYTHONPATH")])),
+        "FLICKR_API_KEY": "bench", "FLICKR_API_SECRET": "bench",
+        "FLICKR_API_URL": f"{url}/services/rest/", "FLICKR_CDN_URL": url,
+        "REQUESTS_PER_HOUR": str(10 ** 9),
+    }
+    OUTPUT_DIR.mkdir(exist_ok=True)
+    log_path = OUTPUT_DIR / "benchmarks.log"
+    console.print(f"Mock Flickr on {url} — CLI output in {log_path}")
+
+    results: list[StageResult] = []
+    for cells in (int(n) for n in args.cells.split(",")):
+        zone = f"bench_{cells}"
+        clean_zone(zone)
+        write_zone(zone, cells, args.cell_deg)
+        common = ["--zone", zone, "--state", args.state]
+        try:
+            grid = ["download-grid", *common, "--concurrency", str(args.concurrency)]
+            results.append(bench_stage(cells, "grid", grid + (["--lean"] if args.lean else []),
+                                       env, url, log_path))
+            console.print(f"{zone}: download-grid done in {results[-1].seconds:.1f}s")
+            if cells * args.density > args.max_images:
+                console.print(f"{zone}: download-images skipped (--max-images)")
+                continue
+            images = ["download-images", *common, "--workers", str(args.workers)]
+            results.append(bench_stage(cells, "images", images, env, url, log_path))
+            console.print(f"{zone}: download-images done in {results[-1].seconds:.1f}s")
+        finally:
+            if not args.keep:
+                clean_zone(zone)
+    server.shutdown()
+
+    table = Table(title="Benchmarks (mock Flickr)")
+    for column in ("Cells", "Stage", "Time s", "Req/s", "Img/s", "MB/s", "RSS MB", "Resume s", "Exit"):
+        table.add_column(column, justify="left" if column == "Stage" else "right")
+    for r in results:
+        table.add_row(f"{r.cells:,}", r.stage, f"{r.seconds:.2f}", f"{r.requests_per_s:.0f}",
+                      f"{r.images_per_s:.0f}", f"{r.mb_per_s:.1f}", f"{r.peak_rss_mb:.0f}",
+                      f"{r.resume_seconds:.2f}", str(r.exit_code))
+    console.print(table)
+
+    if args.json:
+        args.json.write_text(json.dumps(
+            [{**asdict(r), "requests_per_s": r.requests_per_s, "images_per_s": r.images_per_s,
+              "mb_per_s": r.mb_per_s} for r in results], indent=2))
+
+
+if __name__ == "__main__":
+    main()
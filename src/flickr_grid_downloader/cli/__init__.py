@@ -1,5 +1,22 @@
 import typer
+from pathlib import Path
 from flickr_grid_downloader import config
+from flickr_grid_downloader.console import ProgressBoard, console, progress, use_plain_logs
+from flickr_grid_downloader.constants import (
+    FLICKR_REQUESTS_PER_HOUR, CACHE_DIR, KEY_USAGE_FILE, CONTENT_INDEX_FILE, API_REST_URL, CDN_URL
+)
+from flickr_grid_downloader.utils.cell_plan import ORDERS, CellPlan
+from flickr_grid_downloader.utils.content_index import ContentIndex
+from flickr_grid_downloader.utils.dashboard import MetricsDashboard
+from flickr_grid_downloader.utils.flickr_client import FlickrClient
+from flickr_grid_downloader.utils.image_size import SizePolicy
+from flickr_grid_downloader.utils.key_pool import KeyPool
+from flickr_grid_downloader.utils.metrics import MetricsReporter
+from flickr_grid_downloader.utils.photo_info import INFO_ONLY_FIELDS, PHOTO_INFO_FIELDS
+from flickr_grid_downloader.utils.profiler import MODES as PROFILE_MODES, Profiler
+from flickr_grid_downloader.utils.rate_limiter import TokenBucket
+from flickr_grid_downloader.utils.response_cache import ResponseCache
+from flickr_grid_downloader.utils.trace import tracer
 
 def _require(name: str, value: str | None) -> str:
     """Ensure that a required value is provided."""
@@ -7,19 +24,185 @@ def _require(name: str, value: str | None) -> str:
         raise typer.BadParameter(f"{name} is required. Please set it via the environment variable {name} or pass it as an argument.")
     return value
 
+def build_client(ctx: typer.Context, workers: int = 1, limiter: TokenBucket | None = None) -> FlickrClient:
+    """
+    Create the FlickrClient shared by a command, rate limited to the configured hourly budget
+    (or by `limiter`, e.g. the budget shared by the workers of a work queue). The credentials
+    are only required here, so offline commands run without them.
+    """
+    opts = ctx.obj
+    api_key = _require(config.API_KEY_ENV, opts["api_key"])
+    api_secret = _require(config.API_SECRET_ENV, opts["api_secret"])
+    cache = None
+    if opts["cache"] or opts["cache_only"]:
+        cache = ResponseCache(
+            opts["cache_dir"],
+            ttl=opts["cache_ttl"] * 3600 if opts["cache_ttl"] else None,
+            max_bytes=opts["cache_max_mb"] * 1024 * 1024 if opts["cache_max_mb"] else None,
+            offline=opts["cache_only"],
+        )
+    keys = None
+    if opts["api_keys"]:
+        keys = KeyPool(opts["api_keys"], per_hour=opts["requests_per_hour"], state_path=KEY_USAGE_FILE)
+    return FlickrClient(
+        api_key=api_key,
+        api_secret=api_secret,
+        limiter=limiter or TokenBucket(api_rate(ctx)),
+        pool_size=max(10, workers),
+        cache=cache,
+        keys=keys,
+        api_url=opts["api_url"],
+    )
+
+def api_rate(ctx: typer.Context) -> float:
+    """API requests per second allowed by the configured budget (per key with a key pool)."""
+    return ctx.obj["requests_per_hour"] * (len(ctx.obj["api_keys"]) or 1) / 3600
+
+def build_post_processor(derivatives: str, fmt: str, quality: int, keep_exif: bool,
+                         drop_original: bool, workers: int):
+    """Create the image post-processing stage, or None when no derivative size is given."""
+    try:
+        sizes = tuple(int(size) for size in derivatives.replace(" ", "").split(",") if size)
+    except ValueError:
+        raise typer.BadParameter("--derivatives must be comma-separated sizes in pixels, e.g. '1024,256'")
+    if not sizes:
+        if drop_original:
+            raise typer.BadParameter("--drop-original needs --derivatives")
+        return None
+    try:
+        # Pillow is an optional dependency, only needed for derivatives
+        from flickr_grid_downloader.utils.image_processor import ImagePostProcessor, PostProcessSpec
+    except ImportError:
+        raise typer.BadParameter("--derivatives needs Pillow: pip install 'flickr-grid-downloader[images]'")
+    try:
+        spec = PostProcessSpec(sizes, fmt, quality, keep_exif, drop_original)
+    except ValueError as exc:
+        raise typer.BadParameter(str(exc))
+    return ImagePostProcessor(spec, workers or None)
+
+def build_size_policy(image_size: str) -> SizePolicy:
+    """Parse --image-size: a Flickr size letter or a maximum side in pixels."""
+    try:
+        return SizePolicy.parse(image_size)
+    except ValueError as exc:
+        raise typer.BadParameter(f"--image-size: {exc}")
+
+def build_info_fields(info_fields: str) -> list[str]:
+    """Parse --info-fields: comma-separated `photo_info` field names."""
+    fields = [f.strip() for f in info_fields.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in PHOTO_INFO_FIELDS]
+    if unknown:
+        raise typer.BadParameter(f"--info-fields: unknown field(s) {', '.join(unknown)}. "
+                                 f"Fields that need getInfo: {', '.join(sorted(INFO_ONLY_FIELDS))}")
+    return fields
+
+def build_grid(region: Path | None, bbox: str | None, cell_size: float):
+    """Generate the cells of a GeoJSON region or bbox, or None when neither is given."""
+    if region and bbox:
+        raise typer.BadParameter("give either --region or --bbox, not both")
+    if not region and not bbox:
+        return None
+    try:
+        # NumPy is an optional dependency, only needed to generate grids
+        from flickr_grid_downloader.tools.grid_generator import Grid, Region
+    except ImportError:
+        raise typer.BadParameter("grid generation needs NumPy: pip install 'flickr-grid-downloader[grid]'")
+    try:
+        area = Region.from_geojson(region) if region else Region.from_bbox(bbox)
+        return Grid(area, cell_size)
+    except (OSError, KeyError, ValueError) as exc:
+        raise typer.BadParameter(f"{'--region' if region else '--bbox'}: {exc}")
+
+def build_plan(cfg: config.JobConfig, order: str) -> CellPlan | None:
+    """Load the probed totals of the zone (`fgd plan`), or None when it was not planned."""
+    if order not in ORDERS:
+        raise typer.BadParameter(f"--order must be one of {', '.join(ORDERS)}")
+    plan = CellPlan.for_zone(cfg.csv_path, cfg.start_year, cfg.end_year)
+    if not len(plan):
+        if order != "file":
+            raise typer.BadParameter(f"--order {order} needs the totals of the cells: run `fgd plan` first")
+        return None
+    return plan
+
+def build_content_index(dedup: bool, phash: bool) -> ContentIndex | None:
+    """Open the content index shared by every zone, or None without --dedup."""
+    if phash and not dedup:
+        raise typer.BadParameter("--phash needs --dedup")
+    return ContentIndex(CONTENT_INDEX_FILE, phash=phash) if dedup else None
+
 app = typer.Typer(help="Flickr Grid Downloader CLI", add_completion=False)
 
 @app.callback()
 def common(
     ctx: typer.Context,
-    api_key: str = typer.Option(help="API key for Flickr. Can be set via the FLICKR_API_KEY environment variable or passed as an argument.", envvar=config.API_KEY_ENV),
-    api_secret: str = typer.Option(help="API secret for Flickr. Can be set via the FLICKR_API_SECRET environment variable or passed as an argument.", envvar=config.API_SECRET_ENV),
+    api_key: str | None = typer.Option(None, help="API key for Flickr. Can be set via the FLICKR_API_KEY environment variable or passed as an argument.", envvar=config.API_KEY_ENV),
+    api_secret: str | None = typer.Option(None, help="API secret for Flickr. Can be set via the FLICKR_API_SECRET environment variable or passed as an argument.", envvar=config.API_SECRET_ENV),
+    api_keys: str | None = typer.Option(None, envvar=config.API_KEYS_ENV, help="Pool of API keys as 'key:secret,key:secret'. Requests go to the key with the most hourly budget left."),
+    api_keys_file: Path | None = typer.Option(None, envvar=config.API_KEYS_FILE_ENV, help="File with one 'key:secret' pair per line, added to the pool."),
+    requests_per_hour: int = typer.Option(FLICKR_REQUESTS_PER_HOUR, min=1, envvar="REQUESTS_PER_HOUR", help="Flickr API budget shared by all workers (requests per hour, per key with a key pool)."),
+    cache: bool = typer.Option(False, envvar="FLICKR_CACHE", help="Cache API responses on disk and reuse them on later runs."),
+    cache_dir: Path = typer.Option(CACHE_DIR, envvar="FLICKR_CACHE_DIR", help="Directory of the response cache."),
+    cache_ttl: float = typer.Option(0, min=0, envvar="FLICKR_CACHE_TTL", help="Hours a cached response stays valid (0 = forever)."),
+    cache_max_mb: int = typer.Option(0, min=0, envvar="FLICKR_CACHE_MAX_MB", help="Size budget of the cache in MB; least recently used entries are evicted (0 = unlimited)."),
+    cache_only: bool = typer.Option(False, envvar="FLICKR_CACHE_ONLY", help="Offline replay: answer every API call from the cache and fail on misses."),
+    api_url: str = typer.Option(API_REST_URL, envvar=config.API_URL_ENV, help="Flickr REST endpoint (e.g. the mock server of benchmarks/)."),
+    cdn_url: str = typer.Option(CDN_URL, envvar=config.CDN_URL_ENV, help="Base URL of the image CDN."),
+    metrics_file: Path | None = typer.Option(None, envvar="FLICKR_METRICS_FILE", help="Write runtime metrics to this file every --metrics-interval seconds: Prometheus text format (e.g. for the node_exporter textfile collector), or a JSON snapshot when it ends in '.json'."),
+    metrics_interval: float = typer.Option(10, min=0.5, envvar="FLICKR_METRICS_INTERVAL", help="Seconds between two writes of --metrics-file."),
+    dashboard: bool = typer.Option(False, envvar="FLICKR_DASHBOARD", help="Show a live panel with progress, ETA, API latency, retries, throughput, queues and rate-limit waits."),
+    trace: Path | None = typer.Option(None, envvar="FLICKR_TRACE", help="Append one JSON line per API call, search page, image and file write to this file (see `fgd analyze-trace`)."),
+    profile: Path | None = typer.Option(None, envvar="FLICKR_PROFILE", help="Profile the command and write the result to this file."),
+    profile_mode: str = typer.Option("cprofile", envvar="FLICKR_PROFILE_MODE", help="'cprofile': pstats of the main thread (sequential mode); 'sample': folded stacks of every thread, sampled 100 times per second."),
+    progress_mode: str = typer.Option("auto", "--progress", envvar="FLICKR_PROGRESS", help="Progress display: 'live' status lines redrawn 4 times per second, 'plain' log lines every 10 s without colours (batch jobs, CI), 'off', or 'auto' (live on a terminal, plain otherwise)."),
 ):
 
+    try:
+        pool = KeyPool.parse(api_keys or "")
+        if api_keys_file:
+            pool += KeyPool.read_file(api_keys_file)
+    except (OSError, ValueError) as exc:
+        raise typer.BadParameter(f"{'--api-keys-file' if isinstance(exc, OSError) else 'API keys'}: {exc}")
+    if pool and not api_key:
+        api_key, api_secret = pool[0]
+
     ctx.obj = {
-        "api_key": _require(config.API_KEY_ENV, api_key),
-        "api_secret": _require(config.API_SECRET_ENV, api_secret),
+        "api_key": api_key,          # required by `build_client` only
+        "api_secret": api_secret,
+        "api_keys": pool,
+        "requests_per_hour": requests_per_hour,
+        "cache": cache,
+        "cache_dir": cache_dir,
+        "cache_ttl": cache_ttl,
+        "cache_max_mb": cache_max_mb,
+        "cache_only": cache_only,
+        "api_url": api_url,
+        "cdn_url": cdn_url.rstrip("/"),
     }
 
+    if progress_mode not in ProgressBoard.MODES:
+        raise typer.BadParameter(f"--progress must be one of {', '.join(ProgressBoard.MODES)}")
+    if progress_mode == "auto":
+        progress_mode = "live" if console.is_terminal else "plain"
+    if progress_mode == "plain":
+        use_plain_logs()
+
+    # Closed (final write / last redraw) when the command returns
+    if metrics_file:
+        ctx.call_on_close(MetricsReporter(metrics_file, metrics_interval).start().close)
+    if dashboard:
+        ctx.call_on_close(MetricsDashboard().start().close)
+    else:
+        # The dashboard shows the progress of the stages itself
+        ctx.call_on_close(progress.start(progress_mode).close)
+    if trace:
+        ctx.call_on_close(tracer.start(trace).close)
+    if profile:
+        if profile_mode not in PROFILE_MODES:
+            raise typer.BadParameter(f"--profile-mode must be one of {', '.join(PROFILE_MODES)}")
+        ctx.call_on_close(Profiler(profile, profile_mode).start().close)
+
 # Import the CLI commands after defining the app to avoid circular imports
-from . import download_grid_cli, download_images_cli
\ No newline at end of file
+from . import (
+    download_grid_cli, download_images_cli, export_cli, generate_grid_cli, plan_cli, run_cli, shard_cli,
+    state_cli, trace_cli, worker_cli,
+)
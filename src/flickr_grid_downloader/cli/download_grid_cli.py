@@ -4,9 +4,8 @@ from pathlib import Path
 
 from flickr_grid_downloader.config import JobConfig
 from flickr_grid_downloader.console import console
-from flickr_grid_downloader.cli import app
+from flickr_grid_downloader.cli import app, build_client, build_grid, build_plan
 from flickr_grid_downloader.tools.grid_downloader import ZoneDownloader
-from flickr_grid_downloader.utils.flickr_client import FlickrClient
 from flickr_grid_downloader.constants import INPUT_DIR, C_XX, C_YX, C_XY, C_YY
 
 ZONE_HELP_TEXT = """
@@ -20,6 +19,9 @@ The default expected columns must be the following:
 If the coordinates order is different, you can specify the column indices using the options --xx, --yx, --xy, and --yy.
 """
 
+ORDER_HELP = ("Order of the cells, from the totals probed by `fgd plan`: 'file', 'largest' first or at/over the "
+              "4,000 results 'cap' first. With a plan, cells probed empty are recorded without searching them.")
+
 @app.command("download-grid")
 def download_grid_cmd(
     ctx: typer.Context,
@@ -32,6 +34,15 @@ def download_grid_cmd(
     yx: int = typer.Option(C_YX, envvar="YX_COLUMN", help="Index for Y.x coordinate column (0-based)"),
     xy: int = typer.Option(C_XY, envvar="XY_COLUMN", help="Index for X.y coordinate column (0-based)"),   
     yy: int = typer.Option(C_YY, envvar="YY_COLUMN", help="Index for Y.y coordinate column (0-based)"),
+    adaptive: bool = typer.Option(False, envvar="ADAPTIVE", help="Split cells over the ~4,000 results cap into quadrants / date windows until every part fits."),
+    lean: bool = typer.Option(False, envvar="LEAN", help="Store search extras (dates, geo, tags, views, owner…) in the results so download-images can skip getInfo."),
+    state: str = typer.Option("csv", envvar="STATE_BACKEND", help="Where progress is stored: 'csv' files or an indexed 'sqlite' database."),
+    concurrency: int = typer.Option(1, min=1, envvar="CONCURRENCY", help="Cells and pages searched at once with the asyncio engine (1 = sequential mode)."),
+    since_last_run: bool = typer.Option(False, envvar="SINCE_LAST_RUN", help="Search checked cells again, only for photos uploaded since the previous run."),
+    order: str = typer.Option("file", envvar="ORDER", help=ORDER_HELP),
+    region: Path | None = typer.Option(None, envvar="REGION", help="GeoJSON polygon(s) to cover with generated cells instead of the coordinates file (needs NumPy)."),
+    bbox: str | None = typer.Option(None, envvar="BBOX", help="'min_lon,min_lat,max_lon,max_lat' to cover with generated cells instead of the coordinates file."),
+    cell_size: float = typer.Option(1000, min=1, envvar="CELL_SIZE", help="Side of the generated cells in meters (with --region / --bbox)."),
 ):
     
     api_key = ctx.obj["api_key"]
@@ -48,24 +59,73 @@ def download_grid_cmd(
         xy_column=xy,
         yy_column=yy,
         delimiter=delimiter,
+        state_backend=state,
     )
 
+    grid = build_grid(region, bbox, cell_size)
+    plan = build_plan(cfg, order)
     if not coordinates_file:
         coordinates_file = Path(INPUT_DIR) / f"{zone}_coordinates.csv"
-    if not coordinates_file.exists():
+    if grid is None and not coordinates_file.exists():
         raise typer.BadParameter(f"Coordinates file '{coordinates_file}' does not exist. Please provide a valid path or ensure the file exists in the input directory.")
 
     console.print("\n[bold magenta]Starting Flickr grid downloader CLI[/]\n")
 
     console.print("[bold cyan]Using the following configuration:[/]")
     console.print(f"📍 [bold blue]Zone:            [/] {zone}")
-    console.print(f"📁 [bold blue]Coordinates file:[/] {coordinates_file.name}")
+    if grid is None:
+        console.print(f"📁 [bold blue]Coordinates file:[/] {coordinates_file.name}")
+    else:
+        console.print(f"🗺️  [bold blue]Generated grid:  [/] {region or bbox}, {cell_size:g} m cells")
     console.print(f"🗓️  [bold blue]Start Year:      [/] {start_year}")
     console.print(f"🗓️  [bold blue]End Year:        [/] {end_year}")
-    console.print(f"📊 [bold blue]Columns:         [/] XX={xx}, YX={yx}, XY={xy}, YY={yy}\n")
+    console.print(f"📊 [bold blue]Columns:         [/] XX={xx}, YX={yx}, XY={xy}, YY={yy}")
+    console.print(f"🧩 [bold blue]Adaptive split:  [/] {'Yes' if adaptive else 'No'}")
+    console.print(f"🪶 [bold blue]Lean metadata:   [/] {'Yes' if lean else 'No'}")
+    console.print(f"🗄️  [bold blue]State backend:   [/] {state}")
+    console.print(f"⚡ [bold blue]Concurrency:     [/] {concurrency}")
+    console.print(f"🧭 [bold blue]Cell order:      [/] {order}{f' ({len(plan):,} cells planned)' if plan else ''}")
+    console.print(f"🔄 [bold blue]Since last run:  [/] {'Yes' if since_last_run else 'No'}\n")
+
+    api  = build_client(ctx, concurrency)
+    ZoneDownloader(cfg, api, adaptive=adaptive, lean=lean, cells=grid, plan=plan, order=order).run(concurrency=concurrency, since_last_run=since_last_run)
+
+@app.command("retry-failed")
+def retry_failed_cmd(
+    ctx: typer.Context,
+    zone: str = typer.Option(..., prompt=True, envvar="ZONE", help="Zone whose failed cells are retried."),
+    delimiter: str = typer.Option(",", envvar="DELIMITER", help="Delimiter for the coordinates CSV file. Default is ','"),
+    start_year: int = typer.Option(2015, envvar="START_YEAR"),
+    end_year:   int = typer.Option(2024, envvar="END_YEAR"),
+    xx: int = typer.Option(C_XX, envvar="XX_COLUMN", help="Index for X.x coordinate column (0-based)"),
+    yx: int = typer.Option(C_YX, envvar="YX_COLUMN", help="Index for Y.x coordinate column (0-based)"),
+    xy: int = typer.Option(C_XY, envvar="XY_COLUMN", help="Index for X.y coordinate column (0-based)"),
+    yy: int = typer.Option(C_YY, envvar="YY_COLUMN", help="Index for Y.y coordinate column (0-based)"),
+    adaptive: bool = typer.Option(False, envvar="ADAPTIVE", help="Retry failed cells with adaptive splitting (detected automatically for cells that were split)."),
+    lean: bool = typer.Option(False, envvar="LEAN", help="Must match the --lean flag of the download-grid run."),
+    state: str = typer.Option("csv", envvar="STATE_BACKEND", help="Where progress is stored: 'csv' files or an indexed 'sqlite' database."),
+    region: Path | None = typer.Option(None, envvar="REGION", help="GeoJSON polygon(s) of the download-grid run, when its cells were generated (needs NumPy)."),
+    bbox: str | None = typer.Option(None, envvar="BBOX", help="'min_lon,min_lat,max_lon,max_lat' of the download-grid run, when its cells were generated."),
+    cell_size: float = typer.Option(1000, min=1, envvar="CELL_SIZE", help="Side of the generated cells in meters (with --region / --bbox)."),
+):
+    """Refetch only the missing pages of the cells recorded with errors."""
+    cfg = JobConfig(
+        zone=zone,
+        start_year=start_year,
+        end_year=end_year,
+        api_key=ctx.obj["api_key"],
+        api_secret=ctx.obj["api_secret"],
+        xx_column=xx,
+        yx_column=yx,
+        xy_column=xy,
+        yy_column=yy,
+        delimiter=delimiter,
+        state_backend=state,
+    )
 
-    api  = FlickrClient(api_key=api_key, api_secret=api_secret)
-    ZoneDownloader(cfg, api).run()
+    console.print(f"\n[bold magenta]Retrying failed cells of zone {zone}[/]\n")
+    grid = build_grid(region, bbox, cell_size)
+    ZoneDownloader(cfg, build_client(ctx), adaptive=adaptive, lean=lean, cells=grid).retry_failed()
 
 if __name__ == "__main__":
     app()
\ No newline at end of file
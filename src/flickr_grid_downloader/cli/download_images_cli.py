@@ -3,9 +3,11 @@ import typer
 
 from flickr_grid_downloader.config import JobConfig
 from flickr_grid_downloader.console import console
-from flickr_grid_downloader.cli import app
+from flickr_grid_downloader.cli import (
+    app, build_client, build_content_index, build_info_fields, build_post_processor, build_size_policy,
+)
+from flickr_grid_downloader.utils.shard_store import ShardWriter
 from flickr_grid_downloader.tools.image_downloader import ImageDownloader
-from flickr_grid_downloader.utils.flickr_client import FlickrClient
 
 
 @app.command("download-images")
@@ -14,11 +16,30 @@ def download_images(
     zone: str = typer.Option(..., prompt=True, envvar="ZONE", help="Zone to download the images from."),
     start_year: int = typer.Option(2015, envvar="START_YEAR"),
     end_year:   int = typer.Option(2024, envvar="END_YEAR"),
-    raw: bool = typer.Option(False, envvar="DOWNLOAD_RAW", help="Download raw Flickr JSON data instead of using the custom format.")
+    raw: bool = typer.Option(False, envvar="DOWNLOAD_RAW", help="Download raw Flickr JSON data instead of using the custom format."),
+    workers: int = typer.Option(1, min=1, envvar="WORKERS", help="Concurrent API and CDN workers. 1 keeps the sequential mode."),
+    info_fields: str = typer.Option("", envvar="INFO_FIELDS", help="Comma-separated photo_info fields that require getInfo for results saved with --lean (e.g. 'reply_count,locality')."),
+    state: str = typer.Option("csv", envvar="STATE_BACKEND", help="Where progress is stored: 'csv' files or an indexed 'sqlite' database."),
+    metadata_only: bool = typer.Option(False, envvar="METADATA_ONLY", help="Rebuild the JSON metadata of every photo without downloading images (pair with --cache-only for an offline replay)."),
+    derivatives: str = typer.Option("", envvar="DERIVATIVES", help="Comma-separated max sides in pixels of the derivatives made from each image (e.g. '1024,256'). Empty = none."),
+    derivative_format: str = typer.Option("webp", envvar="DERIVATIVE_FORMAT", help="Format of the derivatives: webp or jpeg."),
+    quality: int = typer.Option(85, min=1, max=100, envvar="DERIVATIVE_QUALITY", help="Encoder quality of the derivatives."),
+    keep_exif: bool = typer.Option(False, envvar="KEEP_EXIF", help="Copy the EXIF block into the derivatives (stripped by default)."),
+    drop_original: bool = typer.Option(False, envvar="DROP_ORIGINAL", help="Delete each downloaded image once its derivatives are written."),
+    post_workers: int = typer.Option(0, min=0, envvar="POST_WORKERS", help="Post-processing processes (0 = one per CPU)."),
+    shards: bool = typer.Option(False, envvar="SHARDS", help="Pack images into size-capped tar shards with an offset index instead of one file per image."),
+    shard_mb: int = typer.Option(1024, min=1, envvar="SHARD_MB", help="Maximum size of a shard in MB."),
+    dedup: bool = typer.Option(False, envvar="DEDUP", help="Share stored images across boxes and zones: hardlink photos already downloaded and collapse byte-identical files."),
+    phash: bool = typer.Option(False, envvar="PHASH", help="With --dedup, also record a perceptual hash (dHash) of every image (needs Pillow)."),
+    image_size: str = typer.Option("b", envvar="IMAGE_SIZE", help="Image variant to download: z (640 px), c (800), b (1024), h (1600), k (2048), o (original), or a number of pixels for the largest variant up to that side. h, k and sizes from the original need --lean results."),
+    bandwidth_mb: float = typer.Option(0, min=0, envvar="BANDWIDTH_MB", help="CDN bandwidth cap in MB/s shared by all workers (0 = unlimited)."),
+    max_download_mb: int = typer.Option(0, min=0, envvar="MAX_DOWNLOAD_MB", help="Stop cleanly once this run has downloaded this many MB (0 = unlimited); the next run continues."),
 ):
     
     api_key = ctx.obj["api_key"]
     api_secret = ctx.obj["api_secret"]
+    size = build_size_policy(image_size)
+    fields = build_info_fields(info_fields)
 
     cfg = JobConfig(
         zone=zone,
@@ -27,6 +48,8 @@ def download_images(
         api_key=api_key,
         api_secret=api_secret,
         download_raw_metadata=raw,
+        state_backend=state,
+        cdn_url=ctx.obj["cdn_url"],
     )
 
     console.print("\n[bold magenta]Starting Flickr img downloader CLI[/]\n")
@@ -35,10 +58,24 @@ def download_images(
     console.print(f"📍 [bold blue]Zone:           [/] {zone}")
     console.print(f"🗓️  [bold blue]Start Year:     [/] {start_year}")
     console.print(f"🗓️  [bold blue]End Year:       [/] {end_year}")
-    console.print(f"🔧 [bold blue]Output format:  [/] {'Raw' if raw else 'Custom'}\n")
+    console.print(f"🔧 [bold blue]Output format:  [/] {'Raw' if raw else 'Custom'}")
+    console.print(f"🧵 [bold blue]Workers:        [/] {workers}")
+    console.print(f"🗄️  [bold blue]State backend:  [/] {state}")
+    console.print(f"🖼️  [bold blue]Derivatives:    [/] {f'{derivatives} ({derivative_format}, q{quality})' if derivatives else 'No'}")
+    console.print(f"📦 [bold blue]Shards:         [/] {f'Yes ({shard_mb} MB)' if shards else 'No'}")
+    console.print(f"🔗 [bold blue]Deduplication:  [/] {('Yes (+ perceptual hash)' if phash else 'Yes') if dedup else 'No'}")
+    console.print(f"📐 [bold blue]Image size:     [/] {size}")
+    console.print(f"🚦 [bold blue]Bandwidth:      [/] {f'{bandwidth_mb:g} MB/s' if bandwidth_mb else 'Unlimited'}")
+    console.print(f"💾 [bold blue]Byte budget:    [/] {f'{max_download_mb} MB' if max_download_mb else 'Unlimited'}")
+    console.print(f"📝 [bold blue]Metadata only:  [/] {'Yes' if metadata_only else 'No'}\n")
 
-    api  = FlickrClient(api_key=api_key, api_secret=api_secret)
-    ImageDownloader(cfg, api).run()
+    content = build_content_index(dedup, phash)
+    shard_writer = ShardWriter(cfg.shard_path, zone, shard_mb << 20) if shards else None
+    post = build_post_processor(derivatives, derivative_format, quality, keep_exif, drop_original, post_workers)
+    api  = build_client(ctx, workers)
+    ImageDownloader(cfg, api, workers=workers, info_fields=fields, metadata_only=metadata_only,
+                    post=post, shards=shard_writer, content=content, size=size,
+                    bandwidth=bandwidth_mb * (1 << 20), max_bytes=max_download_mb << 20).run()
 
 if __name__ == "__main__":
     app()
\ No newline at end of file
@@ -0,0 +1,39 @@
+from __future__ import annotations
+from pathlib import Path
+
+import typer
+
+from flickr_grid_downloader.config import JobConfig
+from flickr_grid_downloader.console import console, error, success
+from flickr_grid_downloader.constants import PARQUET_DIR
+from flickr_grid_downloader.cli import app
+
+
+@app.command("export")
+def export_cmd(
+    ctx: typer.Context,
+    zone: str = typer.Option(..., prompt=True, envvar="ZONE", help="Zone whose metadata JSONs are exported."),
+    start_year: int = typer.Option(2015, envvar="START_YEAR"),
+    end_year:   int = typer.Option(2024, envvar="END_YEAR"),
+    out: Path = typer.Option(PARQUET_DIR, envvar="PARQUET_DIR", help="Root of the partitioned Parquet dataset."),
+    compression: str = typer.Option("zstd", envvar="PARQUET_COMPRESSION", help="Parquet codec: zstd, snappy, gzip, lz4 or none."),
+):
+    """Convert the zone's per-box metadata JSONs (custom or raw) into a partitioned Parquet dataset."""
+    try:
+        # pyarrow is an optional dependency, only needed by this command
+        from flickr_grid_downloader.tools.parquet_exporter import ParquetExporter
+    except ImportError:
+        error("fgd export needs pyarrow: pip install 'flickr-grid-downloader[parquet]'")
+        raise typer.Exit(1)
+
+    cfg = JobConfig(
+        zone=zone,
+        start_year=start_year,
+        end_year=end_year,
+        api_key=ctx.obj["api_key"],
+        api_secret=ctx.obj["api_secret"],
+    )
+
+    console.print(f"\n[bold magenta]Exporting {zone} metadata to Parquet[/]\n")
+    photos = ParquetExporter(cfg, out, compression).run()
+    success(f"Exported {photos} photos ({out / f'zone={zone}'})")
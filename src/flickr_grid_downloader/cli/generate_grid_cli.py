@@ -0,0 +1,33 @@
+from __future__ import annotations
+import time
+import typer
+from pathlib import Path
+
+from flickr_grid_downloader.console import console, success
+from flickr_grid_downloader.cli import app, build_grid
+from flickr_grid_downloader.constants import INPUT_DIR
+
+
+@app.command("generate-grid")
+def generate_grid_cmd(
+    zone: str = typer.Option(..., prompt=True, envvar="ZONE", help="Zone whose coordinates file is written (input/{zone}_coordinates.csv)."),
+    region: Path | None = typer.Option(None, envvar="REGION", help="GeoJSON file with the polygon(s) to cover (lon/lat)."),
+    bbox: str | None = typer.Option(None, envvar="BBOX", help="'min_lon,min_lat,max_lon,max_lat' to cover, instead of --region."),
+    cell_size: float = typer.Option(1000, min=1, envvar="CELL_SIZE", help="Side of the cells in meters."),
+    output: Path | None = typer.Option(None, help="CSV to write instead of input/{zone}_coordinates.csv."),
+    delimiter: str = typer.Option(",", envvar="DELIMITER", help="Delimiter of the CSV file."),
+    force: bool = typer.Option(False, help="Overwrite an existing coordinates file."),
+):
+    """Write the coordinates file of a zone from a GeoJSON polygon or a bbox (needs NumPy)."""
+    grid = build_grid(region, bbox, cell_size)
+    if grid is None:
+        raise typer.BadParameter("give the area to cover with --region or --bbox")
+    output = output or INPUT_DIR / f"{zone}_coordinates.csv"
+    if output.exists() and not force:
+        # Cells are keyed by id in the zone state: a different grid must not replace it by accident
+        raise typer.BadParameter(f"'{output}' already exists; use --force to overwrite it")
+
+    console.print(f"\n[bold magenta]Generating {cell_size:g} m cells for zone {zone}[/]\n")
+    started = time.monotonic()
+    count = grid.write_csv(output, delimiter)
+    success(f"Wrote {count:,} cells to {output} in {time.monotonic() - started:.1f}s")
@@ -0,0 +1,106 @@
+from __future__ import annotations
+import typer
+from pathlib import Path
+from rich.table import Table
+
+from flickr_grid_downloader.config import JobConfig
+from flickr_grid_downloader.console import console, success
+from flickr_grid_downloader.cli import app, api_rate, build_client, build_grid, build_size_policy
+from flickr_grid_downloader.tools.cell_planner import CellPlanner
+from flickr_grid_downloader.constants import INPUT_DIR, FLICKR_PAGINATION_LIMIT, C_XX, C_YX, C_XY, C_YY
+
+
+def _duration(seconds: float) -> str:
+    hours, rest = divmod(int(seconds), 3600)
+    return f"{hours}h {rest // 60:02d}m" if hours else f"{rest // 60}m {rest % 60:02d}s"
+
+
+@app.command("plan")
+def plan_cmd(
+    ctx: typer.Context,
+    zone: str = typer.Option(..., prompt=True, envvar="ZONE", help="Zone to plan (input/{zone}_coordinates.csv, or --region / --bbox)."),
+    delimiter: str = typer.Option(",", envvar="DELIMITER", help="Delimiter for the coordinates CSV file. Default is ','"),
+    start_year: int = typer.Option(2015, envvar="START_YEAR"),
+    end_year:   int = typer.Option(2024, envvar="END_YEAR"),
+    xx: int = typer.Option(C_XX, envvar="XX_COLUMN", help="Index for X.x coordinate column (0-based)"),
+    yx: int = typer.Option(C_YX, envvar="YX_COLUMN", help="Index for Y.x coordinate column (0-based)"),
+    xy: int = typer.Option(C_XY, envvar="XY_COLUMN", help="Index for X.y coordinate column (0-based)"),
+    yy: int = typer.Option(C_YY, envvar="YY_COLUMN", help="Index for Y.y coordinate column (0-based)"),
+    region: Path | None = typer.Option(None, envvar="REGION", help="GeoJSON polygon(s) covered with generated cells instead of the coordinates file (needs NumPy)."),
+    bbox: str | None = typer.Option(None, envvar="BBOX", help="'min_lon,min_lat,max_lon,max_lat' covered with generated cells instead of the coordinates file."),
+    cell_size: float = typer.Option(1000, min=1, envvar="CELL_SIZE", help="Side of the generated cells in meters (with --region / --bbox)."),
+    concurrency: int = typer.Option(1, min=1, envvar="CONCURRENCY", help="Probes in flight, and search concurrency of the estimate."),
+    refresh: bool = typer.Option(False, help="Probe every cell again, not only the ones missing from the plan."),
+    estimate_only: bool = typer.Option(False, help="Do not probe; estimate from the totals already in the plan."),
+    adaptive: bool = typer.Option(False, envvar="ADAPTIVE", help="Estimate the search with adaptive splitting of the cells over the cap."),
+    lean: bool = typer.Option(False, envvar="LEAN", help="Estimate the images without getInfo calls (download-grid --lean)."),
+    workers: int = typer.Option(1, min=1, envvar="WORKERS", help="Image workers of the estimate."),
+    image_size: str = typer.Option("b", envvar="IMAGE_SIZE", help="Image size of the estimate (see download-images)."),
+    avg_image_kb: float = typer.Option(0, min=0, envvar="AVG_IMAGE_KB", help="Average image size in KB, e.g. measured on an earlier run (0 = estimated from --image-size)."),
+    bandwidth_mb: float = typer.Option(0, min=0, envvar="BANDWIDTH_MB", help="CDN bandwidth cap of the estimate in MB/s (0 = unlimited)."),
+    top: int = typer.Option(10, min=0, help="Densest cells to list."),
+):
+    """Probe the photo total of every cell (one result per request) and estimate the cost of the zone."""
+    cfg = JobConfig(
+        zone=zone,
+        start_year=start_year,
+        end_year=end_year,
+        api_key=ctx.obj["api_key"],
+        api_secret=ctx.obj["api_secret"],
+        xx_column=xx,
+        yx_column=yx,
+        xy_column=xy,
+        yy_column=yy,
+        delimiter=delimiter,
+    )
+    size = build_size_policy(image_size)
+    grid = build_grid(region, bbox, cell_size)
+    coordinates_file = Path(INPUT_DIR) / f"{zone}_coordinates.csv"
+    if grid is None and not coordinates_file.exists():
+        raise typer.BadParameter(f"Coordinates file '{coordinates_file}' does not exist.")
+
+    planner = CellPlanner(cfg, build_client(ctx, concurrency), cells=grid)
+    console.print(f"\n[bold magenta]Planning zone {zone} ({start_year}-{end_year})[/]\n")
+    if not estimate_only:
+        probed = planner.probe(concurrency, refresh)
+        success(f"Probed {probed:,} cells → {planner.plan.path}")
+        if planner.failed:
+            console.print(f"[yellow]{planner.failed:,} probes failed; run `fgd plan` again to retry them.[/]")
+
+    rate = api_rate(ctx)
+    est = planner.estimate(rate, adaptive=adaptive, lean=lean, size=size, concurrency=concurrency,
+                           workers=workers, bandwidth=bandwidth_mb * (1 << 20),
+                           avg_image=int(avg_image_kb * 1024) if avg_image_kb else None)
+
+    cells = Table(title=f"Cells of zone {zone}")
+    cells.add_column("")
+    cells.add_column("Value", justify="right")
+    cells.add_row("Cells", f"{est.cells:,}")
+    cells.add_row("Probed", f"{est.probed:,}")
+    cells.add_row("Empty (not searched)", f"{est.empty:,}")
+    cells.add_row(f"Over the {FLICKR_PAGINATION_LIMIT:,} cap", f"{est.over_cap:,}")
+    cells.add_row("Photos", f"{est.photos:,}")
+    if est.lost:
+        cells.add_row("Photos lost to the cap", f"[yellow]{est.lost:,}[/] (use --adaptive)")
+    console.print(cells)
+
+    cost = Table(title=f"Estimate at {rate * 3600:,.0f} requests/hour")
+    for column in ("Stage", "API requests", "Bytes", "Wall time"):
+        cost.add_column(column, justify="right" if column != "Stage" else "left")
+    cost.add_row("download-grid", f"{est.search_requests:,}", "", _duration(est.search_seconds))
+    cost.add_row("download-images", f"{est.info_requests:,}", f"{est.image_bytes / (1 << 30):,.2f} GB",
+                 _duration(est.image_seconds))
+    cost.add_row("[bold]Total[/]", f"{est.search_requests + est.info_requests:,}",
+                 f"{est.image_bytes / (1 << 30):,.2f} GB", _duration(est.seconds))
+    console.print(cost)
+
+    if top:
+        dense = Table(title="Densest cells")
+        dense.add_column("Cell")
+        dense.add_column("Photos", justify="right")
+        for box_id, total in planner.densest(top):
+            dense.add_row(box_id, f"{total:,}")
+        console.print(dense)
+    if est.probed < est.cells:
+        console.print(f"[yellow]{est.cells - est.probed:,} cells are not probed yet; the estimate leaves them out.[/]")
+    console.print("Crawl by the plan with `download-grid --order largest` or `--order cap`.")
@@ -0,0 +1,109 @@
+from __future__ import annotations
+import typer
+from pathlib import Path
+
+from flickr_grid_downloader.config import JobConfig
+from flickr_grid_downloader.console import console
+from flickr_grid_downloader.cli import (
+    app, build_client, build_content_index, build_grid, build_info_fields, build_plan, build_post_processor,
+    build_size_policy,
+)
+from flickr_grid_downloader.utils.shard_store import ShardWriter
+from flickr_grid_downloader.cli.download_grid_cli import ORDER_HELP, ZONE_HELP_TEXT
+from flickr_grid_downloader.tools.pipeline import Pipeline
+from flickr_grid_downloader.constants import INPUT_DIR, C_XX, C_YX, C_XY, C_YY
+
+
+@app.command("run")
+def run_cmd(
+    ctx: typer.Context,
+    zone: str = typer.Option(..., prompt=True, envvar="ZONE", help=ZONE_HELP_TEXT),
+    delimiter: str = typer.Option(",", envvar="DELIMITER", help="Delimiter for the coordinates CSV file. Default is ','"),
+    start_year: int = typer.Option(2015, envvar="START_YEAR"),
+    end_year:   int = typer.Option(2024, envvar="END_YEAR"),
+    xx: int = typer.Option(C_XX, envvar="XX_COLUMN", help="Index for X.x coordinate column (0-based)"),
+    yx: int = typer.Option(C_YX, envvar="YX_COLUMN", help="Index for Y.x coordinate column (0-based)"),
+    xy: int = typer.Option(C_XY, envvar="XY_COLUMN", help="Index for X.y coordinate column (0-based)"),
+    yy: int = typer.Option(C_YY, envvar="YY_COLUMN", help="Index for Y.y coordinate column (0-based)"),
+    adaptive: bool = typer.Option(False, envvar="ADAPTIVE", help="Split cells over the ~4,000 results cap into quadrants / date windows until every part fits."),
+    lean: bool = typer.Option(False, envvar="LEAN", help="Store search extras in the results so images are stored without getInfo."),
+    state: str = typer.Option("csv", envvar="STATE_BACKEND", help="Where progress is stored: 'csv' files or an indexed 'sqlite' database."),
+    concurrency: int = typer.Option(1, min=1, envvar="CONCURRENCY", help="Cells and pages searched at once with the asyncio engine (1 = sequential search)."),
+    since_last_run: bool = typer.Option(False, envvar="SINCE_LAST_RUN", help="Search checked cells again, only for photos uploaded since the previous run."),
+    order: str = typer.Option("file", envvar="ORDER", help=ORDER_HELP),
+    raw: bool = typer.Option(False, envvar="DOWNLOAD_RAW", help="Download raw Flickr JSON data instead of using the custom format."),
+    workers: int = typer.Option(1, min=1, envvar="WORKERS", help="Concurrent API and CDN workers for the images. 1 keeps the sequential mode."),
+    info_fields: str = typer.Option("", envvar="INFO_FIELDS", help="Comma-separated photo_info fields that require getInfo for --lean results."),
+    derivatives: str = typer.Option("", envvar="DERIVATIVES", help="Comma-separated max sides in pixels of the derivatives made from each image (e.g. '1024,256'). Empty = none."),
+    derivative_format: str = typer.Option("webp", envvar="DERIVATIVE_FORMAT", help="Format of the derivatives: webp or jpeg."),
+    quality: int = typer.Option(85, min=1, max=100, envvar="DERIVATIVE_QUALITY", help="Encoder quality of the derivatives."),
+    keep_exif: bool = typer.Option(False, envvar="KEEP_EXIF", help="Copy the EXIF block into the derivatives (stripped by default)."),
+    drop_original: bool = typer.Option(False, envvar="DROP_ORIGINAL", help="Delete each downloaded image once its derivatives are written."),
+    post_workers: int = typer.Option(0, min=0, envvar="POST_WORKERS", help="Post-processing processes (0 = one per CPU)."),
+    shards: bool = typer.Option(False, envvar="SHARDS", help="Pack images into size-capped tar shards with an offset index instead of one file per image."),
+    shard_mb: int = typer.Option(1024, min=1, envvar="SHARD_MB", help="Maximum size of a shard in MB."),
+    dedup: bool = typer.Option(False, envvar="DEDUP", help="Share stored images across boxes and zones: hardlink photos already downloaded and collapse byte-identical files."),
+    phash: bool = typer.Option(False, envvar="PHASH", help="With --dedup, also record a perceptual hash (dHash) of every image (needs Pillow)."),
+    image_size: str = typer.Option("b", envvar="IMAGE_SIZE", help="Image variant to download: z (640 px), c (800), b (1024), h (1600), k (2048), o (original), or a number of pixels for the largest variant up to that side. h, k and sizes from the original need --lean results."),
+    bandwidth_mb: float = typer.Option(0, min=0, envvar="BANDWIDTH_MB", help="CDN bandwidth cap in MB/s shared by all workers (0 = unlimited)."),
+    max_download_mb: int = typer.Option(0, min=0, envvar="MAX_DOWNLOAD_MB", help="Stop cleanly once this run has downloaded this many MB (0 = unlimited); the next run continues."),
+    queue_pages: int = typer.Option(Pipeline.QUEUE_PAGES, min=1, envvar="QUEUE_PAGES", help="Result pages the search may get ahead of the image downloads."),
+    region: Path | None = typer.Option(None, envvar="REGION", help="GeoJSON polygon(s) to cover with generated cells instead of the coordinates file (needs NumPy)."),
+    bbox: str | None = typer.Option(None, envvar="BBOX", help="'min_lon,min_lat,max_lon,max_lat' to cover with generated cells instead of the coordinates file."),
+    cell_size: float = typer.Option(1000, min=1, envvar="CELL_SIZE", help="Side of the generated cells in meters (with --region / --bbox)."),
+):
+    """Search the grid and download the images at the same time (download-grid + download-images)."""
+    size = build_size_policy(image_size)
+    fields = build_info_fields(info_fields)
+    cfg = JobConfig(
+        zone=zone,
+        start_year=start_year,
+        end_year=end_year,
+        api_key=ctx.obj["api_key"],
+        api_secret=ctx.obj["api_secret"],
+        xx_column=xx,
+        yx_column=yx,
+        xy_column=xy,
+        yy_column=yy,
+        delimiter=delimiter,
+        download_raw_metadata=raw,
+        state_backend=state,
+        cdn_url=ctx.obj["cdn_url"],
+    )
+
+    grid = build_grid(region, bbox, cell_size)
+    plan = build_plan(cfg, order)
+    coordinates_file = Path(INPUT_DIR) / f"{zone}_coordinates.csv"
+    if grid is None and not coordinates_file.exists():
+        raise typer.BadParameter(f"Coordinates file '{coordinates_file}' does not exist.")
+
+    console.print("\n[bold magenta]Starting Flickr grid → images pipeline[/]\n")
+
+    console.print("[bold cyan]Using the following configuration:[/]")
+    console.print(f"📍 [bold blue]Zone:            [/] {zone}")
+    console.print(f"🗓️  [bold blue]Start Year:      [/] {start_year}")
+    console.print(f"🗓️  [bold blue]End Year:        [/] {end_year}")
+    if grid is not None:
+        console.print(f"🗺️  [bold blue]Generated grid:  [/] {region or bbox}, {cell_size:g} m cells")
+    console.print(f"🧩 [bold blue]Adaptive split:  [/] {'Yes' if adaptive else 'No'}")
+    console.print(f"🪶 [bold blue]Lean metadata:   [/] {'Yes' if lean else 'No'}")
+    console.print(f"⚡ [bold blue]Concurrency:     [/] {concurrency}")
+    console.print(f"🧭 [bold blue]Cell order:      [/] {order}{f' ({len(plan):,} cells planned)' if plan else ''}")
+    console.print(f"🔄 [bold blue]Since last run:  [/] {'Yes' if since_last_run else 'No'}")
+    console.print(f"🧵 [bold blue]Workers:         [/] {workers}")
+    console.print(f"🖼️  [bold blue]Derivatives:     [/] {f'{derivatives} ({derivative_format}, q{quality})' if derivatives else 'No'}")
+    console.print(f"📦 [bold blue]Shards:          [/] {f'Yes ({shard_mb} MB)' if shards else 'No'}")
+    console.print(f"🔗 [bold blue]Deduplication:   [/] {('Yes (+ perceptual hash)' if phash else 'Yes') if dedup else 'No'}")
+    console.print(f"📐 [bold blue]Image size:      [/] {size}")
+    console.print(f"🚦 [bold blue]Bandwidth:       [/] {f'{bandwidth_mb:g} MB/s' if bandwidth_mb else 'Unlimited'}")
+    console.print(f"💾 [bold blue]Byte budget:     [/] {f'{max_download_mb} MB' if max_download_mb else 'Unlimited'}")
+    console.print(f"🗄️  [bold blue]State backend:   [/] {state}\n")
+
+    content = build_content_index(dedup, phash)
+    shard_writer = ShardWriter(cfg.shard_path, zone, shard_mb << 20) if shards else None
+    post = build_post_processor(derivatives, derivative_format, quality, keep_exif, drop_original, post_workers)
+    api = build_client(ctx, concurrency + workers)
+    Pipeline(cfg, api, adaptive=adaptive, lean=lean, concurrency=concurrency, workers=workers,
+             info_fields=fields, queue_pages=queue_pages, since_last_run=since_last_run, post=post,
+             shards=shard_writer, content=content, size=size, bandwidth=bandwidth_mb * (1 << 20),
+             max_bytes=max_download_mb << 20, cells=grid, plan=plan, order=order).run()
@@ -0,0 +1,29 @@
+from __future__ import annotations
+import typer
+
+from flickr_grid_downloader.config import JobConfig
+from flickr_grid_downloader.console import console, success
+from flickr_grid_downloader.cli import app
+from flickr_grid_downloader.tools.shard_repacker import ShardRepacker
+
+
+@app.command("repack")
+def repack_cmd(
+    ctx: typer.Context,
+    zone: str = typer.Option(..., prompt=True, envvar="ZONE", help="Zone whose img/ tree is packed into shards."),
+    start_year: int = typer.Option(2015, envvar="START_YEAR"),
+    end_year:   int = typer.Option(2024, envvar="END_YEAR"),
+    shard_mb: int = typer.Option(1024, min=1, envvar="SHARD_MB", help="Maximum size of a shard in MB."),
+    keep_files: bool = typer.Option(False, help="Keep the image files after packing them."),
+):
+    """Convert an existing img/<box_id>/ tree into tar shards with an offset index."""
+    cfg = JobConfig(
+        zone=zone,
+        start_year=start_year,
+        end_year=end_year,
+        api_key=ctx.obj["api_key"],
+        api_secret=ctx.obj["api_secret"],
+    )
+    console.print(f"\n[bold magenta]Packing {zone} images into shards ({shard_mb} MB)[/]\n")
+    photos = ShardRepacker(cfg, shard_mb << 20, keep_files).run()
+    success(f"Packed {photos} photos ({cfg.shard_path})")
@@ -0,0 +1,53 @@
+from __future__ import annotations
+import typer
+
+from flickr_grid_downloader.config import JobConfig
+from flickr_grid_downloader.console import console, success
+from flickr_grid_downloader.cli import app
+from flickr_grid_downloader.utils.state_store import CsvStateStore, SqliteStateStore, sqlite_path
+
+
+def _stores(ctx: typer.Context, zone: str, start_year: int, end_year: int) -> tuple[CsvStateStore, SqliteStateStore]:
+    cfg = JobConfig(
+        zone=zone,
+        start_year=start_year,
+        end_year=end_year,
+        api_key=ctx.obj["api_key"],
+        api_secret=ctx.obj["api_secret"],
+    )
+    return (
+        CsvStateStore(cfg.csv_path, start_year, end_year),
+        SqliteStateStore(sqlite_path(cfg.csv_path, start_year, end_year)),
+    )
+
+
+@app.command("import-state")
+def import_state(
+    ctx: typer.Context,
+    zone: str = typer.Option(..., prompt=True, envvar="ZONE", help="Zone whose CSV state is imported."),
+    start_year: int = typer.Option(2015, envvar="START_YEAR"),
+    end_year:   int = typer.Option(2024, envvar="END_YEAR"),
+):
+    """Load checked_grids / checked_pages / results / downloaded_images CSVs into the SQLite state."""
+    source, db = _stores(ctx, zone, start_year, end_year)
+    console.print(f"\n[bold magenta]Importing CSV state into {db.path.name}[/]\n")
+    cells, pages, photos, downloads = db.import_csv(source)
+    db.close()
+    success(f"Imported {cells} cells, {pages} pages, {photos} result rows and {downloads} downloads "
+            f"({db.path})")
+
+
+@app.command("export-state")
+def export_state(
+    ctx: typer.Context,
+    zone: str = typer.Option(..., prompt=True, envvar="ZONE", help="Zone whose SQLite state is exported."),
+    start_year: int = typer.Option(2015, envvar="START_YEAR"),
+    end_year:   int = typer.Option(2024, envvar="END_YEAR"),
+):
+    """Write the SQLite state back to the checked_grids / checked_pages / results / downloaded_images CSVs."""
+    target, db = _stores(ctx, zone, start_year, end_year)
+    console.print(f"\n[bold magenta]Exporting {db.path.name} to CSV[/]\n")
+    cells, pages, photos, downloads = db.export_csv(target)
+    db.close()
+    success(f"Exported {cells} cells, {pages} pages, {photos} results and {downloads} downloads "
+            f"({target.done_csv.parent})")
@@ -0,0 +1,54 @@
+from __future__ import annotations
+import typer
+from pathlib import Path
+from rich.table import Table
+
+from flickr_grid_downloader.console import console
+from flickr_grid_downloader.cli import app
+from flickr_grid_downloader.tools.trace_analyzer import analyze
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:,.1f}"
+
+
+@app.command("analyze-trace")
+def analyze_trace_cmd(
+    trace_file: Path = typer.Option(..., "--file", help="Trace written with `fgd --trace <file> …`."),
+    top: int = typer.Option(10, min=1, help="Slowest cells to list."),
+):
+    """Summarize a trace: latency percentiles, slowest cells and time split across network, parsing and disk."""
+    if not trace_file.exists():
+        raise typer.BadParameter(f"Trace file '{trace_file}' does not exist.")
+    s = analyze(trace_file, top)
+    if not s.events:
+        raise typer.BadParameter(f"'{trace_file}' has no trace events.")
+
+    console.print(f"\n[bold magenta]Trace {trace_file.name}[/]: {s.events:,} events over {s.wall:,.1f}s\n")
+
+    latency = Table(title="Latency (ms)")
+    for column in ("Event", "Count", "p50", "p90", "p99", "Max", "Mean"):
+        latency.add_column(column, justify="left" if column == "Event" else "right")
+    for row in s.latencies:
+        latency.add_row(row.name, f"{row.count:,}", _ms(row.p50), _ms(row.p90), _ms(row.p99), _ms(row.max), _ms(row.mean))
+    console.print(latency)
+
+    busy = s.network + s.parsing + s.disk
+    split = Table(title="Time split (summed over threads)")
+    for column in ("", "Seconds", "Share"):
+        split.add_column(column, justify="left" if not column else "right")
+    for name, seconds in (("Network", s.network), ("Parsing", s.parsing), ("Disk", s.disk)):
+        split.add_row(name, f"{seconds:,.2f}", f"{100 * seconds / busy:.1f}%" if busy else "-")
+    console.print(split)
+    console.print(f"API responses {s.api_bytes / (1 << 20):,.1f} MB · CDN images {s.cdn_bytes / (1 << 20):,.1f} MB")
+
+    if s.cells:
+        cells = Table(title="Slowest cells")
+        for column in ("Cell", "Search seconds", "Pages", "Photos"):
+            cells.add_column(column, justify="left" if column == "Cell" else "right")
+        for cell in s.cells:
+            cells.add_row(cell.cell, f"{cell.seconds:,.2f}", f"{cell.pages:,}", f"{cell.photos:,}")
+        console.print(cells)
+
+    if s.errors:
+        console.print("[yellow]Errors:[/] " + ", ".join(f"{ev} {status} ×{n:,}" for (ev, status), n in s.errors.most_common()))
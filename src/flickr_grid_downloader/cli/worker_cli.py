@@ -0,0 +1,127 @@
+from __future__ import annotations
+import time
+import typer
+from pathlib import Path
+from rich.table import Table
+
+from flickr_grid_downloader.config import STATE_BACKENDS
+from flickr_grid_downloader.console import console, success
+from flickr_grid_downloader.cli import app, api_rate, build_client, build_info_fields, build_size_policy
+from flickr_grid_downloader.cli.download_grid_cli import ORDER_HELP
+from flickr_grid_downloader.constants import INPUT_DIR, QUEUE_FILE, C_XX, C_YX, C_XY, C_YY
+from flickr_grid_downloader.tools.worker import Worker
+from flickr_grid_downloader.utils.cell_plan import ORDERS
+from flickr_grid_downloader.utils.work_queue import STAGES, SharedTokenBucket, WorkQueue
+
+QUEUE_HELP = "Work queue file shared by the workers (SQLite; on shared storage for several nodes)."
+
+
+@app.command("enqueue")
+def enqueue_cmd(
+    zone: list[str] = typer.Option(..., help="Zone to queue; repeat the option for several zones."),
+    queue: Path = typer.Option(QUEUE_FILE, envvar="FLICKR_QUEUE", help=QUEUE_HELP),
+    stages: str = typer.Option("grid,images", help="Stages to queue: 'grid', 'images' or both. Images tasks start once the grid task of their zone is done."),
+    start_year: int = typer.Option(2015, envvar="START_YEAR"),
+    end_year:   int = typer.Option(2024, envvar="END_YEAR"),
+    delimiter: str = typer.Option(",", envvar="DELIMITER", help="Delimiter for the coordinates CSV files."),
+    xx: int = typer.Option(C_XX, envvar="XX_COLUMN", help="Index for X.x coordinate column (0-based)"),
+    yx: int = typer.Option(C_YX, envvar="YX_COLUMN", help="Index for Y.x coordinate column (0-based)"),
+    xy: int = typer.Option(C_XY, envvar="XY_COLUMN", help="Index for X.y coordinate column (0-based)"),
+    yy: int = typer.Option(C_YY, envvar="YY_COLUMN", help="Index for Y.y coordinate column (0-based)"),
+    adaptive: bool = typer.Option(False, envvar="ADAPTIVE", help="Grid tasks split cells over the ~4,000 results cap."),
+    lean: bool = typer.Option(False, envvar="LEAN", help="Grid tasks store search extras so images tasks can skip getInfo."),
+    since_last_run: bool = typer.Option(False, envvar="SINCE_LAST_RUN", help="Grid tasks search checked cells again, only for new uploads."),
+    order: str = typer.Option("file", envvar="ORDER", help=f"Grid tasks: {ORDER_HELP} Orders other than 'file' fail the task of a zone without a plan."),
+    raw: bool = typer.Option(False, envvar="RAW", help="Images tasks keep the raw Flickr JSONs."),
+    info_fields: str = typer.Option("", envvar="INFO_FIELDS", help="Comma-separated fields that force a getInfo call for --lean results."),
+    image_size: str = typer.Option("b", envvar="IMAGE_SIZE", help="Image variant of the images tasks (see download-images)."),
+    state: str = typer.Option("csv", envvar="STATE_BACKEND", help="Where progress is stored: 'csv' files or an indexed 'sqlite' database."),
+):
+    """Queue the grid search and/or image download of zones for `fgd worker`."""
+    stage_list = [s.strip() for s in stages.split(",") if s.strip()]
+    if not stage_list or any(s not in STAGES for s in stage_list):
+        raise typer.BadParameter(f"--stages must be a comma-separated list of {', '.join(STAGES)}")
+    if order not in ORDERS:
+        raise typer.BadParameter(f"--order must be one of {', '.join(ORDERS)}")
+    if state not in STATE_BACKENDS:
+        raise typer.BadParameter(f"--state must be one of {', '.join(STATE_BACKENDS)}")
+    build_size_policy(image_size)
+    fields = build_info_fields(info_fields)
+    if "grid" in stage_list:
+        missing = [z for z in zone if not (INPUT_DIR / f"{z}_coordinates.csv").exists()]
+        if missing:
+            raise typer.BadParameter(f"No coordinates file in '{INPUT_DIR}' for zone(s): {', '.join(missing)}")
+
+    spec = {
+        "delimiter": delimiter, "xx_column": xx, "yx_column": yx, "xy_column": xy, "yy_column": yy,
+        "state_backend": state, "adaptive": adaptive, "lean": lean, "since_last_run": since_last_run,
+        "order": order, "raw": raw, "info_fields": fields,
+        "image_size": image_size,
+    }
+    work = WorkQueue(queue)
+    added = sum(work.enqueue(z, start_year, end_year, stage_list, spec) for z in zone)
+    counts = work.counts()
+    work.close()
+    success(f"Queued {added} task(s) in {queue} — pending {counts['pending']}, leased {counts['leased']}, "
+            f"done {counts['done']}, failed {counts['failed']}, blocked {counts['blocked']}")
+
+
+@app.command("worker")
+def worker_cmd(
+    ctx: typer.Context,
+    queue: Path = typer.Option(QUEUE_FILE, envvar="FLICKR_QUEUE", help=QUEUE_HELP),
+    concurrency: int = typer.Option(1, min=1, envvar="CONCURRENCY", help="Cells and pages searched at once by grid tasks."),
+    workers: int = typer.Option(1, min=1, envvar="WORKERS", help="Concurrent API/CDN workers of images tasks."),
+    bandwidth_mb: float = typer.Option(0, min=0, envvar="BANDWIDTH_MB", help="CDN bandwidth cap of this node in MB/s (0 = unlimited)."),
+    lease: float = typer.Option(300, min=10, envvar="QUEUE_LEASE", help="Seconds a task stays reserved without a heartbeat; a crashed worker's tasks are reclaimed after it."),
+    max_attempts: int = typer.Option(3, min=1, envvar="QUEUE_MAX_ATTEMPTS", help="Claims of a task before it is parked as failed."),
+    poll: float = typer.Option(10, min=0.1, envvar="QUEUE_POLL", help="Seconds between two claims while no task is runnable."),
+    exit_when_idle: bool = typer.Option(False, envvar="QUEUE_EXIT_WHEN_IDLE", help="Exit once no task is pending or running instead of waiting for new ones."),
+):
+    """Pull grid and image tasks from the shared queue, with one API budget shared by every worker."""
+    work = WorkQueue(queue, lease=lease, max_attempts=max_attempts)
+
+    console.print("\n[bold magenta]Starting Flickr grid downloader worker[/]\n")
+    console.print("[bold cyan]Using the following configuration:[/]")
+    console.print(f"📬 [bold blue]Queue:          [/] {queue}")
+    console.print(f"🪪 [bold blue]Worker:         [/] {work.owner}")
+    console.print(f"⚡ [bold blue]Concurrency:    [/] {concurrency}")
+    console.print(f"🧵 [bold blue]Workers:        [/] {workers}")
+    console.print(f"🚦 [bold blue]Bandwidth:      [/] {f'{bandwidth_mb:g} MB/s' if bandwidth_mb else 'Unlimited'}")
+    console.print(f"⏱️  [bold blue]Lease:          [/] {lease:g}s")
+    console.print(f"🌐 [bold blue]API budget:     [/] {api_rate(ctx) * 3600:,.0f} requests/hour, shared\n")
+
+    api = build_client(ctx, max(concurrency, workers), limiter=SharedTokenBucket(work, api_rate(ctx)))
+    try:
+        Worker(work, api, cdn_url=ctx.obj["cdn_url"], concurrency=concurrency, workers=workers,
+               bandwidth=bandwidth_mb * (1 << 20), poll=poll, exit_when_idle=exit_when_idle).run()
+    finally:
+        work.close()
+
+
+@app.command("queue-status")
+def queue_status_cmd(
+    queue: Path = typer.Option(QUEUE_FILE, envvar="FLICKR_QUEUE", help=QUEUE_HELP),
+):
+    """List the tasks of the work queue with their status, owner and lease."""
+    if not queue.exists():
+        raise typer.BadParameter(f"Queue file '{queue}' does not exist. Add tasks with `fgd enqueue`.")
+    work = WorkQueue(queue)
+    tasks = work.tasks()
+    counts = work.counts()
+    work.close()
+
+    now = time.time()
+    table = Table(title=f"Work queue {queue.name}")
+    for column in ("#", "Zone", "Years", "Stage", "Status", "Owner", "Lease", "Attempts", "Error"):
+        table.add_column(column, overflow="fold")
+    for t in tasks:
+        status = t["status"]
+        if status == "leased" and t["lease_until"] < now:
+            status = "expired"
+        lease_left = f"{t['lease_until'] - now:.0f}s" if t["status"] == "leased" else ""
+        table.add_row(str(t["id"]), t["zone"], f"{t['start_year']}-{t['end_year']}", t["stage"], status,
+                      t["owner"] or "", lease_left, str(t["attempts"]), t["error"] or "")
+    console.print(table)
+    console.print(f"pending {counts['pending']} · leased {counts['leased']} · "
+                  f"done {counts['done']} · failed {counts['failed']} · blocked {counts['blocked']}")
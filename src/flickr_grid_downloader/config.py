@@ -6,27 +6,34 @@ load_dotenv()  # Reads the .env file and sets environment variables
 
 API_KEY_ENV    = "FLICKR_API_KEY"
 API_SECRET_ENV = "FLICKR_API_SECRET"
+API_KEYS_ENV      = "FLICKR_API_KEYS"
+API_KEYS_FILE_ENV = "FLICKR_API_KEYS_FILE"
+API_URL_ENV = "FLICKR_API_URL"
+CDN_URL_ENV = "FLICKR_CDN_URL"
 
 from flickr_grid_downloader.constants import (
     OUTPUT_DIR, INPUT_DIR,
-    API_BASE_TEMPLATE, API_METHODS,
+    API_BASE_TEMPLATE, API_METHODS, API_REST_URL, CDN_URL,
     C_YY, C_XY, C_YX, C_XX
 )
 
+STATE_BACKENDS = ("csv", "sqlite")
+
 @dataclass(slots=True)
 class JobConfig:
     """Info based on the user input"""
     zone: str
     start_year: int
     end_year:   int
-    api_key:    str
-    api_secret: str
+    api_key:    str | None      # None for offline commands
+    api_secret: str | None
     
     # Se rellenan en __post_init__
     zone_base: Path = field(init=False)
     json_path: Path = field(init=False)
     csv_path:  Path = field(init=False)
     img_path:  Path = field(init=False)
+    shard_path: Path = field(init=False)
     coordinates_path: Path = field(init=False)
     coordinates_file: Path = field(init=False)
     delimiter: str = field(default=",", repr=False)
@@ -38,14 +45,23 @@ class JobConfig:
     # Flag to indicate if download JSON data in custom or raw format.
     download_raw_metadata: bool = field(default=False, repr=False)
 
+    # Where the download state lives: "csv" (default) or "sqlite".
+    state_backend: str = field(default="csv", repr=False)
+
+    # Base URL of the image CDN (overridden to benchmark against a mock server).
+    cdn_url: str = field(default=CDN_URL, repr=False)
+
     def __post_init__(self) -> None:
         if self.start_year >= self.end_year:
             raise ValueError("start_year must be earlier than end_year")
+        if self.state_backend not in STATE_BACKENDS:
+            raise ValueError(f"state_backend must be one of {STATE_BACKENDS}")
 
         self.zone_base        = OUTPUT_DIR / self.zone
         self.json_path        = self.zone_base / "json"
         self.csv_path         = self.zone_base / "csv"
         self.img_path         = self.zone_base / "img"
+        self.shard_path       = self.img_path / "shards"    # created on demand (--shards)
         self.coordinates_path = INPUT_DIR
         self.coordinates_file = self.coordinates_path / f"{self.zone}_coordinates.csv"
         
@@ -59,7 +75,7 @@ class JobConfig:
     # reusable helpers --------------------------
     @property
     def api_base(self) -> str:
-        return API_BASE_TEMPLATE.format(api_key=self.api_key)
+        return API_BASE_TEMPLATE.format(rest_url=API_REST_URL, api_key=self.api_key)
 
     def api_method(self, name: str) -> str:
         return API_METHODS[name]
\ No newline at end of file
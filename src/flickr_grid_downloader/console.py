@@ -1,31 +1,227 @@
 from __future__ import annotations
 
+import atexit
 import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler
 from typing import Any
 
 from rich.console import Console
+from rich.live import Live
 from rich.logging import RichHandler
+from rich.progress_bar import ProgressBar
+from rich.table import Table
+
 
 # ---------- console «global» ----------
-console = Console(emoji=True, highlight=False)  # highlight = False increases performance a bit
+class _Console(Console):
+    """
+    Console whose prints come after the log records queued before them. While a live
+    display is up (its render hook is pushed) prints go straight out: the log writer
+    may be waiting for that display.
+    """
+    _hooks = 0
+
+    def push_render_hook(self, hook: Any) -> None:
+        super().push_render_hook(hook)
+        self._hooks += 1
+
+    def pop_render_hook(self) -> None:
+        super().pop_render_hook()
+        self._hooks -= 1
+
+    def print(self, *objects: Any, **kwargs: Any) -> None:
+        if not self._hooks:
+            flush_logs()
+        super().print(*objects, **kwargs)
+
+
+console = _Console(emoji=True, highlight=False)  # highlight = False increases performance a bit
 
 # ---------- logging ----------
 LOG_FORMAT = "%(message)s"
+PLAIN_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+class _RecordQueueHandler(QueueHandler):
+    """
+    Puts the records on the queue as they are: the message is formatted by the writer
+    thread, not by the download loop (log arguments are strings and numbers).
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _LogWriter:
+    """
+    Hands the queued log records to the output handler from a background thread, so
+    formatting and terminal writes never hold up the threads that log.
+    """
+    def __init__(self) -> None:
+        self.queue: queue.Queue[logging.LogRecord | None] = queue.Queue()
+        self.handler: logging.Handler = RichHandler(console=console, show_time=True, show_level=True)
+        self._thread = threading.Thread(target=self._loop, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            record = self.queue.get()
+            try:
+                if record is None:
+                    return
+                self.handler.handle(record)
+            except Exception:
+                self.handler.handleError(record)
+            finally:
+                self.queue.task_done()
+
+    def flush(self) -> None:
+        """Waits until the records queued so far are written."""
+        if self._thread.is_alive() and threading.current_thread() is not self._thread:
+            self.queue.join()
+
+    def stop(self) -> None:
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join()
+
+
+_writer: _LogWriter | None = None
+
 
 def get_logger(name: str | None = None, level: int = logging.INFO) -> logging.Logger:
     """
-    Returns a logger with RichHandler only the first time;
-    subsequent calls reuse the global configuration.
+    Returns a logger; the first call routes the root logger through a queue to the
+    background writer (RichHandler until `use_plain_logs`), later calls reuse it.
     """
+    global _writer
     if not logging.getLogger().handlers:  # avoid duplicate handlers
-        logging.basicConfig(
-            level=level,
-            format=LOG_FORMAT,
-            datefmt="[%X]",
-            handlers=[RichHandler(console=console, show_time=True, show_level=True)]
-        )
+        _writer = _LogWriter()
+        logging.basicConfig(level=level, format=LOG_FORMAT, datefmt="[%X]",
+                            handlers=[_RecordQueueHandler(_writer.queue)])
+        atexit.register(_writer.stop)
     return logging.getLogger(name)
 
+
+def flush_logs() -> None:
+    if _writer is not None:
+        _writer.flush()
+
+
+def use_plain_logs() -> None:
+    """Plain, unwrapped lines without colours for batch jobs and CI logs."""
+    get_logger()
+    flush_logs()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter(PLAIN_FORMAT, "%H:%M:%S"))
+    _writer.handler = handler
+
+
+# ---------- progress ----------
+class ProgressBoard:
+    """
+    Progress of the stages fed by the download loops. `update` only stores the counters
+    and the latest item (its message is formatted when it is shown); a display thread
+    reads them on its own schedule:
+    • 'live': a status table below the logs, redrawn `refresh` times per second.
+    • 'plain': one log line per active stage every `interval` seconds (batch jobs, CI).
+    • 'off': nothing (e.g. with --dashboard, which shows the stages itself).
+    """
+    MODES = ("auto", "live", "plain", "off")
+
+    def __init__(self) -> None:
+        self.mode = "off"
+        self._stages: dict[str, list[Any]] = {}     # stage → [done, total, (fmt, args)]
+        self._seen: dict[str, tuple[float, int, float]] = {}    # stage → (time, done, rate) of the last rate
+        self._started = time.monotonic()
+        self._live: Live | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._log = logging.getLogger("progress")
+
+    def update(self, stage: str, done: int, total: int | None = None, fmt: str = "", *args: Any) -> None:
+        """Hot path: records the position of a stage and, lazily, a message about its item."""
+        s = self._stages.get(stage)
+        if s is None:
+            s = self._stages[stage] = [0, None, ("", ())]
+        s[0] = done
+        if total is not None:
+            s[1] = total
+        if fmt:
+            s[2] = (fmt, args)
+
+    def start(self, mode: str = "auto", refresh: float = 4, interval: float = 10) -> ProgressBoard:
+        if mode == "auto":
+            mode = "live" if console.is_terminal else "plain"
+        self.mode = mode
+        self._started = time.monotonic()
+        if mode == "live":
+            self._live = Live(console=console, refresh_per_second=refresh, get_renderable=self._render)
+            self._live.start()
+        elif mode == "plain":
+            self._thread = threading.Thread(target=self._loop, args=(interval,), name="progress", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        if self._live:
+            self._live.stop()
+            self._live = None
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self._write_lines()
+
+    # ---------- Rendering ----------
+    RATE_WINDOW = 2.0       # seconds between two rate measurements of a stage
+
+    def _rows(self) -> list[tuple[str, int, int | None, float, str, bool]]:
+        """(stage, done, total, items per second, last item, moved since the last rate) per stage."""
+        now = time.monotonic()
+        rows = []
+        for stage, (done, total, (fmt, args)) in list(self._stages.items()):
+            # First measurement of a stage: since the board started
+            then, before, rate = self._seen.get(stage, (self._started, 0, 0.0))
+            if now - then >= self.RATE_WINDOW or stage not in self._seen:
+                rate = (done - before) / (now - then) if now > then and done >= before else 0.0
+                self._seen[stage] = (now, done, rate)
+            rows.append((stage, done, total, rate, fmt % args if fmt else "", done != before))
+        return rows
+
+    @staticmethod
+    def _eta(done: int, total: int | None, rate: float) -> str:
+        if not total or rate <= 0 or done >= total:
+            return ""
+        seconds = int((total - done) / rate)
+        return f"ETA {seconds // 3600}h{seconds % 3600 // 60:02d}m" if seconds >= 3600 else f"ETA {seconds // 60}m{seconds % 60:02d}s"
+
+    def _render(self) -> Table:
+        table = Table.grid(padding=(0, 2))
+        for stage, done, total, rate, item, _ in self._rows():
+            table.add_row(f"[bold]{stage}[/]", ProgressBar(total=total or None, completed=done, width=30),
+                          f"{done:,}/{total:,}" if total else f"{done:,}", f"{rate:.1f}/s",
+                          self._eta(done, total, rate), f"[dim]{item}[/]")
+        return table
+
+    def _write_lines(self) -> None:
+        for stage, done, total, rate, item, moved in self._rows():
+            if moved:
+                position = f"{done:,}/{total:,}" if total else f"{done:,}"
+                eta = self._eta(done, total, rate)
+                self._log.info("%s %s (%.1f/s%s)%s", stage, position, rate, f", {eta}" if eta else "",
+                               f" - {item}" if item else "")
+
+    def _loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self._write_lines()
+
+
+progress = ProgressBoard()
+
 # ---------- UX helpers ----------
 def success(msg: str, **kwargs: Any) -> None:
     console.print(f"[bold green]✔[/] {msg}", **kwargs)
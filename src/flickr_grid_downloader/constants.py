@@ -1,8 +1,11 @@
+import os
 from pathlib import Path
 
+# input/ and output/ live in the project folder, or in FLICKR_DATA_DIR when it is set
 PROJECT_DIR = Path(__file__).resolve().parent.parent.parent
-INPUT_DIR = PROJECT_DIR / "input"
-OUTPUT_DIR = PROJECT_DIR / "output"
+DATA_DIR = Path(os.environ.get("FLICKR_DATA_DIR") or PROJECT_DIR)
+INPUT_DIR = DATA_DIR / "input"
+OUTPUT_DIR = DATA_DIR / "output"
 
 INPUT_DIR.mkdir(parents=True, exist_ok=True)
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -14,10 +17,12 @@ API_METHODS = {
     "photo_info":  "flickr.photos.getInfo",
 }
 
-API_BASE_TEMPLATE = (
-    "https://www.flickr.com/services/rest/?format=json"
-    "&api_key={api_key}&method="
-)
+# REST endpoint and image CDN; both can be pointed elsewhere (e.g. the mock server
+# of benchmarks/) with FLICKR_API_URL / FLICKR_CDN_URL
+API_REST_URL = "https://www.flickr.com/services/rest/"
+CDN_URL = "https://live.staticflickr.com"
+
+API_BASE_TEMPLATE = "{rest_url}?format=json&api_key={api_key}&method="
 
 C_XX, C_YX, C_XY, C_YY = 1, 2, 5, 6
 
@@ -27,4 +32,40 @@ C_XX, C_YX, C_XY, C_YY = 1, 2, 5, 6
 # documented in various studies. To avoid truncation, refine spatial grids to ensure
 # no single cell exceeds this threshold.
 FLICKR_PAGINATION_LIMIT = 4000
-FLICKR_WARNING_THRESHOLD = 3500  # Warn when approaching the limit
\ No newline at end of file
+FLICKR_WARNING_THRESHOLD = 3500  # Warn when approaching the limit
+FLICKR_PER_PAGE = 100            # Default (unset) page size of the search
+# Flickr API rate limit
+# Non-commercial API keys are allowed 3,600 queries per hour. Every call to the REST
+# endpoint counts against it; downloads from the static CDN do not.
+FLICKR_REQUESTS_PER_HOUR = 3600
+
+# Search extras
+# Requested by `download-grid --lean` so `download-images` can build the photo record
+# without one flickr.photos.getInfo call per photo.
+SEARCH_EXTRAS = ",".join([
+    "description", "date_upload", "date_taken", "owner_name", "original_format",
+    "geo", "tags", "views", "url_b", "url_h", "url_k", "o_dims",
+])
+
+# Default location of the on-disk API response cache (`--cache`)
+CACHE_DIR = OUTPUT_DIR / "cache"
+
+# Transient API failures
+# HTTP statuses and Flickr error codes (`stat: fail`) worth retrying with backoff:
+# 10 = search API not currently available, 105 = service currently unavailable,
+# 106 = write operation failed.
+RETRY_HTTP_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_FLICKR_CODES = frozenset({10, 105, 106})
+
+# Per-key request accounting of the API key pool (`--api-keys`), kept across runs
+KEY_USAGE_FILE = OUTPUT_DIR / "api_key_usage.json"
+
+# Root of the partitioned Parquet dataset written by `fgd export`
+# (zone=<zone>/box_id=<box_id>/year=<year>/part-0.parquet)
+PARQUET_DIR = OUTPUT_DIR / "parquet"
+
+# Content index shared by every zone (`--dedup`): photo id and sha256 → stored image
+CONTENT_INDEX_FILE = OUTPUT_DIR / "content_index.sqlite"
+
+# Work queue shared by `fgd worker` processes (tasks, leases and the global API budget)
+QUEUE_FILE = OUTPUT_DIR / "queue.sqlite"
@@ -0,0 +1,171 @@
+from __future__ import annotations
+import math
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator
+
+from flickr_grid_downloader.config import JobConfig
+from flickr_grid_downloader.console import get_logger, progress
+from flickr_grid_downloader.constants import API_METHODS, FLICKR_PAGINATION_LIMIT, FLICKR_PER_PAGE
+from flickr_grid_downloader.tools.grid_downloader import ZoneDownloader, read_cells
+from flickr_grid_downloader.tools.image_downloader import ImageDownloader
+from flickr_grid_downloader.utils.cell_plan import CellPlan
+from flickr_grid_downloader.utils.flickr_client import FlickrClient
+from flickr_grid_downloader.utils.image_size import SIZES, SizePolicy
+from flickr_grid_downloader.utils.metrics import metrics
+
+log = get_logger(__name__)
+
+BYTES_PER_PIXEL = 0.25          # typical JPEG size of a Flickr photo, per pixel
+ORIGINAL_PIXELS = 12_000_000    # assumed size of an original ('o')
+
+
+@dataclass(frozen=True, slots=True)
+class CostEstimate:
+    """Requests, bytes and wall time of the two stages of a zone, from its probed totals."""
+    cells: int
+    probed: int
+    empty: int
+    over_cap: int
+    photos: int                 # photos the search will find (capped per cell without --adaptive)
+    lost: int                   # photos over the cap of a cell, not reachable without --adaptive
+    search_requests: int
+    info_requests: int
+    image_bytes: int
+    search_seconds: float
+    image_seconds: float
+
+    @property
+    def seconds(self) -> float:
+        return self.search_seconds + self.image_seconds
+
+
+def image_bytes(size: SizePolicy) -> int:
+    """Average bytes of an image of the size policy (4:3 photos)."""
+    if size.limit == float("inf"):
+        return int(ORIGINAL_PIXELS * BYTES_PER_PIXEL)
+    side = max(s for s in SIZES.values() if s <= size.limit)
+    return int(side * side * 0.75 * BYTES_PER_PIXEL)
+
+
+class CellPlanner:
+    """
+    Probes the photo total of every cell of a zone with one-result searches
+    (`per_page=1`: one request per cell whatever its density) and records them in the
+    CellPlan of the zone. Probes go through the client, so they are rate limited and,
+    with `--cache`, answered from the response cache on later runs; cells already in the
+    plan are not probed again unless `refresh` is set.
+    """
+    BATCH = 100         # probed totals appended to the plan at once
+
+    def __init__(self, cfg: JobConfig, api: FlickrClient, cells: Iterable[tuple[str, str]] | None = None) -> None:
+        """:param cells: Cells to probe instead of the coordinates file (e.g. a generated Grid)."""
+        self.cfg = cfg
+        self.api = api
+        self.cells = cells
+        self.plan = CellPlan.for_zone(cfg.csv_path, cfg.start_year, cfg.end_year)
+        self.failed = 0
+
+    def _cells(self) -> Iterator[tuple[int, str, str]]:
+        if self.cells is None:
+            return read_cells(self.cfg)
+        return ((idx, box_id, bbox) for idx, (box_id, bbox) in enumerate(self.cells, start=1))
+
+    def _params(self, bbox: str) -> dict[str, Any]:
+        # Same date range as the crawl; with --cache a repeated probe is answered from the cache
+        params: dict[str, Any] = ZoneDownloader._date_range_params(self.cfg)
+        params.update(bbox=bbox, per_page=1, page=1)
+        return params
+
+    def _probe(self, box_id: str, bbox: str) -> tuple[str, int | None]:
+        try:
+            data = ZoneDownloader._check_response(self.api.search_photos(**self._params(bbox)))
+            return box_id, int(data["photos"]["total"])
+        except Exception as exc:
+            log.error("Error probing grid %s → %s", box_id, exc)
+            return box_id, None
+
+    def probe(self, concurrency: int = 1, refresh: bool = False) -> int:
+        """
+        Probes the cells missing from the plan (every cell with `refresh`), `concurrency`
+        at a time. Failed probes are left out of the plan, so the next run tries them again.
+        :return: Cells probed.
+        """
+        todo = [(box_id, bbox) for _, box_id, bbox in self._cells()
+                if refresh or self.plan.total(box_id) is None]
+        metrics.progress("plan", 0, len(todo))
+        progress.update("plan", 0, len(todo))
+        log.info("Zone %s: probing %d cells", self.cfg.zone, len(todo))
+
+        batch: list[tuple[str, int]] = []
+        with ThreadPoolExecutor(concurrency, thread_name_prefix="probe") as pool:
+            for done, (box_id, total) in enumerate(pool.map(lambda cell: self._probe(*cell), todo), start=1):
+                metrics.progress("plan", done)
+                progress.update("plan", done, None, "grid %s", box_id)
+                if total is None:
+                    self.failed += 1
+                    continue
+                batch.append((box_id, total))
+                if len(batch) >= self.BATCH:
+                    self.plan.add(batch)
+                    batch = []
+        if batch:
+            self.plan.add(batch)
+        return len(todo) - self.failed
+
+    def densest(self, n: int = 10) -> list[tuple[str, int]]:
+        """The `n` cells of the zone with the most photos."""
+        totals = [(box_id, self.plan.total(box_id)) for _, box_id, _ in self._cells()]
+        return sorted(((b, t) for b, t in totals if t is not None), key=lambda bt: -bt[1])[:n]
+
+    def estimate(self, rate: float, *, adaptive: bool = False, lean: bool = False, size: SizePolicy = SizePolicy(),
+                 concurrency: int = 1, workers: int = 1, bandwidth: float = 0, avg_image: int | None = None) -> CostEstimate:
+        """
+        Cost of `download-grid` then `download-images` for the probed cells:
+        • Search: one request per page of 100; an adaptive cell over the cap adds one probe
+          per partition (4-way splits) and a partly filled last page per leaf.
+        • Images: one getInfo per photo unless `lean`, and `avg_image` bytes per photo
+          (by default estimated from the image size).
+        • Time: the slowest of the API budget (`rate` requests per second), the measured
+          search latency over the requests in flight, the sequential-mode sleeps and the
+          CDN bandwidth (bytes per second, 0 = unlimited).
+        Photos are counted per cell; the images stage downloads duplicates only once.
+        """
+        cells = probed = empty = over_cap = photos = lost = pages = 0
+        for _, box_id, _ in self._cells():
+            cells += 1
+            total = self.plan.total(box_id)
+            if total is None:
+                continue
+            probed += 1
+            if total == 0:
+                empty += 1
+                continue
+            if total > FLICKR_PAGINATION_LIMIT:
+                over_cap += 1
+                if adaptive:
+                    leaves = math.ceil(2 * total / FLICKR_PAGINATION_LIMIT)     # leaves end up about half full
+                    pages += math.ceil(total / FLICKR_PER_PAGE) + leaves + (leaves - 1) // 3
+                    photos += total
+                    continue
+                lost += total - FLICKR_PAGINATION_LIMIT
+                total = FLICKR_PAGINATION_LIMIT
+            pages += math.ceil(total / FLICKR_PER_PAGE)
+            photos += total
+
+        info = 0 if lean else photos
+        latency = self._latency()
+        search = max(pages / rate, pages * latency / concurrency)
+        if concurrency == 1:
+            search = max(search, (probed - empty) * ZoneDownloader.SLEEP)
+        nbytes = photos * (avg_image if avg_image is not None else image_bytes(size))
+        images = max(info / rate, info * latency / workers, nbytes / bandwidth if bandwidth else 0)
+        if workers == 1:
+            images = max(images, photos * ImageDownloader.SLEEP)
+        return CostEstimate(cells, probed, empty, over_cap, photos, lost, pages, info, nbytes, search, images)
+
+    @staticmethod
+    def _latency() -> float:
+        """Mean search latency measured by the probes of this run (0 when none was sent)."""
+        histogram = metrics.histogram("api_request_seconds", method=API_METHODS["photo_search"])
+        return (histogram.mean() if histogram else None) or 0.0
@@ -1,9 +1,13 @@
 from __future__ import annotations
 import csv
+import tempfile
+from array import array
+from heapq import merge
 from pathlib import Path
-from typing import Iterable, Sequence
+from typing import BinaryIO, Iterator
 
 from flickr_grid_downloader.console import get_logger
+from flickr_grid_downloader.utils.id_index import PhotoIdIndex, iter_csv_from
 
 log = get_logger(__name__)
 
@@ -12,7 +16,14 @@ class DuplicateCleaner:
     Deduplicates the results CSV:
     • Keeps the first occurrence of each photo_id.
     • Creates a *_cleaned.csv* file without repetitions.
+    • Keeps the seen ids in a compact index (*_cleaned.csv.idx*) together with how much
+      of the input it covers, so later runs only process the rows appended since.
+    • Inputs larger than MAX_IN_MEMORY_BYTES are rebuilt with an external sort.
     """
+    MAX_IN_MEMORY_BYTES = 1 << 30     # input size above which a full rebuild sorts on disk
+    RUN_SIZE = 500_000                # (id, row) pairs per sorted run in the external path
+    CHUNK = 65_536                    # ids per read/write block in the external path
+
     def __init__(self, in_path: Path, out_path: Path) -> None:
         """
         Initializes the DuplicateCleaner with input and output file paths.
@@ -23,36 +34,143 @@ class DuplicateCleaner:
             raise FileNotFoundError(f"Input file '{in_path}' does not exist.")
         self.in_path  = in_path
         self.out_path = out_path
+        self.idx_path = out_path.with_name(out_path.name + ".idx")
 
-    def _write_rows(self, rows: Iterable[Sequence[str]]) -> None:
+    def _load_index(self) -> PhotoIdIndex | None:
         """
-        Writes the given rows to the output CSV file.
-        If the file already exists, it will be overwritten.
+        Returns the saved index when the input and the cleaned file can be extended,
+        truncating rows written to the cleaned file after the index was last saved.
         """
-        with self.out_path.open("w", newline="") as f:
-            csv.writer(f).writerows(rows)
+        index = PhotoIdIndex.load(self.idx_path)
+        if index is None or not index.matches(self.in_path) or not self.out_path.exists():
+            return None
+
+        out_size = self.out_path.stat().st_size
+        if out_size < index.out_size:
+            return None
+        if out_size > index.out_size:          # interrupted run: drop rows not covered by the index
+            with self.out_path.open("r+b") as f:
+                f.truncate(index.out_size)
+        return index
 
     def clean(self) -> Path:
         """
-        Reads the input CSV, removes duplicate photo_ids, and writes the cleaned data to the output CSV.
-        Returns the path to the cleaned CSV file.
+        Streams the new input rows, writes the ones with unseen photo_ids to the output CSV
+        and saves the index. Returns the path to the cleaned CSV file.
         """
-        seen: set[str] = set()
-        deduped: list[Sequence[str]] = []
+        index = self._load_index()
+        if index is None and self.in_path.stat().st_size > self.MAX_IN_MEMORY_BYTES:
+            return self._clean_external()
 
-        with self.in_path.open() as f:
-            reader = csv.reader(f)
+        mode = "a" if index else "w"
+        index = index or PhotoIdIndex()
+        read = kept = 0
+
+        with self.out_path.open(mode, newline="") as f:
+            writer = csv.writer(f)
 
             # Data does not have a header, so we start reading directly
-            for row in reader:
-                photo_id = row[2]             # 'id' column is at index 2
-                if photo_id in seen:
-                    continue
-                seen.add(photo_id)
-                deduped.append(row)
-
-        self._write_rows(deduped)
-        log.info("Cleaned: %s → %s (‑%d rows)",
-                 self.in_path.name, self.out_path.name,
-                 len(list(csv.reader(self.in_path.open()))) - len(deduped))
-        return self.out_path
\ No newline at end of file
+            for row, end in iter_csv_from(self.in_path, index.offset):
+                read += 1
+                if index.add(row[2]):             # 'id' column is at index 2
+                    writer.writerow(row)
+                    kept += 1
+                index.offset = end
+
+        index.out_size = self.out_path.stat().st_size
+        index.save(self.idx_path, self.in_path)
+
+        log.info("Cleaned: %s → %s (+%d rows, ‑%d duplicates)",
+                 self.in_path.name, self.out_path.name, kept, read - kept)
+        return self.out_path
+
+    # ---------- External sort ----------
+    def _write_run(self, pairs: list[tuple[int, int]], tmp_dir: Path, n: int) -> Path:
+        pairs.sort()
+        path = tmp_dir / f"run_{n}.bin"
+        with path.open("wb") as f:
+            array("q", (v for pair in pairs for v in pair)).tofile(f)
+        return path
+
+    def _read_run(self, f: BinaryIO) -> Iterator[tuple[int, int]]:
+        while True:
+            block = array("q")
+            try:
+                block.fromfile(f, 2 * self.CHUNK)
+            except EOFError:
+                pass        # last, shorter block
+            if not block:
+                return
+            yield from zip(block[::2], block[1::2])
+
+    def _clean_external(self) -> Path:
+        """
+        Full rebuild in bounded memory:
+        1. Spill sorted runs of (photo_id, row number) to disk.
+        2. Merge the runs; the first row of each id is flagged in a bitmap (1 bit per row)
+           and the unique ids are streamed into the index file.
+        3. Copy the flagged rows to the output in their original order.
+        """
+        with tempfile.TemporaryDirectory(dir=self.out_path.parent) as tmp:
+            tmp_dir = Path(tmp)
+            runs: list[Path] = []
+            pairs: list[tuple[int, int]] = []
+            rows = offset = 0
+
+            for row, offset in iter_csv_from(self.in_path):
+                pairs.append((int(row[2]), rows))
+                rows += 1
+                if len(pairs) >= self.RUN_SIZE:
+                    runs.append(self._write_run(pairs, tmp_dir, len(runs)))
+                    pairs = []
+            if pairs:
+                runs.append(self._write_run(pairs, tmp_dir, len(runs)))
+            del pairs
+
+            keep = bytearray((rows + 7) // 8)
+            ids_path = tmp_dir / "ids.bin"
+            unique = 0
+            files = [path.open("rb") for path in runs]
+            try:
+                with ids_path.open("wb") as out:
+                    block, previous = array("q"), None
+                    for photo_id, row_no in merge(*(self._read_run(f) for f in files)):
+                        if photo_id == previous:
+                            continue
+                        previous = photo_id
+                        keep[row_no >> 3] |= 1 << (row_no & 7)
+                        block.append(photo_id)
+                        unique += 1
+                        if len(block) >= self.CHUNK:
+                            block.tofile(out); block = array("q")
+                    block.tofile(out)
+            finally:
+                for f in files:
+                    f.close()
+
+            with self.out_path.open("w", newline="") as f:
+                writer = csv.writer(f)
+                for row_no, (row, _) in enumerate(iter_csv_from(self.in_path)):
+                    if row_no >= rows:
+                        break       # appended while we were sorting; picked up next run
+                    if keep[row_no >> 3] & (1 << (row_no & 7)):
+                        writer.writerow(row)
+
+            def id_chunks() -> Iterator[array]:
+                with ids_path.open("rb") as f:
+                    while True:
+                        chunk = array("q")
+                        try:
+                            chunk.fromfile(f, self.CHUNK)
+                        except EOFError:
+                            pass
+                        if not chunk:
+                            return
+                        yield chunk
+
+            PhotoIdIndex.write(self.idx_path, self.in_path, offset,
+                               self.out_path.stat().st_size, unique, id_chunks())
+
+        log.info("Cleaned (external sort, %d runs): %s → %s (‑%d rows)",
+                 len(runs), self.in_path.name, self.out_path.name, rows - unique)
+        return self.out_path
@@ -1,98 +1,307 @@
 from __future__ import annotations
-import csv, time
-from pathlib import Path
-from typing import Sequence
+import asyncio, csv, json, threading, time
+from typing import Any, Callable, Iterable, Iterator, Sized
 
 from flickr_grid_downloader.config import JobConfig
 from flickr_grid_downloader.utils.flickr_client import FlickrClient
-from flickr_grid_downloader.console import get_logger
-from flickr_grid_downloader.constants import FLICKR_PAGINATION_LIMIT, FLICKR_WARNING_THRESHOLD
+from flickr_grid_downloader.utils.async_flickr_client import AsyncFlickrClient
+from flickr_grid_downloader.utils.metrics import metrics
+from flickr_grid_downloader.console import get_logger, progress
+from flickr_grid_downloader.constants import FLICKR_PAGINATION_LIMIT, FLICKR_WARNING_THRESHOLD, SEARCH_EXTRAS
+from flickr_grid_downloader.utils.cell_plan import CellPlan
+from flickr_grid_downloader.utils.partition import Partition
+from flickr_grid_downloader.utils.state_store import StateStore, open_state
+from flickr_grid_downloader.utils.trace import tracer
 
 log = get_logger(__name__)
 
 
+def read_cells(cfg: JobConfig) -> Iterator[tuple[int, str, str]]:
+    """Yields (position, box_id, bbox) for every cell of the coordinates file of the zone."""
+    with cfg.coordinates_file.open() as f:
+        reader = csv.reader(f, delimiter=cfg.delimiter)
+        next(reader)                   # ignore header row
+
+        for idx, row in enumerate(reader, start=1):
+            yield idx, row[0], f"{row[cfg.xx_column]},{row[cfg.yx_column]},{row[cfg.xy_column]},{row[cfg.yy_column]}"
+
+
 class ZoneDownloader:
     SLEEP = 0.7          # seg entre peticiones; evita rate-limit
 
-    def __init__(self, cfg: JobConfig, api: FlickrClient) -> None:
+    # Search fields already stored in their own results columns
+    RESULT_COLUMNS = ("id", "owner", "secret", "title")
+
+    def __init__(self, cfg: JobConfig, api: FlickrClient, adaptive: bool = False, lean: bool = False,
+                 state: StateStore | None = None,
+                 on_results: Callable[[list[list[str]]], None] | None = None,
+                 cells: Iterable[tuple[str, str]] | None = None,
+                 plan: CellPlan | None = None, order: str = "file") -> None:
         """
         Initializes the ZoneDownloader with a configuration and an API client.
         :param cfg: JobConfig containing zone and API credentials.
         :param api: FlickrClient instance for making API requests.
+        :param adaptive: Split cells over the pagination limit into smaller partitions.
+        :param lean: Request SEARCH_EXTRAS and store them as a JSON 7th column of the results,
+                     so `download-images` can skip the per-photo getInfo call.
+        :param state: Where checked cells and results are stored. Defaults to the backend
+                      selected in the configuration (a state passed in is not closed by `run`).
+        :param on_results: Called with the result rows of every page once they are stored
+                           (e.g. to stream them to the image downloader). May block.
+        :param cells: (box_id, 'min_lon,min_lat,max_lon,max_lat') of every cell, instead of
+                      the coordinates file (e.g. a generated Grid). Iterated on every pass,
+                      so it must not be a one-shot iterator.
+        :param plan: Probed totals of the cells (see `fgd plan`). Cells with a total of 0
+                     are recorded as checked without searching them.
+        :param order: Order of the crawl with a plan: 'file', 'largest' first or at/over
+                      the pagination 'cap' first (see CellPlan.order).
         """
+        if order != "file" and plan is None:
+            raise ValueError(f"order '{order}' needs a plan of the cells (fgd plan)")
 
         self.cfg = cfg
         self.api = api
+        self.adaptive = adaptive
+        self.lean = lean
+        self.state = state or open_state(cfg.csv_path, cfg.start_year, cfg.end_year, cfg.state_backend)
+        self._owns_state = state is None
+        self.on_results = on_results
+        self.stop = threading.Event()        # set (from any thread) to search no further cells
+        self._marks: dict[str, int] = {}     # box_id → latest upload seen in this run
 
         # paths derived from the configuration.
         self.bbox_csv  = cfg.coordinates_file
-        self.done_csv  = cfg.csv_path / f"checked_grids_{cfg.start_year}_{cfg.end_year}.csv"
-        self.results   = cfg.csv_path / f"results_{cfg.start_year}_{cfg.end_year}.csv"
+        self.cells = cells
+        self.plan = plan
+        self.order = order
+        self.skipped_empty = 0
 
         self.xx = cfg.xx_column
         self.yx = cfg.yx_column
         self.xy = cfg.xy_column
         self.yy = cfg.yy_column
 
-        # Create directories if they don't exist
-        self.results.parent.mkdir(parents=True, exist_ok=True)
-
-    def _load_done(self) -> set[str]:
-        """Load the done CSV file and return a set of processed box IDs."""
-        if not self.done_csv.exists():
-            return set()
-        with self.done_csv.open() as f:
-            return {row[0] for row in csv.reader(f)}
-
-    def _append_row(self, path: Path, row: Sequence[str]) -> None:
-        """Append a row to the CSV file, creating it if it doesn't exist."""
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with path.open("a", newline="") as f:
-            csv.writer(f).writerow(row)
-
-    def _date_range_params(self) -> dict[str, str]:
-        """Returns the date range parameters for the API request."""
+    @staticmethod
+    def _date_range_params(cfg: JobConfig) -> dict[str, str]:
+        """Returns the date range parameters for the API request (also used by the planner probes)."""
         return {
-            "min_taken_date": f"{self.cfg.start_year}-01-01 00:00:00",
-            "max_taken_date": f"{self.cfg.end_year}-12-31 23:59:59",
+            "min_taken_date": f"{cfg.start_year}-01-01 00:00:00",
+            "max_taken_date": f"{cfg.end_year}-12-31 23:59:59",
             "sort": "date-posted-asc",
         }
 
-    def check_zone(self, box_id: str, bbox: str) -> None:
-        """Downloads photos for a given bounding box."""
-        page, pages, total = 1, 1, 0
+    def _search_params(self) -> dict[str, str]:
+        """
+        Returns the parameters shared by every search request of the zone.
+        `date_upload` is always requested to keep the upload high-water mark of each cell.
+        """
+        params = self._date_range_params(self.cfg)
+        params["extras"] = SEARCH_EXTRAS if self.lean else "date_upload"
+        return params
+
+    def _result_row(self, box_id: str, page: int, p: dict[str, Any]) -> list[str]:
+        """Builds the results CSV row of a search record."""
+        row = [box_id, str(page), p["id"], p["owner"], p["secret"], p["title"]]
+        if self.lean:
+            extras = {k: v for k, v in p.items() if k not in self.RESULT_COLUMNS}
+            row.append(json.dumps(extras, separators=(",", ":")))
+        return row
+
+    @staticmethod
+    def _check_response(data: dict[str, Any]) -> dict[str, Any]:
+        """Raises on empty or failed API responses."""
+        if not data:
+            raise ValueError("Empty response from Flickr API")
+        if data['stat'] != 'ok':
+            raise ValueError(f"Flickr API error: {data.get('message', 'Unknown error')}")
+        return data
+
+    @staticmethod
+    def _trace_page(cell_id: str, page: int, start: float, data: dict[str, Any] | None) -> None:
+        """Records a search page (with its retries) in the trace; `data` is None on errors."""
+        if data is None:
+            tracer.event("page", time.perf_counter() - start, cell=cell_id, page=page, status="error")
+        else:
+            tracer.event("page", time.perf_counter() - start, cell=cell_id, page=page, status="ok",
+                         photos=len(data["photos"]["photo"]))
+
+    def _search_page(self, params: dict[str, Any], page: int, cell_id: str) -> dict[str, Any]:
+        """Fetches one page of search results, raising on API errors."""
+        start, data = time.perf_counter(), None
+        try:
+            data = self._check_response(self.api.search_photos(**params, page=page))
+            return data
+        finally:
+            self._trace_page(cell_id, page, start, data)
+
+    def _store_page(self, box_id: str, cell_id: str, page: int, data: dict[str, Any]) -> tuple[int, int]:
+        """
+        Stores the photos of a results page and checkpoints the page.
+        :return: (total pages of the search, photos in this page)
+        """
+        meta  = data["photos"]
+        pages = meta["pages"]
+        photos = meta["photo"]
+
+        rows = [self._result_row(box_id, page, p) for p in photos]
+        uploads = [int(p["dateupload"]) for p in photos if p.get("dateupload")]
+        if uploads:
+            self._marks[box_id] = max(self._marks.get(box_id, 0), *uploads)
+
+        start = time.perf_counter()
+        self.state.add_results(rows)
+        self.state.mark_page(cell_id, page, pages, len(photos))
+        tracer.event("write", time.perf_counter() - start, what="page", cell=cell_id, page=page, rows=len(rows))
+        metrics.inc("pages_total")
+        metrics.inc("photos_found_total", len(photos))
+        if self.on_results and rows:
+            self.on_results(rows)
+        return pages, len(photos)
+
+    def _fetch_pages(self, box_id: str, params: dict[str, Any],
+                     first: dict[str, Any] | None = None, cell_id: str | None = None) -> tuple[int, bool]:
+        """
+        Pages through a search and stores every photo in the results.
+        Pages already checkpointed for the cell are not requested again, and a page that
+        still fails after the client retries is left for `retry_failed`.
+        :param first: Page 1, when it was already fetched (e.g. by a probe).
+        :param cell_id: Id used for page checkpoints (the box id unless it is a partition).
+        :return: (number of photos, had_errors)
+        """
+        cell_id = cell_id or box_id
+        done = self.state.fetched_pages(cell_id)
+        total = sum(count for _, count in done.values())
         had_errors = False
 
-        while page <= pages:
-            params = {
-                **self._date_range_params(),
-                "bbox": bbox,
-                "page": page,
-            }
+        if 1 in done:
+            pages = done[1][0]
+        else:
+            try:
+                pages, found = self._store_page(box_id, cell_id, 1, first or self._search_page(params, 1, cell_id))
+                total += found
+            except Exception as exc:
+                log.error("Error in grid %s page %s → %s", box_id, 1, exc)
+                return total, True
+
+        for page in range(2, pages + 1):
+            if page in done:
+                continue
             try:
-                data = self.api.search_photos(**params)
-
-                if not data:
-                    log.warning("No photos found in grid %s page %s", box_id, page)
-                if data['stat'] != 'ok':
-                    raise ValueError(f"Flickr API error: {data.get('message', 'Unknown error')}")
-
-                meta  = data["photos"]
-                pages = meta["pages"]
-                photos = meta["photo"]
-
-                for p in photos:
-                    self._append_row(
-                        self.results,
-                        [box_id, str(page), p["id"], p["owner"], p["secret"], p["title"]],
-                    )
-                total += len(photos)
-                page += 1
+                total += self._store_page(box_id, cell_id, page, self._search_page(params, page, cell_id))[1]
             except Exception as exc:
                 had_errors = True
                 log.error("Error in grid %s page %s → %s", box_id, page, exc)
-                break # change this line for break the loop on error in case you want to raise an exception
 
+        return total, had_errors
+
+    def _split(self, box_id: str, part: Partition, probe: dict[str, Any]) -> list[Partition]:
+        """Returns the children of a partition over the pagination limit, or [] for a leaf."""
+        count = int(probe["photos"]["total"])
+        if count <= FLICKR_PAGINATION_LIMIT:
+            return []
+        children = part.split()
+        if children:
+            log.info("Grid %s: %d photos in %s, splitting in %d", box_id, count, part.key, len(children))
+        else:
+            log.warning("Grid %s partition %s cannot be split further (%d photos)", box_id, part.key, count)
+        return children
+
+    def _mark_leaf(self, leaf_id: str, part: Partition, found: int, errors: bool) -> None:
+        self.state.mark_cell([leaf_id, str(found), str(errors),
+                              part.bbox, part.min_taken_date, part.max_taken_date])
+
+    def _check_partitions(self, box_id: str, bbox: str) -> tuple[int, bool]:
+        """
+        Adaptive search: probes the total of each partition with its first page and
+        splits it (quadrants, then date halves) until it fits under the pagination limit.
+        Finished leaves are checkpointed as '<box_id>#<partition key>' rows.
+        """
+        total, had_errors = 0, False
+        stack = [Partition.from_bbox(bbox, self.cfg.start_year, self.cfg.end_year)]
+
+        while stack:
+            part = stack.pop()
+            leaf_id = f"{box_id}#{part.key}"
+            if self.state.is_cell_done(leaf_id):
+                continue
+
+            params = {**self._search_params(), **part.params()}
+            try:
+                probe = self._search_page(params, 1, leaf_id)
+            except Exception as exc:
+                had_errors = True
+                log.error("Error probing grid %s partition %s → %s", box_id, part.key, exc)
+                continue
+
+            children = self._split(box_id, part, probe)
+            if children:
+                stack.extend(reversed(children))
+                continue
+
+            found, errors = self._fetch_pages(box_id, params, first=probe, cell_id=leaf_id)
+            self._mark_leaf(leaf_id, part, found, errors)
+            total += found
+            had_errors |= errors
+
+        return total, had_errors
+
+    def check_zone(self, box_id: str, bbox: str) -> None:
+        """Downloads photos for a given bounding box."""
+        if self.adaptive:
+            total, had_errors = self._check_partitions(box_id, bbox)
+        else:
+            total, had_errors = self._fetch_pages(box_id, {**self._search_params(), "bbox": bbox})
+            self._warn_truncation(box_id, total)
+
+        # Register the completion of the box
+        self.state.mark_cell([box_id, str(total), str(had_errors)])
+        self._save_mark(box_id, had_errors)
+        metrics.inc("cells_total", outcome="error" if had_errors else "ok")
+
+    def _save_mark(self, box_id: str, had_errors: bool) -> int | None:
+        """
+        Stores the latest upload seen in the cell. Skipped after errors: results are sorted
+        by upload date, so a missing page may hold uploads older than the mark.
+        """
+        mark = self._marks.pop(box_id, None)
+        if mark is not None and not had_errors:
+            self.state.mark_upload(box_id, mark)
+        return mark
+
+    def _delta_params(self, bbox: str, mark: int) -> dict[str, Any]:
+        # min_upload_date is inclusive: photos uploaded in the mark second are fetched again
+        return {**self._search_params(), "bbox": bbox, "min_upload_date": mark}
+
+    def _next_mark(self, box_id: str, mark: int, found: int, errors: bool) -> int | None:
+        """
+        Records the mark after a delta search and drops its page checkpoints, so the next
+        sync from the same mark searches again. Returns the mark to continue from when the
+        delta hit the pagination limit (the rest are newer uploads), else None.
+        """
+        new_mark = self._save_mark(box_id, errors) or mark
+        if not errors:
+            self.state.clear_pages(f"{box_id}@{mark}")
+        if errors or found < FLICKR_PAGINATION_LIMIT or new_mark <= mark:
+            return None
+        log.info("Grid %s: %d new photos, continuing from upload %d", box_id, found, new_mark)
+        return new_mark
+
+    def sync_zone(self, box_id: str, bbox: str, mark: int) -> None:
+        """
+        Delta search of a checked cell: only photos uploaded since its high-water mark.
+        Page checkpoints are kept per mark ('<box_id>@<mark>') until the delta completes,
+        so an interrupted sync resumes with the missing pages; the cell row is not rewritten.
+        """
+        total = 0
+        next_mark: int | None = mark
+        while next_mark is not None:
+            mark = next_mark
+            found, errors = self._fetch_pages(box_id, self._delta_params(bbox, mark), cell_id=f"{box_id}@{mark}")
+            total += found
+            next_mark = self._next_mark(box_id, mark, found, errors)
+        log.info("Grid %s: %d photos uploaded since the last run", box_id, total)
+
+    def _warn_truncation(self, box_id: str, total: int) -> None:
         # Check for potential truncation due to Flickr API pagination limits
         if total >= FLICKR_PAGINATION_LIMIT:
             log.warning(
@@ -107,27 +316,274 @@ class ZoneDownloader:
                 box_id, total
             )
 
-        # Register the completion of the box
-        self._append_row(self.done_csv, [box_id, str(total), str(had_errors)])
+    # ---------- asyncio engine ----------
+    async def _search_page_async(self, aapi: AsyncFlickrClient, params: dict[str, Any], page: int,
+                                 cell_id: str) -> dict[str, Any]:
+        start, data = time.perf_counter(), None
+        try:
+            data = self._check_response(await aapi.search_photos(**params, page=page))
+            return data
+        finally:
+            self._trace_page(cell_id, page, start, data)
+
+    async def _fetch_pages_async(self, aapi: AsyncFlickrClient, box_id: str, params: dict[str, Any],
+                                 first: dict[str, Any] | None = None,
+                                 cell_id: str | None = None) -> tuple[int, bool]:
+        """
+        Async `_fetch_pages`: page 1 reveals `pages`, then the missing pages are requested
+        concurrently. Pages are stored in order; a failed page does not stop the others.
+        """
+        cell_id = cell_id or box_id
+        done = self.state.fetched_pages(cell_id)
+        total = sum(count for _, count in done.values())
+        had_errors = False
+
+        if 1 in done:
+            pages = done[1][0]
+        else:
+            try:
+                first = first or await self._search_page_async(aapi, params, 1, cell_id)
+                pages, found = self._store_page(box_id, cell_id, 1, first)
+                total += found
+            except Exception as exc:
+                log.error("Error in grid %s page %s → %s", box_id, 1, exc)
+                return total, True
+
+        missing = [page for page in range(2, pages + 1) if page not in done]
+        results = await asyncio.gather(
+            *(self._search_page_async(aapi, params, page, cell_id) for page in missing),
+            return_exceptions=True,
+        )
+        for page, data in zip(missing, results):
+            try:
+                if isinstance(data, BaseException):
+                    raise data
+                total += self._store_page(box_id, cell_id, page, data)[1]
+            except Exception as exc:
+                had_errors = True
+                log.error("Error in grid %s page %s → %s", box_id, page, exc)
+
+        return total, had_errors
+
+    async def _check_partitions_async(self, aapi: AsyncFlickrClient, box_id: str, bbox: str) -> tuple[int, bool]:
+        """Async `_check_partitions`: sibling partitions are probed and paged concurrently."""
+        async def visit(part: Partition) -> tuple[int, bool]:
+            leaf_id = f"{box_id}#{part.key}"
+            if self.state.is_cell_done(leaf_id):
+                return 0, False
+
+            params = {**self._search_params(), **part.params()}
+            try:
+                probe = await self._search_page_async(aapi, params, 1, leaf_id)
+            except Exception as exc:
+                log.error("Error probing grid %s partition %s → %s", box_id, part.key, exc)
+                return 0, True
+
+            children = self._split(box_id, part, probe)
+            if children:
+                parts = await asyncio.gather(*(visit(child) for child in children))
+                return sum(n for n, _ in parts), any(e for _, e in parts)
+
+            found, errors = await self._fetch_pages_async(aapi, box_id, params, first=probe, cell_id=leaf_id)
+            self._mark_leaf(leaf_id, part, found, errors)
+            return found, errors
+
+        return await visit(Partition.from_bbox(bbox, self.cfg.start_year, self.cfg.end_year))
+
+    async def check_zone_async(self, aapi: AsyncFlickrClient, box_id: str, bbox: str) -> None:
+        """Async `check_zone`. The cell is registered only once all its pages are stored."""
+        if self.adaptive:
+            total, had_errors = await self._check_partitions_async(aapi, box_id, bbox)
+        else:
+            total, had_errors = await self._fetch_pages_async(aapi, box_id, {**self._search_params(), "bbox": bbox})
+            self._warn_truncation(box_id, total)
+
+        self.state.mark_cell([box_id, str(total), str(had_errors)])
+        self._save_mark(box_id, had_errors)
+        metrics.inc("cells_total", outcome="error" if had_errors else "ok")
+
+    async def sync_zone_async(self, aapi: AsyncFlickrClient, box_id: str, bbox: str, mark: int) -> None:
+        """Async `sync_zone`."""
+        total = 0
+        next_mark: int | None = mark
+        while next_mark is not None:
+            mark = next_mark
+            found, errors = await self._fetch_pages_async(aapi, box_id, self._delta_params(bbox, mark),
+                                                          cell_id=f"{box_id}@{mark}")
+            total += found
+            next_mark = self._next_mark(box_id, mark, found, errors)
+        log.info("Grid %s: %d photos uploaded since the last run", box_id, total)
+
+    async def run_async(self, concurrency: int, since_last_run: bool = False) -> None:
+        """
+        Searches up to `concurrency` cells at once. Requests in flight are bounded by the
+        same number and paced by the client rate limiter instead of SLEEP.
+        """
+        async with AsyncFlickrClient(self.api, concurrency) as aapi:
+            slots = asyncio.Semaphore(concurrency)
+            tasks: set[asyncio.Task] = set()
+
+            def finished(task: asyncio.Task) -> None:
+                tasks.discard(task)
+                slots.release()
+                if not task.cancelled() and task.exception():
+                    log.error("Grid search failed → %s", task.exception())
+
+            for idx, box_id, bbox, mark in self._cells(since_last_run):
+                await slots.acquire()
+                metrics.progress("grid", idx)
+                progress.update("grid", idx, None, "grid %s", box_id)
+                log.debug("(%d) Checking grid %s", idx, box_id)
+                task = asyncio.create_task(
+                    self.check_zone_async(aapi, box_id, bbox) if mark is None
+                    else self.sync_zone_async(aapi, box_id, bbox, mark)
+                )
+                tasks.add(task)
+                task.add_done_callback(finished)
+
+            await asyncio.gather(*tasks)
 
     # ---------- CLI entry ----------
-    def run(self) -> None:
-        """Main method to run the zone downloader."""
-        done = self._load_done()
-
-        with self.bbox_csv.open() as f:
-            reader = csv.reader(f, delimiter=self.cfg.delimiter)
-            header = next(reader)          # ignore header row
-
-            for idx, row in enumerate(reader, start=1):
-                box_id = row[0]
-                if box_id in done:
-                    log.debug("Grid %s already done. Skipping.", box_id)
-                    continue
-
-                bbox = f"{row[self.xx]},{row[self.yx]},{row[self.xy]},{row[self.yy]}"
-                log.info(f"({idx}) Checking grid {box_id}")
-                self.check_zone(box_id, bbox)
+    def _grid_cells(self) -> Iterator[tuple[int, str, str]]:
+        """Yields (position, box_id, bbox) for every cell of the coordinates file (or of `cells`)."""
+        if self.cells is not None:
+            for idx, (box_id, bbox) in enumerate(self.cells, start=1):
+                yield idx, box_id, bbox
+            return
+        yield from read_cells(self.cfg)
+
+    def _planned_cells(self) -> Iterator[tuple[int, str, str]]:
+        """`_grid_cells` in the crawl order of the plan."""
+        if self.plan is None:
+            return self._grid_cells()
+        return self.plan.order(self._grid_cells(), self.order)
+
+    def _skip_empty(self, box_id: str) -> bool:
+        """Records a cell probed with 0 photos as checked, as its search would have."""
+        if self.plan is None or self.plan.total(box_id) != 0:
+            return False
+        self.state.mark_cell([box_id, "0", "False"])
+        metrics.inc("cells_total", outcome="empty")
+        self.skipped_empty += 1
+        return True
+
+    def _pending_cells(self) -> Iterator[tuple[int, str, str]]:
+        """Yields (position, box_id, bbox) for every cell of the coordinates file not checked yet."""
+        for idx, box_id, bbox in self._planned_cells():
+            if self.state.is_cell_done(box_id):
+                log.debug("Grid %s already done. Skipping.", box_id)
+                continue
+            if self._skip_empty(box_id):
+                continue
+            yield idx, box_id, bbox
+
+    def _until_stopped(self, cells: Iterator[tuple[int, str, str]]) -> Iterator[tuple[int, str, str]]:
+        """Passes the cells through until `stop` is set; the cells in progress are finished."""
+        for cell in cells:
+            if self.stop.is_set():
+                log.info("Zone %s: grid search stopped before cell %s", self.cfg.zone, cell[1])
+                return
+            yield cell
+
+    def _cells(self, since_last_run: bool = False) -> Iterator[tuple[int, str, str, int | None]]:
+        """
+        Yields (position, box_id, bbox, mark) for the cells to search. `mark` is None for a
+        full check; with `since_last_run` checked cells are yielded again with the upload
+        high-water mark to sync from (0 for cells checked before marks were recorded).
+        """
+        if not since_last_run:
+            for idx, box_id, bbox in self._until_stopped(self._pending_cells()):
+                yield idx, box_id, bbox, None
+            return
+
+        marks = self.state.upload_marks()
+        for idx, box_id, bbox in self._until_stopped(self._planned_cells()):
+            if not self.state.is_cell_done(box_id):
+                if not self._skip_empty(box_id):
+                    yield idx, box_id, bbox, None
+            else:
+                yield idx, box_id, bbox, marks.get(box_id, 0)
+
+    def retry_failed(self) -> None:
+        """
+        Re-checks the cells recorded with errors, requesting only the pages without a
+        checkpoint. Adaptive cells are retried leaf by leaf; partitions whose probe failed
+        are probed again. Cells that recover are recorded again with had_errors=False.
+        """
+        latest = {row[0]: row for row in self.state.cells()}
+        failed = self.state.failed_cells()
+        if not failed:
+            log.info("Zone %s: no failed cells to retry ✅", self.cfg.zone)
+            return
+
+        leaves = [row for row in failed if "#" in row[0]]
+        boxes  = [row for row in failed if "#" not in row[0]]
+        log.info("Retrying %d failed cells and %d failed partitions", len(boxes), len(leaves))
+
+        for row in leaves:
+            leaf_id = row[0]
+            part = Partition.from_row(*row[3:6])
+            params = {**self._search_params(), **part.params()}
+            found, errors = self._fetch_pages(leaf_id.split("#", 1)[0], params, cell_id=leaf_id)
+            self._mark_leaf(leaf_id, part, found, errors)
+
+        bboxes = {box_id: bbox for _, box_id, bbox in self._grid_cells()}
+        partitioned: dict[str, bool] = {}     # box_id → a probe failed again
+        for row in boxes:
+            box_id = row[0]
+            if box_id not in bboxes:
+                log.warning("Grid %s is not in %s. Skipping.", box_id,
+                            "the generated grid" if self.cells is not None else self.bbox_csv.name)
+                continue
+
+            if self.adaptive or any(cell_id.startswith(f"{box_id}#") for cell_id in latest):
+                partitioned[box_id] = self._check_partitions(box_id, bboxes[box_id])[1]
+                continue
+
+            total, had_errors = self._fetch_pages(box_id, {**self._search_params(), "bbox": bboxes[box_id]})
+            self._warn_truncation(box_id, total)
+            self.state.mark_cell([box_id, str(total), str(had_errors)])
+            self._save_mark(box_id, had_errors)
+
+        # Partitioned cells are summed up from the latest rows of their leaves
+        latest = {row[0]: row for row in self.state.cells()} if partitioned else {}
+        for box_id, probe_errors in partitioned.items():
+            parts = [row for cell_id, row in latest.items() if cell_id.startswith(f"{box_id}#")]
+            total = sum(int(row[1]) for row in parts)
+            had_errors = probe_errors or any(row[2] == "True" for row in parts)
+            self.state.mark_cell([box_id, str(total), str(had_errors)])
+            self._save_mark(box_id, had_errors)
+
+        if self._owns_state:
+            self.state.close()
+        log.info("Zone %s: retry done ✅", self.cfg.zone)
+
+    def run(self, concurrency: int = 1, since_last_run: bool = False) -> None:
+        """
+        Main method to run the zone downloader.
+        :param concurrency: Cells / requests in flight. 1 keeps the sequential loop.
+        :param since_last_run: Also search the checked cells again, only for photos uploaded
+                               after their high-water mark (see `sync_zone`).
+        """
+        total = len(self.cells) if isinstance(self.cells, Sized) else sum(1 for _ in self._grid_cells())
+        metrics.progress("grid", 0, total)
+        progress.update("grid", 0, total)
+        if concurrency > 1:
+            asyncio.run(self.run_async(concurrency, since_last_run))
+        else:
+            for idx, box_id, bbox, mark in self._cells(since_last_run):
+                metrics.progress("grid", idx)
+                progress.update("grid", idx, None, "grid %s", box_id)
+                log.debug("(%d) Checking grid %s", idx, box_id)
+                if mark is None:
+                    self.check_zone(box_id, bbox)
+                else:
+                    self.sync_zone(box_id, bbox, mark)
                 time.sleep(self.SLEEP)
 
-        log.info("Zone %s: All done! ✅", self.cfg.zone)
+        if self.skipped_empty:
+            log.info("Zone %s: %d cells probed empty were not searched", self.cfg.zone, self.skipped_empty)
+        if self._owns_state:
+            self.state.close()
+        if not self.stop.is_set():
+            log.info("Zone %s: All done! ✅", self.cfg.zone)
@@ -0,0 +1,199 @@
+from __future__ import annotations
+import csv
+import json
+import math
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+
+from flickr_grid_downloader.console import get_logger
+
+log = get_logger(__name__)
+
+METERS_PER_DEGREE = 6371008.8 * math.pi / 180    # mean Earth radius; along a meridian
+MIN_COS = math.cos(math.radians(89.9))           # caps the cell width next to the poles
+CSV_HEADER = ["id", "X.x", "Y.x", "vertex_index.x", "vertex_part.x", "X.y", "Y.y", "vertex_index.y", "vertex_part.y"]
+
+
+class Region:
+    """
+    Area to cover, as polygon rings in lon/lat degrees (outer rings and holes alike:
+    a point is inside when a ray from it crosses the rings an odd number of times).
+    """
+    def __init__(self, rings: list[np.ndarray]) -> None:
+        rings = [r for r in rings if len(r) >= 3]
+        if not rings:
+            raise ValueError("the region has no polygon with at least 3 vertices")
+        points = np.concatenate(rings)
+        if np.abs(points[:, 0]).max() > 180 or np.abs(points[:, 1]).max() > 90:
+            raise ValueError("coordinates must be lon/lat degrees (EPSG:4326)")
+        self.rings = rings
+        self.bounds = (*points.min(axis=0), *points.max(axis=0))    # min_lon, min_lat, max_lon, max_lat
+
+        # Edges of every ring as columns (x0, y0, x1, y1)
+        self.edges = np.concatenate([np.hstack([r, np.roll(r, -1, axis=0)]) for r in rings])
+
+    @classmethod
+    def from_bbox(cls, spec: str) -> Region:
+        """'min_lon,min_lat,max_lon,max_lat'."""
+        try:
+            x1, y1, x2, y2 = (float(v) for v in spec.split(","))
+        except ValueError:
+            raise ValueError("bbox must be 'min_lon,min_lat,max_lon,max_lat'")
+        if x1 >= x2 or y1 >= y2:
+            raise ValueError("bbox must be 'min_lon,min_lat,max_lon,max_lat' with min < max")
+        return cls([np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=float)])
+
+    @classmethod
+    def from_geojson(cls, path: Path) -> Region:
+        """Polygons and multipolygons of a GeoJSON geometry, feature or feature collection."""
+        rings: list[np.ndarray] = []
+
+        def visit(obj: dict[str, Any]) -> None:
+            kind = obj.get("type")
+            if kind == "FeatureCollection":
+                for feature in obj["features"]:
+                    visit(feature)
+            elif kind == "Feature":
+                if obj.get("geometry"):
+                    visit(obj["geometry"])
+            elif kind == "GeometryCollection":
+                for geometry in obj["geometries"]:
+                    visit(geometry)
+            elif kind == "Polygon":
+                rings.extend(np.asarray(ring, dtype=float)[:, :2] for ring in obj["coordinates"])
+            elif kind == "MultiPolygon":
+                rings.extend(np.asarray(ring, dtype=float)[:, :2] for poly in obj["coordinates"] for ring in poly)
+            else:
+                raise ValueError(f"unsupported GeoJSON type '{kind}' (expected polygons)")
+
+        visit(json.loads(path.read_text()))
+        return cls(rings)
+
+    def band_intervals(self, lat0: float, lat1: float, edges: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Longitude intervals where the region meets the band lat0 ≤ lat ≤ lat1, merged and
+        sorted: the x-extents of the edges clipped to the band plus the inside spans on
+        its lower border. A point of the region in the band either lies below or above
+        an edge within the band, or on a vertical line crossing the whole band.
+        :param edges: Subset of `self.edges` that may reach the band (all by default).
+        """
+        e = self.edges if edges is None else edges
+        xa, ya, xb, yb = e[:, 0], e[:, 1], e[:, 2], e[:, 3]
+
+        # Edges clipped to the band (horizontal edges are kept whole when inside it)
+        dy = yb - ya
+        flat = dy == 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ta = np.where(flat, 0.0, (lat0 - ya) / dy)
+            tb = np.where(flat, 1.0, (lat1 - ya) / dy)
+        lo = np.clip(np.minimum(ta, tb), 0, 1)
+        hi = np.clip(np.maximum(ta, tb), 0, 1)
+        hit = np.where(flat, (ya >= lat0) & (ya <= lat1), (np.maximum(ta, tb) >= 0) & (np.minimum(ta, tb) <= 1))
+        xlo, xhi = xa + lo * (xb - xa), xa + hi * (xb - xa)
+        starts = [np.minimum(xlo, xhi)[hit]]
+        ends = [np.maximum(xlo, xhi)[hit]]
+
+        # Inside spans on the lower border (half-open rule at the vertices)
+        cross = (ya <= lat0) != (yb <= lat0)
+        if cross.any():
+            xs = np.sort(xa[cross] + (lat0 - ya[cross]) * (xb[cross] - xa[cross]) / dy[cross])
+            starts.append(xs[0::2])
+            ends.append(xs[1::2])
+
+        s, e_ = np.concatenate(starts), np.concatenate(ends)
+        if not len(s):
+            return s, e_
+        order = np.argsort(s, kind="stable")
+        s, e_ = s[order], np.maximum.accumulate(e_[order])
+        first = np.flatnonzero(np.r_[True, s[1:] > e_[:-1]])
+        last = np.r_[first[1:] - 1, len(s) - 1]
+        return s[first], e_[last]
+
+
+class Grid:
+    """
+    Square cells of `cell_m` meters covering a region, laid out in rows of equal latitude
+    height. Each row's cell width in longitude follows the cosine of its middle latitude,
+    so cells keep their ground size. Rows and columns are anchored at (-180, -90): the same
+    cell size gives the same cells, and ids (row * columns at the equator + column), for
+    any region. Cells that do not meet the region are dropped.
+    Iterating computes `chunk_rows` rows at a time with NumPy, so memory stays bounded.
+    """
+    def __init__(self, region: Region, cell_m: float, chunk_rows: int = 256) -> None:
+        if cell_m <= 0:
+            raise ValueError("cell size must be greater than 0")
+        self.region = region
+        self.cell_m = cell_m
+        self.chunk_rows = chunk_rows
+        self.dlat = cell_m / METERS_PER_DEGREE
+        self.stride = math.ceil(360 / self.dlat)     # columns of the equator row
+
+    def _rows(self) -> Iterator[tuple[int, float, float, int, np.ndarray, np.ndarray]]:
+        """
+        Yields (row, min_lat, max_lat, first column, kept, lon edges) for every row meeting
+        the region: the cells of columns first + j with kept[j] span lon edges[j]..edges[j + 1].
+        """
+        _, min_lat, _, max_lat = self.region.bounds
+        first = math.floor((min_lat + 90) / self.dlat)
+        stop = math.ceil((max_lat + 90) / self.dlat)
+        edges = self.region.edges
+        ey_lo = np.minimum(edges[:, 1], edges[:, 3])
+        ey_hi = np.maximum(edges[:, 1], edges[:, 3])
+
+        for chunk_start in range(first, stop, self.chunk_rows):
+            rows = np.arange(chunk_start, min(chunk_start + self.chunk_rows, stop))
+            lat0 = np.round(-90 + rows * self.dlat, 7)
+            lat1 = np.round(np.minimum(-90 + (rows + 1) * self.dlat, 90), 7)
+            dlon = np.minimum(self.dlat / np.maximum(np.cos(np.radians((lat0 + lat1) / 2)), MIN_COS), 360)
+            # Edges reaching this chunk of rows
+            near = edges[(ey_hi >= lat0[0]) & (ey_lo <= lat1[-1])]
+
+            for row, y0, y1, w in zip(rows.tolist(), lat0.tolist(), lat1.tolist(), dlon.tolist()):
+                starts, ends = self.region.band_intervals(y0, y1, near)
+                if not len(starts):
+                    continue
+                columns = math.ceil(360 / w)
+                c0 = max(math.floor((starts[0] + 180) / w), 0)
+                c1 = min(math.floor((ends[-1] + 180) / w), columns - 1)
+                xs = np.round(np.minimum(-180 + np.arange(c0, c1 + 2) * w, 180), 7)
+                # A cell is kept when some interval overlaps it by more than a touch
+                k = np.searchsorted(starts, xs[1:], side="left") - 1
+                kept = (k >= 0) & (ends[np.maximum(k, 0)] > xs[:-1])
+                if kept.any():
+                    yield row, y0, y1, c0, kept, xs
+
+    def __len__(self) -> int:
+        return sum(int(kept.sum()) for *_, kept, _ in self._rows())
+
+    def _cells(self) -> Iterator[tuple[str, str, str, str, str]]:
+        """(box_id, min_lon, min_lat, max_lon, max_lat) as text; each edge is formatted once."""
+        for row, y0, y1, c0, kept, xs in self._rows():
+            south, north = str(y0), str(y1)
+            lons = list(map(str, xs.tolist()))
+            base = row * self.stride + c0
+            for j in np.flatnonzero(kept).tolist():
+                yield str(base + j), lons[j], south, lons[j + 1], north
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        """(box_id, 'min_lon,min_lat,max_lon,max_lat'), as read from a coordinates file."""
+        for box_id, x0, y0, x1, y1 in self._cells():
+            yield box_id, f"{x0},{y0},{x1},{y1}"
+
+    def write_csv(self, path: Path, delimiter: str = ",") -> int:
+        """
+        Writes the cells in the default coordinates layout (id, X.x, Y.x, …, X.y, Y.y, …),
+        through a temporary file. :return: Cells written.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        count = 0
+        with tmp.open("w", newline="") as f:
+            writer = csv.writer(f, delimiter=delimiter)
+            writer.writerow(CSV_HEADER)
+            for box_id, x0, y0, x1, y1 in self._cells():
+                writer.writerow((box_id, x0, y0, "", "", x1, y1, "", ""))
+                count += 1
+        tmp.replace(path)
+        return count
@@ -1,101 +1,240 @@
 from __future__ import annotations
 import json
-import csv
 import time
-import requests
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Sequence
-from requests import Response
+from typing import TYPE_CHECKING, Any, Iterable, Sequence
 
 from flickr_grid_downloader.config import JobConfig
 from flickr_grid_downloader.utils.flickr_client import FlickrClient
-from flickr_grid_downloader.console import get_logger
-from flickr_grid_downloader.tools.duplicate_cleaner import DuplicateCleaner
-from flickr_grid_downloader.utils.photo_info import build_photo_info
+from flickr_grid_downloader.utils.response_cache import CacheMiss
+from flickr_grid_downloader.console import get_logger, progress
+from flickr_grid_downloader.utils.photo_info import (
+    build_photo_info, build_photo_info_from_search, INFO_ONLY_FIELDS
+)
+from flickr_grid_downloader.utils.content_index import ContentIndex, link_or_copy
+from flickr_grid_downloader.utils.image_fetcher import ImageFetcher
+from flickr_grid_downloader.utils.image_size import SizePolicy
+from flickr_grid_downloader.utils.metadata_store import MetadataStore
+from flickr_grid_downloader.utils.metrics import metrics
+from flickr_grid_downloader.utils.rate_limiter import TokenBucket
+from flickr_grid_downloader.utils.shard_store import ShardWriter
+from flickr_grid_downloader.utils.state_store import StateStore, open_state
+from flickr_grid_downloader.utils.trace import tracer
+
+if TYPE_CHECKING:   # Pillow is optional, only needed with post-processing
+    from flickr_grid_downloader.utils.image_processor import ImagePostProcessor
 
 log = get_logger(__name__)
 
 class ImageDownloader:
-    SLEEP = 0.3  # Seconds between requests to avoid rate limiting
+    SLEEP = 0.3  # Seconds between requests to avoid rate limiting (sequential mode only)
+    IN_FLIGHT_PER_WORKER = 4  # Photos queued per worker; bounds memory on huge CSVs
+    FLUSH_EVERY = 50          # Photos buffered before metadata and the download log hit the disk
 
-    def __init__(self, cfg: JobConfig, api: FlickrClient) -> None:
+    def __init__(self, cfg: JobConfig, api: FlickrClient, workers: int = 1,
+                 info_fields: Iterable[str] = (), state: StateStore | None = None,
+                 metadata_only: bool = False, post: ImagePostProcessor | None = None,
+                 shards: ShardWriter | None = None, content: ContentIndex | None = None,
+                 size: SizePolicy = SizePolicy(), bandwidth: float = 0, max_bytes: int = 0) -> None:
+        """
+        :param workers: Size of the API and CDN worker pools. With 1 photos are processed
+                        sequentially; otherwise the API rate is enforced by the client limiter.
+        :param info_fields: photo_info fields the user needs. For results saved with
+                            `download-grid --lean`, getInfo is only called when one of them
+                            is missing from the search extras (see INFO_ONLY_FIELDS).
+        :param state: Where results and downloads are tracked. Defaults to the backend
+                      selected in the configuration (a state passed in is not closed by `run`).
+        :param metadata_only: Rebuild the metadata of every photo (downloaded or not) without
+                              fetching images, e.g. from a response cache in offline mode.
+        :param post: Post-processing stage fed with every downloaded image (closed by `run`).
+                     A photo is only logged as downloaded once its derivatives are written.
+        :param shards: Pack every downloaded image (and its derivatives) into tar shards
+                       instead of leaving one file per image (closed by `run`).
+        :param content: Index of the images stored by every zone. A photo already stored is
+                        hardlinked instead of downloaded, and byte-identical images are
+                        collapsed into hardlinks (see ContentIndex).
+        :param size: Image variant downloaded for every photo (see SizePolicy).
+        :param bandwidth: CDN bytes per second shared by all workers (0 = unlimited).
+        :param max_bytes: CDN bytes after which the run stops taking new photos (0 = unlimited).
+                          Photos in flight are finished; the rest stay pending for the next run.
+        """
         self.cfg = cfg
         self.api = api
+        self.workers = max(1, workers)
+        self.needs_info = bool(INFO_ONLY_FIELDS & set(info_fields))
+        self.metadata_only = metadata_only
+        self.post = post
+        self.shards = shards
+        self.content = content
+        self.size = size
+        self.max_bytes = max_bytes
+        self.budget_reached = False
 
-        self.results_csv        = cfg.csv_path / f"results_{cfg.start_year}_{cfg.end_year}.csv"
-        self.results_cleaned    = cfg.csv_path / f"results_{cfg.start_year}_{cfg.end_year}_cleaned.csv"
-        self.downloaded_images_csv       = cfg.csv_path / f"downloaded_images_{cfg.start_year}_{cfg.end_year}.csv"
-        self.json_dir           = cfg.json_path
+        # Shared state between worker threads
+        self._flush_lock = threading.Lock()
+        self._done_rows: list[Sequence[str]] = []
+        self._pending = 0
+        self._stats_lock = threading.Lock()
+        self._fetched = 0
+        self._fetched_bytes = 0
+        self._linked = 0
 
+        self.json_dir = cfg.json_path
         self.json_dir.mkdir(parents=True, exist_ok=True)
-        self.downloaded_images_csv.touch(exist_ok=True)
+
+        self.state = state or open_state(cfg.csv_path, cfg.start_year, cfg.end_year, cfg.state_backend)
+        self._owns_state = state is None
+        self.metadata = MetadataStore(self.json_dir, cfg.zone)
+        limiter = TokenBucket(bandwidth) if bandwidth else None
+        self.fetcher = ImageFetcher(pool_size=max(10, self.workers), limiter=limiter)
 
     # ---------- Helper ----------
-    def _append_row(self, path: Path, row: Sequence[str]) -> None:
-        with path.open("a", newline="") as f:
-            csv.writer(f).writerow(row)
+
+    def _record(self, box_id: str, photo_id: str, record: dict[str, Any],
+                done_row: Sequence[str] | None) -> None:
+        """Queues a photo's metadata and its download log row, flushing every FLUSH_EVERY photos."""
+        self.metadata.add(box_id, photo_id, record)
+        with self._flush_lock:
+            self._pending += 1
+            if done_row:
+                self._done_rows.append(done_row)
+            if self._pending >= self.FLUSH_EVERY:
+                self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        # Metadata and shards are synced first, so a photo only counts as done once its
+        # record and its image are on disk
+        start = time.perf_counter()
+        with metrics.timer("flush_seconds"):
+            self.metadata.flush()
+            if self.shards:
+                self.shards.flush()
+            self.state.mark_downloaded(self._done_rows)
+        tracer.event("write", time.perf_counter() - start, what="flush", rows=self._pending)
+        self._done_rows = []
+        self._pending = 0
+
+    def _flush(self) -> None:
+        with self._flush_lock:
+            self._flush_locked()
 
     # ---------- Image ----------
-    def _image_url(self, server: str, photo_id: str, secret: str,
-                   original_secret: str | None, fmt: str) -> tuple[str, bool]:
+    def _image_url(self, photo_id: str, photo: dict[str, Any]) -> tuple[str, bool]:
         """
         Returns (url, original_downloaded)
-        • Priority to _b size (medium/large) because the original is usually large.
+        • The variant is chosen by the size policy (_b, 1024 px, by default).
         """
-        # DISABLED. In case we want to download the original image (much larger) we must implement this logic.
-        # if original_secret:    
-        #     return (f"https://live.staticflickr.com/{server}/{photo_id}_{original_secret}_o.{fmt}", True)
-        return (f"https://live.staticflickr.com/{server}/{photo_id}_{secret}_b.{fmt}", False)
+        url, suffix = self.size.url(self.cfg.cdn_url, photo_id, photo)
+        return url, suffix == "o"
 
-    def _download_to(self, url: str, dest: Path) -> bool:
+    def _budget_spent(self) -> bool:
+        """True once the CDN bytes of this run reach `max_bytes` (logged the first time)."""
+        if self.max_bytes and not self.budget_reached and self.fetcher.received >= self.max_bytes:
+            self.budget_reached = True
+            log.warning("Byte budget of %.1f MB reached; stopping after the images being downloaded",
+                        self.max_bytes / (1 << 20))
+        return self.budget_reached
+
+    def _link_stored(self, photo_id: str, dest: Path) -> bool:
+        """Hardlinks a photo already stored by another box or zone. False when there is none."""
+        if not self.content or dest.exists():
+            return False
+        stored = self.content.find_photo(photo_id)
+        if stored is None:
+            return False
+        link_or_copy(stored, dest)
+        with self._stats_lock:
+            self._linked += 1
+        metrics.inc("photos_total", outcome="linked")
+        log.debug("Image %s linked from %s", dest.name, stored)
+        return True
+
+    def _download_to(self, url: str, dest: Path, box_id: str, photo_id: str) -> bool:
+        start = time.perf_counter()
         try:
-            r: Response = requests.get(url, timeout=60, stream=True)
-            r.raise_for_status()
-            with dest.open("wb") as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            if not self.fetcher.fetch(url, dest):
+                log.debug("Image %s already on disk", dest.name)
+                metrics.inc("photos_total", outcome="on_disk")
+                tracer.event("image", time.perf_counter() - start, box=box_id, photo=photo_id, status="on_disk")
+                return True
+            size = dest.stat().st_size
+            with self._stats_lock:
+                self._fetched += 1
+                self._fetched_bytes += size
+            metrics.inc("photos_total", outcome="downloaded")
+            tracer.event("image", time.perf_counter() - start, box=box_id, photo=photo_id, status="downloaded",
+                         bytes=size)
             return True
         except Exception as exc:
             log.error("Image %s not downloaded → %s", url, exc)
+            metrics.inc("cdn_errors_total")
+            metrics.inc("photos_total", outcome="error")
+            tracer.event("image", time.perf_counter() - start, box=box_id, photo=photo_id, status="error")
             return False
 
     # ---------- Main loop ----------
-    def _process_photo(self, photo_row: Sequence[str]) -> None:
-        box_id, page, photo_id, owner, secret, title = photo_row
+    @staticmethod
+    def _search_record(photo_row: Sequence[str]) -> dict[str, Any] | None:
+        """Returns the search record of a row saved in lean mode (7th column), else None."""
+        if len(photo_row) < 7 or not photo_row[6]:
+            return None
+        _, _, photo_id, owner, secret, title = photo_row[:6]
+        return {"id": photo_id, "owner": owner, "secret": secret, "title": title, **json.loads(photo_row[6])}
 
-        # Call the API to get full metadata
-        info = self.api.get_info(photo_id)
-        photo = info["photo"]
+    def _fetch_info(self, photo_row: Sequence[str]) -> dict[str, Any] | None:
+        """Call the API to get full metadata (API stage), unless the search extras are enough."""
+        if self._search_record(photo_row) is not None and not self.needs_info:
+            return None
+        return self.api.get_info(photo_row[2])
 
-        server = photo["server"]
-        secret = photo["secret"]
-        original_secret = photo.get("originalsecret")
-        fmt = photo.get("originalformat", "jpg")
+    def _store_photo(self, photo_row: Sequence[str], info: dict[str, Any] | None) -> None:
+        """Download the image and persist its metadata (CDN stage)."""
+        box_id, _, photo_id, _, _, title = photo_row[:6]
+        search = self._search_record(photo_row)
+        photo = info["photo"] if info else search
+        if info and search:     # getInfo has no url_* / o_dims extras
+            photo = {**search, **photo}
 
-        url, original_flag = self._image_url(server, photo_id, secret, original_secret, fmt)
+        url, original_flag = self._image_url(photo_id, photo)
         img_dir = self.cfg.img_path / box_id
         img_dir.mkdir(parents=True, exist_ok=True)
         img_path = img_dir / f"{self.cfg.zone}_{box_id}_{photo_id}.jpg"
 
-        ok = self._download_to(url, img_path)
-
-        # --- JSON cache ----------
-        json_path = self.json_dir / f"{self.cfg.zone}_{box_id}.json"
-        data: dict[str, dict] = {}
-        if json_path.exists():
-            data = json.loads(json_path.read_text())
+        packed = self.shards is not None and self.shards.has(photo_id)
+        if self.metadata_only or packed:
+            ok = packed or img_path.exists()
+            metrics.inc("photos_total", outcome="packed" if packed else "metadata")
+        elif self._link_stored(photo_id, img_path):
+            ok = True
+        else:
+            ok = self._download_to(url, img_path, box_id, photo_id)
+        if ok and self.content and not packed and img_path.exists():
+            record_content = self.content.add(photo_id, img_path)
+        else:
+            record_content = None
 
         # Construye la info del photo_info
         if self.cfg.download_raw_metadata:
-            data[photo_id] = {
+            record = {
                 "title": title,
                 "url": url,
                 "downloaded": ok,
                 "original": original_flag,
-                "meta": info,
+                "meta": info if info else search,
             }
+        elif not info:
+            record = build_photo_info_from_search(
+                photo_id=photo_id,
+                box_id=box_id,
+                search_payload=search,
+                image_url=url,
+                downloaded=ok,
+                original_downloaded=original_flag
+            )
         else:
-            data[photo_id] = build_photo_info(
+            record = build_photo_info(
                 photo_id=photo_id,
                 box_id=box_id,
                 api_payload=info,
@@ -104,43 +243,153 @@ class ImageDownloader:
                 original_downloaded=original_flag
             )
 
-        data[photo_id]["metadata_format"] = "raw" if self.cfg.download_raw_metadata else "custom"
+        if record_content:
+            record["content"] = record_content
+        record["metadata_format"] = "raw" if self.cfg.download_raw_metadata else "custom"
+        if not info:
+            record["metadata_format"] += "_search"      # built from search extras, no getInfo
 
-        json_path.write_text(json.dumps(data, indent=2))
+        done_row = None if self.metadata_only else [photo_id, box_id, "ok" if ok else "error", str(ok)]
+        if not ok or self.metadata_only or packed:
+            self._record(box_id, photo_id, record, done_row)
+        elif self.post:
+            # A photo whose derivatives failed stays pending and is processed again next run
+            self.post.submit(img_path, lambda processed: self._finish(
+                box_id, photo_id, img_path, record, done_row if processed else None))
+        else:
+            self._finish(box_id, photo_id, img_path, record, done_row)
 
-        self._append_row(self.downloaded_images_csv, [photo_id, box_id, "ok" if ok else "error", str(ok)])
+    def _finish(self, box_id: str, photo_id: str, img_path: Path, record: dict[str, Any],
+                done_row: Sequence[str] | None) -> None:
+        """Records a downloaded photo, packing its files into the shards first."""
+        if self.shards and done_row:
+            files = [img_path]
+            if self.post:
+                files += [self.post.spec.derivative_path(img_path, size) for size in self.post.spec.sizes]
+            files = [path for path in files if path.exists()]
+            self.shards.add(photo_id, box_id, files)
+            for path in files:
+                path.unlink()
+        self._record(box_id, photo_id, record, done_row)
 
+    def _process_photo(self, photo_row: Sequence[str]) -> None:
+        self._store_photo(photo_row, self._fetch_info(photo_row))
 
-    # ---------- CLI entry ----------
-    def run(self) -> None:
-        # 1) Deduplicate CSV (If cleaned does not exist or if results_csv is newer)
-        if not self.results_cleaned.exists() or \
-           self.results_csv.stat().st_mtime > self.results_cleaned.stat().st_mtime:
-            DuplicateCleaner(self.results_csv, self.results_cleaned).clean()
+    def _log_photo(self, idx: int, total: int | None, row: Sequence[str]) -> None:
+        # Shown by the progress display at its own pace, not logged per photo
+        metrics.progress("images", idx, total)
+        progress.update("images", idx, total, "%s box %s photo %s", self.cfg.zone, row[0], row[2])
+        log.debug("%s %s (box %s) - photo_id=%s", self.cfg.zone, idx, row[0], row[2])
 
-        done: set[str] = set()
-        with self.downloaded_images_csv.open() as f:
-            done = {row[0] for row in csv.reader(f)}
+    def _run_concurrent(self, rows: Iterable[tuple[int, Sequence[str]]], total: int | None) -> None:
+        """
+        Pipelines the photos through two bounded pools: API workers call getInfo
+        (paced by the client limiter) and hand the payload to CDN workers that fetch
+        the image. A semaphore caps the photos in flight so the results are read lazily.
+        """
+        slots = threading.BoundedSemaphore(self.workers * self.IN_FLIGHT_PER_WORKER)
 
-        log.info("Downloading images for %s.", self.cfg.zone)
-        if done:
-            log.info("Skipping %d already downloaded photos\n",  len(done))
+        def fetch_info(row: Sequence[str]) -> dict[str, Any] | None:
+            metrics.add("queue_depth", -1, stage="api")
+            return self._fetch_info(row)
 
-        with self.results_cleaned.open() as f:
-            reader = csv.reader(f)
-            header = next(reader)
+        def store(row: Sequence[str], info: dict[str, Any]) -> None:
+            metrics.add("queue_depth", -1, stage="cdn")
+            try:
+                if self._budget_spent():
+                    return      # not recorded: stays pending for the next run
+                self._store_photo(row, info)
+            except Exception as exc:
+                log.error("Photo %s not stored → %s", row[2], exc)
+            finally:
+                slots.release()
 
-            total = sum(1 for _ in reader)
-            f.seek(0); next(reader)         # vuelve al inicio tras contar
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="cdn") as cdn_pool:
+            def on_info(row: Sequence[str], fut: Future) -> None:
+                try:
+                    info = fut.result()
+                except Exception as exc:
+                    log.error("Photo %s info not retrieved → %s", row[2], exc)
+                    metrics.inc("photos_total", outcome="error")
+                    slots.release()
+                    return
+                metrics.add("queue_depth", 1, stage="cdn")
+                cdn_pool.submit(store, row, info)
+
+            # The API pool is closed (and its callbacks run) before the CDN pool
+            with ThreadPoolExecutor(self.workers, thread_name_prefix="api") as api_pool:
+                for idx, row in rows:
+                    slots.acquire()
+                    if self._budget_spent():
+                        slots.release()
+                        break
+                    self._log_photo(idx, total, row)
+                    metrics.add("queue_depth", 1, stage="api")
+                    fut = api_pool.submit(fetch_info, row)
+                    fut.add_done_callback(lambda f, row=row: on_info(row, f))
+
+    # ---------- CLI entry ----------
+    def run(self, pending: Iterable[tuple[int, Sequence[str]]] | None = None) -> None:
+        """
+        :param pending: (position, row) of the photos to process, e.g. streamed by the
+                        `run` pipeline. Defaults to the photos of the state not downloaded yet.
+        """
+        total = None
+        if pending is not None:
+            log.info("Downloading streamed images for %s.", self.cfg.zone)
+        elif self.metadata_only:
+            log.info("Rebuilding metadata for %s.", self.cfg.zone)
+            total = self.state.photo_count()
+            pending = self.state.photos()
+        else:
+            log.info("Downloading images for %s.", self.cfg.zone)
+            # Deduplicated photo count (the CSV backend cleans the results first)
+            total = self.state.photo_count()
+            pending = self.state.pending_photos()
+
+        started = time.monotonic()
+        completed = False
+        try:
+            if self.workers > 1:
+                self._run_concurrent(pending, total)
+            else:
+                for idx, row in pending:
+                    if self._budget_spent():
+                        break
+                    self._log_photo(idx, total, row)
 
-            for idx, row in enumerate(reader, start=1):
-                photo_id = row[2]
-                if photo_id in done:
-                    continue
+                    try:
+                        self._process_photo(row)
+                    except CacheMiss as exc:
+                        log.warning("Photo %s skipped → %s", row[2], exc)
+                        continue
+                    if not self.metadata_only:
+                        time.sleep(self.SLEEP)
+            completed = True
+        finally:
+            if self.post:
+                # Let the queued images finish (they are recorded by their callbacks)
+                self.post.close(cancel=not completed)
+            # Keep the work done so far, even on Ctrl+C or an unexpected error
+            self._flush()
 
-                log.info("%s %d/%d (box %s) - photo_id=%s", self.cfg.zone, idx, total, row[0], photo_id)
+        if self._fetched:
+            wall = time.monotonic() - started
+            log.info("Downloads: %d images, %.1f MB in %.1fs → %.2f MB/s", self._fetched,
+                     self._fetched_bytes / (1 << 20), wall, self._fetched_bytes / (1 << 20) / wall)
+        if self._linked:
+            log.info("Downloads: %d images linked from other boxes or zones", self._linked)
+        if self.budget_reached:
+            log.info("Byte budget reached: the remaining photos are downloaded by the next run")
 
-                self._process_photo(row)
-                time.sleep(self.SLEEP)
+        # Rebuild the dict-shaped box JSONs from the append-only logs
+        self.metadata.finalize()
+        self.fetcher.close()
+        if self.shards:
+            self.shards.close()
+        if self.content:
+            self.content.close()
+        if self._owns_state:
+            self.state.close()
 
-        log.info("✅ Finished downloading images for %s ✅", self.cfg.zone)
\ No newline at end of file
+        log.info("✅ Finished downloading images for %s ✅", self.cfg.zone)
@@ -0,0 +1,231 @@
+from __future__ import annotations
+import datetime
+import json
+import shutil
+from pathlib import Path
+from typing import Any, Iterator
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from flickr_grid_downloader.config import JobConfig
+from flickr_grid_downloader.console import get_logger
+from flickr_grid_downloader.constants import PARQUET_DIR
+from flickr_grid_downloader.utils.metadata_store import MetadataStore
+from flickr_grid_downloader.utils.photo_info import build_photo_info, build_photo_info_from_search
+
+log = get_logger(__name__)
+
+# Columns of the data files; zone, box_id and year are the hive partition keys
+# (directory names) and are not repeated inside the files.
+PHOTO_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("text", pa.string()),
+    ("description", pa.string()),
+    ("created_at", pa.timestamp("s", tz="UTC")),
+    ("taken_at", pa.timestamp("s")),             # local time of the camera, as Flickr reports it
+    ("views_count", pa.int64()),
+    ("reply_count", pa.int64()),
+    ("longitude", pa.float64()),
+    ("latitude", pa.float64()),
+    ("accuracy", pa.int8()),
+    ("context", pa.int8()),
+    ("locality", pa.string()),
+    ("county", pa.string()),
+    ("region", pa.string()),
+    ("country", pa.string()),
+    ("neighbourhood", pa.string()),
+    ("author_id", pa.string()),
+    ("username", pa.string()),
+    ("tags", pa.list_(pa.string())),
+    ("image_url", pa.string()),
+    ("original_secret", pa.string()),
+    ("original_format", pa.string()),
+    ("image_downloaded", pa.bool_()),
+    ("original_downloaded", pa.bool_()),
+    ("metadata_format", pa.string()),
+    ("sha256", pa.string()),
+    ("phash", pa.string()),
+    ("duplicate_of", pa.string()),
+])
+
+SUMMARY_SCHEMA = pa.schema([
+    ("box_id", pa.string()),
+    ("year", pa.int16()),
+    ("rows", pa.int64()),
+    ("min_longitude", pa.float64()),
+    ("min_latitude", pa.float64()),
+    ("max_longitude", pa.float64()),
+    ("max_latitude", pa.float64()),
+    ("min_taken_at", pa.timestamp("s")),
+    ("max_taken_at", pa.timestamp("s")),
+    ("path", pa.string()),
+])
+
+
+def _int(value: Any) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _float(value: Any) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _text(value: Any) -> str | None:
+    # getInfo places ({'_content': 'Madrid', 'place_id': …}) are reduced to their name
+    if isinstance(value, dict):
+        return value.get("_content")
+    return None if value is None else str(value)
+
+
+def _taken(value: Any) -> datetime.datetime | None:
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):     # missing, or Flickr's '0000-00-00 00:00:00'
+        return None
+
+
+class ParquetExporter:
+    """
+    Converts the per-box metadata JSONs of a zone into a partitioned Parquet dataset:
+    • One box JSON is loaded at a time, so memory is bounded by the largest box.
+    • Custom and raw (`--raw`) records are written with the same typed schema: geo is
+      flattened into longitude/latitude columns and tags are stored as a list column.
+    • Files follow the hive layout zone=<zone>/box_id=<box_id>/year=<year>/part-0.parquet,
+      with `year` taken from the date taken (the upload date when it is unknown).
+    • zone=<zone>/_summary.parquet holds rows, bbox and taken range per file, so
+      readers can prune boxes without opening them.
+    The zone is written into a temp directory that replaces the previous export at the end.
+    """
+    def __init__(self, cfg: JobConfig, out_dir: Path = PARQUET_DIR, compression: str = "zstd") -> None:
+        self.cfg = cfg
+        self.compression = compression
+        self.metadata = MetadataStore(cfg.json_path, cfg.zone)
+        self.zone_dir = out_dir / f"zone={cfg.zone}"
+        self.tmp_dir = out_dir / f"zone={cfg.zone}.tmp"
+
+    # ---------- Reading ----------
+    def _boxes(self) -> Iterator[tuple[str, Path]]:
+        prefix = f"{self.cfg.zone}_"
+        for path in sorted(self.cfg.json_path.glob(f"{prefix}*.json")):
+            yield path.stem[len(prefix):], path
+
+    @staticmethod
+    def _normalize(box_id: str, photo_id: str, record: dict[str, Any]) -> dict[str, Any]:
+        """Returns the `photo_info` dict of a record, rebuilding it from raw payloads."""
+        if "meta" not in record:
+            return record
+        meta = record["meta"]
+        # getInfo payloads are wrapped in 'photo'; lean runs store the search record itself
+        build = build_photo_info if "photo" in meta else build_photo_info_from_search
+        info = build(photo_id, box_id, meta, record["url"], record["downloaded"], record["original"])
+        info["metadata_format"] = record.get("metadata_format", "raw")
+        if "content" in record:
+            info["content"] = record["content"]
+        return info
+
+    @staticmethod
+    def _row(photo_id: str, info: dict[str, Any]) -> dict[str, Any]:
+        geo = info.get("geo") or {}
+        lon, lat = ((geo.get("coordinates") or {}).get("coordinates") or [None, None])[:2]
+        posted = _int(info.get("created_at_timestamp"))
+        content = info.get("content") or {}
+        return {
+            "id": int(photo_id),
+            "text": _text(info.get("text")),
+            "description": _text(info.get("description")),
+            "created_at": datetime.datetime.fromtimestamp(posted, datetime.UTC) if posted is not None else None,
+            "taken_at": _taken(info.get("taken_at")),
+            "views_count": _int(info.get("views_count")),
+            "reply_count": _int(info.get("reply_count")),
+            "longitude": _float(lon),
+            "latitude": _float(lat),
+            "accuracy": _int(geo.get("accuracy")),
+            "context": _int(geo.get("context")),
+            **{key: _text(geo.get(key)) for key in ("locality", "county", "region", "country", "neighbourhood")},
+            "author_id": info.get("author_id"),
+            "username": info.get("username"),
+            "tags": [str(tag) for tag in info.get("tags") or []],
+            "image_url": info.get("image_url"),
+            "original_secret": info.get("original_secret"),
+            "original_format": info.get("original_format"),
+            "image_downloaded": info.get("image_downloaded"),
+            "original_downloaded": info.get("original_downloaded"),
+            "metadata_format": info.get("metadata_format"),
+            "sha256": content.get("sha256"),
+            "phash": content.get("phash"),
+            "duplicate_of": content.get("duplicate_of"),
+        }
+
+    @staticmethod
+    def _year(row: dict[str, Any]) -> int | None:
+        when = row["taken_at"] or row["created_at"]
+        return when.year if when else None
+
+    # ---------- Writing ----------
+    def _write_box(self, box_id: str, path: Path) -> list[dict[str, Any]]:
+        """Writes one file per year of the box; returns their summary rows."""
+        by_year: dict[int | None, list[dict[str, Any]]] = {}
+        skipped = 0
+        for photo_id, record in json.loads(path.read_text()).items():
+            try:
+                row = self._row(photo_id, self._normalize(box_id, photo_id, record))
+            except (KeyError, TypeError, ValueError) as exc:
+                skipped += 1
+                log.debug("Photo %s of box %s not exported → %s", photo_id, box_id, exc)
+                continue
+            by_year.setdefault(self._year(row), []).append(row)
+        if skipped:
+            log.warning("Box %s: %d incomplete records not exported", box_id, skipped)
+
+        summary = []
+        for year, rows in sorted(by_year.items(), key=lambda item: item[0] or 0):
+            rows.sort(key=lambda row: row["id"])
+            part = Path(f"box_id={box_id}", f"year={year if year is not None else '__HIVE_DEFAULT_PARTITION__'}",
+                        "part-0.parquet")
+            table = pa.Table.from_pylist(rows, schema=PHOTO_SCHEMA)
+            (self.tmp_dir / part).parent.mkdir(parents=True, exist_ok=True)
+            pq.write_table(table, self.tmp_dir / part, compression=self.compression)
+
+            lons = [r["longitude"] for r in rows if r["longitude"] is not None]
+            lats = [r["latitude"] for r in rows if r["latitude"] is not None]
+            taken = [r["taken_at"] for r in rows if r["taken_at"] is not None]
+            summary.append({
+                "box_id": box_id, "year": year, "rows": len(rows),
+                "min_longitude": min(lons, default=None), "min_latitude": min(lats, default=None),
+                "max_longitude": max(lons, default=None), "max_latitude": max(lats, default=None),
+                "min_taken_at": min(taken, default=None), "max_taken_at": max(taken, default=None),
+                "path": part.as_posix(),
+            })
+        return summary
+
+    def run(self) -> int:
+        """Exports the zone; returns the number of photos written."""
+        # Fold the .jsonl logs left by an interrupted download into the box JSONs
+        self.metadata.finalize()
+
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        self.tmp_dir.mkdir(parents=True)
+
+        summary: list[dict[str, Any]] = []
+        for n, (box_id, path) in enumerate(self._boxes(), start=1):
+            summary.extend(self._write_box(box_id, path))
+            if n % 100 == 0:
+                log.info("%s: %d boxes exported", self.cfg.zone, n)
+
+        pq.write_table(pa.Table.from_pylist(summary, schema=SUMMARY_SCHEMA),
+                       self.tmp_dir / "_summary.parquet", compression=self.compression)
+
+        # Swap the new export in; readers never see a half-written zone
+        shutil.rmtree(self.zone_dir, ignore_errors=True)
+        self.tmp_dir.rename(self.zone_dir)
+
+        photos = sum(entry["rows"] for entry in summary)
+        log.info("✅ %s: %d photos in %d files → %s", self.cfg.zone, photos, len(summary), self.zone_dir)
+        return photos
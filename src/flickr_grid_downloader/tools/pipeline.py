@@ -0,0 +1,129 @@
+from __future__ import annotations
+import queue
+import threading
+from itertools import chain
+from typing import TYPE_CHECKING, Iterable, Iterator, Sequence
+
+from flickr_grid_downloader.config import JobConfig
+from flickr_grid_downloader.console import get_logger
+from flickr_grid_downloader.tools.grid_downloader import ZoneDownloader
+from flickr_grid_downloader.tools.image_downloader import ImageDownloader
+from flickr_grid_downloader.utils.flickr_client import FlickrClient
+from flickr_grid_downloader.utils.cell_plan import CellPlan
+from flickr_grid_downloader.utils.id_index import PhotoIdIndex
+from flickr_grid_downloader.utils.image_size import SizePolicy
+from flickr_grid_downloader.utils.metrics import metrics
+from flickr_grid_downloader.utils.state_store import open_state
+
+if TYPE_CHECKING:
+    from flickr_grid_downloader.utils.content_index import ContentIndex
+    from flickr_grid_downloader.utils.image_processor import ImagePostProcessor
+    from flickr_grid_downloader.utils.shard_store import ShardWriter
+
+log = get_logger(__name__)
+
+
+class Pipeline:
+    """
+    Grid search and image download in one process:
+    • ZoneDownloader runs in a producer thread and puts the result rows of every stored
+      page on a bounded queue; when the queue is full the search waits (backpressure).
+    • ImageDownloader consumes the queue, deduplicating photo ids inline.
+    Each stage resumes from its own checkpoints in the shared state: checked cells and
+    pages for the search, the download log for the images. Photos found by an earlier,
+    interrupted run but not downloaded yet are processed first.
+    """
+    QUEUE_PAGES = 64        # result pages buffered between the stages
+
+    _END = None             # queue sentinel: the search is over
+
+    def __init__(self, cfg: JobConfig, api: FlickrClient, *, adaptive: bool = False, lean: bool = False,
+                 concurrency: int = 1, workers: int = 1, info_fields: Iterable[str] = (),
+                 queue_pages: int = QUEUE_PAGES, since_last_run: bool = False,
+                 post: ImagePostProcessor | None = None, shards: ShardWriter | None = None,
+                 content: ContentIndex | None = None, size: SizePolicy = SizePolicy(),
+                 bandwidth: float = 0, max_bytes: int = 0,
+                 cells: Iterable[tuple[str, str]] | None = None,
+                 plan: CellPlan | None = None, order: str = "file") -> None:
+        """
+        :param concurrency: Search concurrency (see ZoneDownloader.run).
+        :param since_last_run: Delta search of the checked cells (see ZoneDownloader.run).
+        :param workers: Image download workers (see ImageDownloader).
+        :param queue_pages: Result pages the search may get ahead of the downloads.
+        :param post: Optional post-processing stage of the downloaded images (see ImageDownloader).
+        :param shards: Optional tar shard output of the images (see ImageDownloader).
+        :param content: Optional cross-zone image index for deduplication (see ImageDownloader).
+        :param size: Image size policy; `bandwidth` and `max_bytes` cap the CDN transfer
+                     (see ImageDownloader). Once the byte budget is spent the search still
+                     runs to the end, so the next run only has downloads left.
+        :param cells: Cells to search instead of the coordinates file (see ZoneDownloader).
+        :param plan: Probed totals of the cells, searched in `order` (see ZoneDownloader).
+        """
+        self.cfg = cfg
+        self.concurrency = concurrency
+        self.since_last_run = since_last_run
+        self.state = open_state(cfg.csv_path, cfg.start_year, cfg.end_year, cfg.state_backend)
+        self.queue: queue.Queue[list[list[str]] | None] = queue.Queue(maxsize=queue_pages)
+        metrics.sample("queue_depth", self.queue.qsize, stage="pipeline")
+
+        self.search = ZoneDownloader(cfg, api, adaptive=adaptive, lean=lean,
+                                     state=self.state, on_results=self.queue.put, cells=cells,
+                                     plan=plan, order=order)
+        self.images = ImageDownloader(cfg, api, workers=workers, info_fields=info_fields,
+                                      state=self.state, post=post, shards=shards,
+                                      content=content, size=size, bandwidth=bandwidth,
+                                      max_bytes=max_bytes)
+        self._error: BaseException | None = None
+        self._search_done = False
+
+    def _produce(self) -> None:
+        try:
+            self.search.run(self.concurrency, self.since_last_run)
+        except BaseException as exc:
+            self._error = exc
+            log.error("Grid search stopped → %s", exc)
+        finally:
+            self.queue.put(self._END)
+
+    def _streamed_rows(self) -> Iterator[list[str]]:
+        for rows in iter(self.queue.get, self._END):
+            yield from rows
+        self._search_done = True
+
+    def _photos(self) -> Iterator[tuple[int, Sequence[str]]]:
+        """Yields (position, row) for every photo not downloaded nor yielded yet."""
+        done = self.state.downloaded_ids()
+        seen = PhotoIdIndex()
+        backlog = (row for _, row in self.state.pending_photos())
+
+        position = 0
+        for row in chain(backlog, self._streamed_rows()):
+            if row[2] in done or not seen.add(row[2]):
+                continue
+            position += 1
+            yield position, row
+
+    def run(self) -> None:
+        producer = threading.Thread(target=self._produce, name="search", daemon=True)
+        producer.start()
+
+        # The consumer only returns once the producer has sent the sentinel
+        try:
+            self.images.run(self._photos())
+        except BaseException:
+            # Search no further cells; the ones in progress are finished and stored
+            self.search.stop.set()
+            raise
+        finally:
+            if not self._search_done:
+                # The downloads stopped early (byte budget or an error): let the search finish
+                if not self.search.stop.is_set():
+                    log.info("Zone %s: downloads stopped, waiting for the grid search to finish", self.cfg.zone)
+                for _ in iter(self.queue.get, self._END):
+                    pass
+            producer.join()
+            self.state.close()
+
+        if self._error:
+            raise self._error
+        log.info("Zone %s: pipeline done! ✅", self.cfg.zone)
@@ -0,0 +1,67 @@
+from __future__ import annotations
+from collections import defaultdict
+from pathlib import Path
+
+from flickr_grid_downloader.config import JobConfig
+from flickr_grid_downloader.console import get_logger
+from flickr_grid_downloader.utils.shard_store import ShardWriter
+
+log = get_logger(__name__)
+
+
+class ShardRepacker:
+    """
+    Moves an existing `img/<box_id>/` tree into the tar shards of the zone. Photos already
+    in the shards are skipped, so an interrupted repack is simply run again. Files are
+    deleted only after the shard holding them has been flushed.
+    """
+    FLUSH_EVERY = 500   # photos packed between flushes (and deletions)
+
+    def __init__(self, cfg: JobConfig, max_bytes: int = 1 << 30, keep_files: bool = False) -> None:
+        self.cfg = cfg
+        self.keep_files = keep_files
+        self.shards = ShardWriter(cfg.shard_path, cfg.zone, max_bytes)
+
+    def _photos(self, box_dir: Path) -> dict[str, list[Path]]:
+        """Groups the files of a box by photo id: the image and its '_<size>' derivatives."""
+        prefix = f"{self.cfg.zone}_{box_dir.name}_"
+        photos: dict[str, list[Path]] = defaultdict(list)
+        for path in sorted(box_dir.iterdir()):
+            if not path.is_file() or not path.name.startswith(prefix) or path.suffix in (".part", ".tmp"):
+                continue
+            photo_id = path.stem[len(prefix):].split("_", 1)[0]
+            photos[photo_id].append(path)
+        return photos
+
+    def run(self) -> int:
+        """Returns the number of photos packed."""
+        packed = 0
+        done: list[Path] = []
+
+        def flush() -> None:
+            self.shards.flush()
+            if not self.keep_files:
+                for path in done:
+                    path.unlink()
+            done.clear()
+
+        for box_dir in sorted(self.cfg.img_path.iterdir()):
+            if not box_dir.is_dir() or box_dir == self.cfg.shard_path:
+                continue
+            for photo_id, files in self._photos(box_dir).items():
+                if self.shards.has(photo_id):
+                    continue
+                self.shards.add(photo_id, box_dir.name, files)
+                done += files
+                packed += 1
+                if packed % self.FLUSH_EVERY == 0:
+                    flush()
+                    log.info("%s: %d photos packed", self.cfg.zone, packed)
+
+            flush()
+            if not self.keep_files and not any(box_dir.iterdir()):
+                box_dir.rmdir()
+
+        self.shards.close()
+        log.info("✅ %s: %d photos packed into %s", self.cfg.zone, packed, self.cfg.shard_path)
+        return packed
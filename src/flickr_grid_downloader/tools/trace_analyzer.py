@@ -0,0 +1,121 @@
+from __future__ import annotations
+import json
+import math
+from array import array
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from flickr_grid_downloader.console import get_logger
+
+log = get_logger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Latency:
+    """Percentiles of the durations of one kind of event, in seconds."""
+    name: str
+    count: int
+    p50: float
+    p90: float
+    p99: float
+    max: float
+    mean: float
+
+
+@dataclass(frozen=True, slots=True)
+class CellTime:
+    """Time spent searching one cell (its partitions and delta searches included)."""
+    cell: str
+    seconds: float
+    pages: int
+    photos: int
+
+
+@dataclass(slots=True)
+class TraceSummary:
+    events: int = 0
+    invalid: int = 0                        # lines that are not trace events
+    wall: float = 0.0                       # first to last event
+    latencies: list[Latency] = field(default_factory=list)
+    cells: list[CellTime] = field(default_factory=list)
+    errors: Counter[tuple[str, str]] = field(default_factory=Counter)     # (event, status) → count
+    network: float = 0.0                    # API calls (minus decoding) and CDN transfers
+    parsing: float = 0.0                    # JSON decoding of the API responses
+    disk: float = 0.0                       # result pages, images and metadata flushes
+    api_bytes: int = 0
+    cdn_bytes: int = 0
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    return values[max(math.ceil(q * len(values)) - 1, 0)]
+
+
+def _latency(name: str, durations: array) -> Latency:
+    values = sorted(durations)
+    return Latency(name, len(values), _percentile(values, 0.5), _percentile(values, 0.9),
+                   _percentile(values, 0.99), values[-1], sum(values) / len(values))
+
+
+def analyze(path: Path, top: int = 10) -> TraceSummary:
+    """
+    Reads a trace (`--trace`) in one pass. Durations are kept per kind of event
+    (8 bytes each) for exact percentiles; cells are summed up as they come.
+    Network, parsing and disk times are summed over every thread, so with concurrent
+    workers they add up to more than the wall time: compare them with each other.
+    """
+    summary = TraceSummary()
+    durations: dict[str, array] = defaultdict(lambda: array("d"))
+    cells: dict[str, list[float]] = defaultdict(lambda: [0.0, 0, 0])     # seconds, pages, photos
+    first = last = None
+    image_writes = 0.0
+
+    with path.open() as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+                ev, t = event["ev"], event["t"]
+            except (ValueError, KeyError, TypeError):
+                summary.invalid += 1
+                continue
+            summary.events += 1
+            first = t if first is None else min(first, t)
+            last = t if last is None else max(last, t)
+            dur = event.get("dur", 0.0)
+            status = event.get("status", "ok")
+            if status not in ("ok", "downloaded", "on_disk"):
+                summary.errors[(ev, status)] += 1
+
+            if ev == "api":
+                durations[f"api {event.get('method', '?')}"].append(dur)
+                summary.parsing += event.get("parse", 0.0)
+                summary.network += dur - event.get("parse", 0.0)
+                summary.api_bytes += event.get("bytes", 0)
+            elif ev == "page":
+                durations["search page"].append(dur)
+                # '<box_id>#<partition>' leaves and '<box_id>@<mark>' deltas belong to their cell
+                cell = cells[str(event.get("cell", "?")).split("#", 1)[0].split("@", 1)[0]]
+                cell[0] += dur
+                cell[1] += 1
+                cell[2] += event.get("photos", 0)
+            elif ev == "image":
+                durations[f"image {status}"].append(dur)
+                summary.network += dur
+                summary.cdn_bytes += event.get("bytes", 0)
+            elif ev == "write":
+                what = event.get("what", "?")
+                durations[f"write {what}"].append(dur)
+                summary.disk += dur
+                if what == "image":         # also inside the duration of its image event
+                    image_writes += dur
+
+    summary.network -= image_writes
+    if first is not None:
+        summary.wall = last - first
+    summary.latencies = [_latency(name, values) for name, values in sorted(durations.items())]
+    slowest = sorted(cells.items(), key=lambda item: -item[1][0])[:top]
+    summary.cells = [CellTime(cell, seconds, int(pages), int(photos)) for cell, (seconds, pages, photos) in slowest]
+    if summary.invalid:
+        log.warning("%d lines of %s are not trace events", summary.invalid, path)
+    return summary
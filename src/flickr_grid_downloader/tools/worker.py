@@ -0,0 +1,111 @@
+from __future__ import annotations
+import time
+from typing import Any
+
+from flickr_grid_downloader.config import JobConfig
+from flickr_grid_downloader.console import get_logger
+from flickr_grid_downloader.tools.grid_downloader import ZoneDownloader
+from flickr_grid_downloader.tools.image_downloader import ImageDownloader
+from flickr_grid_downloader.utils.cell_plan import CellPlan
+from flickr_grid_downloader.utils.flickr_client import FlickrClient
+from flickr_grid_downloader.utils.image_size import SizePolicy
+from flickr_grid_downloader.utils.metrics import metrics
+from flickr_grid_downloader.utils.work_queue import LeaseKeeper, Task, WorkQueue
+
+log = get_logger(__name__)
+
+# Task spec keys read by the worker (set by `fgd enqueue`)
+GRID_OPTIONS = ("adaptive", "lean", "since_last_run", "order")
+IMAGE_OPTIONS = ("raw", "info_fields", "image_size")
+JOB_OPTIONS = ("delimiter", "xx_column", "yx_column", "xy_column", "yy_column", "state_backend")
+
+
+class Worker:
+    """
+    Runs the tasks of a shared WorkQueue until it is empty (or forever):
+    • 'grid' tasks search the cells of a zone (ZoneDownloader.run).
+    • 'images' tasks download its photos (ImageDownloader.run) once its search is done.
+    Both resume from the checkpoints of the zone, so a task reclaimed after a crash
+    only repeats the pages or photos the crashed worker had in flight. Concurrency and
+    bandwidth are node settings; the API budget is the one of the shared client limiter.
+    """
+    def __init__(self, queue: WorkQueue, api: FlickrClient, *, cdn_url: str, concurrency: int = 1,
+                 workers: int = 1, bandwidth: float = 0, poll: float = 10.0, exit_when_idle: bool = False) -> None:
+        """
+        :param concurrency: Search concurrency of grid tasks (see ZoneDownloader.run).
+        :param workers: Download workers of images tasks (see ImageDownloader).
+        :param bandwidth: CDN bytes per second of this node (0 = unlimited).
+        :param poll: Seconds between two claims while no task is runnable.
+        :param exit_when_idle: Return once no task is pending or leased by any worker.
+        """
+        self.queue = queue
+        self.api = api
+        self.cdn_url = cdn_url
+        self.concurrency = concurrency
+        self.workers = workers
+        self.bandwidth = bandwidth
+        self.poll = poll
+        self.exit_when_idle = exit_when_idle
+        self.done = 0
+
+    def _config(self, task: Task) -> JobConfig:
+        options = {k: task.spec[k] for k in JOB_OPTIONS if k in task.spec}
+        return JobConfig(
+            zone=task.zone,
+            start_year=task.start_year,
+            end_year=task.end_year,
+            api_key=self.api.api_key,
+            api_secret=self.api.api_secret,
+            download_raw_metadata=task.spec.get("raw", False),
+            cdn_url=self.cdn_url,
+            **options,
+        )
+
+    def _run_task(self, task: Task) -> None:
+        cfg = self._config(task)
+        spec: dict[str, Any] = task.spec
+        if task.stage == "grid":
+            # The plan of the zone (`fgd plan`), when it was probed on the shared output
+            plan = CellPlan.for_zone(cfg.csv_path, cfg.start_year, cfg.end_year)
+            downloader = ZoneDownloader(cfg, self.api, adaptive=spec.get("adaptive", False),
+                                        lean=spec.get("lean", False), plan=plan if len(plan) else None,
+                                        order=spec.get("order", "file"))
+            downloader.run(self.concurrency, spec.get("since_last_run", False))
+        else:
+            ImageDownloader(cfg, self.api, workers=self.workers, info_fields=spec.get("info_fields", ()),
+                            size=SizePolicy.parse(spec.get("image_size", "b")),
+                            bandwidth=self.bandwidth).run()
+
+    def run(self) -> None:
+        log.info("Worker %s polling %s", self.queue.owner, self.queue.path)
+        while True:
+            task = self.queue.claim()
+            if task is None:
+                counts = self.queue.counts()
+                if self.exit_when_idle and not counts["pending"] and not counts["leased"]:
+                    break
+                time.sleep(self.poll)
+                continue
+
+            log.info("Task %s: started (attempt %d)", task, task.attempts)
+            started = time.monotonic()
+            try:
+                with LeaseKeeper(self.queue, task):
+                    self._run_task(task)
+            except KeyboardInterrupt:
+                self.queue.release(task)
+                log.warning("Task %s: interrupted, given back to the queue", task)
+                metrics.inc("queue_tasks_total", stage=task.stage, outcome="released")
+                raise
+            except Exception as exc:
+                self.queue.fail(task, f"{type(exc).__name__}: {exc}")
+                log.error("Task %s: failed → %s", task, exc)
+                metrics.inc("queue_tasks_total", stage=task.stage, outcome="failed")
+                continue
+
+            self.queue.complete(task)
+            self.done += 1
+            metrics.inc("queue_tasks_total", stage=task.stage, outcome="done")
+            log.info("Task %s: done in %.0fs", task, time.monotonic() - started)
+
+        log.info("Worker %s: queue empty after %d task(s) ✅", self.queue.owner, self.done)
@@ -0,0 +1,46 @@
+from __future__ import annotations
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from flickr_grid_downloader.utils.flickr_client import FlickrClient
+
+
+class AsyncFlickrClient:
+    """
+    asyncio facade over FlickrClient.
+    The blocking calls run on a bounded thread pool, so `concurrency` requests can be
+    in flight at once while the session pool, the response cache and the rate limiter
+    of the wrapped client stay shared with the synchronous code.
+    """
+    def __init__(self, client: FlickrClient, concurrency: int = 8) -> None:
+        """
+        :param client: Client doing the actual requests (its limiter sets the global budget).
+        :param concurrency: Maximum number of requests in flight.
+        """
+        self.client = client
+        self.concurrency = concurrency
+        self._pool = ThreadPoolExecutor(concurrency, thread_name_prefix="async-api")
+
+    async def _call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+
+    # ---------------- high‑level API ---------------
+    async def search_photos(self, **params: Any) -> dict[str, Any]:
+        """Async version of FlickrClient.search_photos."""
+        return await self._call(self.client.search_photos, **params)
+
+    async def get_info(self, photo_id: str) -> dict[str, Any]:
+        """Async version of FlickrClient.get_info."""
+        return await self._call(self.client.get_info, photo_id)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    async def __aenter__(self) -> AsyncFlickrClient:
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self.close()
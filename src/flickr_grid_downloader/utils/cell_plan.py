@@ -0,0 +1,90 @@
+from __future__ import annotations
+import csv
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, Sequence
+
+from flickr_grid_downloader.constants import FLICKR_PAGINATION_LIMIT
+
+# Crawl orders of `download-grid --order`
+ORDERS = ("file", "largest", "cap")
+
+
+class CellPlan:
+    """
+    Photo totals of the cells of a zone, probed by `fgd plan` with one-result searches:
+    plan_<y>_<y>.csv → [box_id, total] (later rows win, so a re-probe simply appends).
+    The crawl uses it to visit cells in a chosen order and to record empty cells
+    without searching them.
+    """
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.totals: dict[str, int] = {}
+        if path.exists():
+            self._drop_torn_line()
+            with path.open(newline="") as f:
+                for row in csv.reader(f):
+                    if len(row) == 2 and row[1].isdigit():      # skip a malformed row
+                        self.totals[row[0]] = int(row[1])
+
+    def _drop_torn_line(self) -> None:
+        """Truncates a last row left unterminated by a crash: its total may be cut short."""
+        data = self.path.read_bytes()
+        if data and not data.endswith(b"\n"):
+            with self.path.open("r+b") as f:
+                f.truncate(data.rfind(b"\n") + 1)
+
+    @classmethod
+    def for_zone(cls, csv_dir: Path, start_year: int, end_year: int) -> CellPlan:
+        return cls(csv_dir / f"plan_{start_year}_{end_year}.csv")
+
+    def __len__(self) -> int:
+        return len(self.totals)
+
+    def total(self, box_id: str) -> int | None:
+        """Probed total of the cell, or None when it was not probed."""
+        return self.totals.get(box_id)
+
+    def add(self, rows: Sequence[tuple[str, int]]) -> None:
+        with self.path.open("a", newline="") as f:
+            csv.writer(f).writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        self.totals.update(rows)
+
+    @staticmethod
+    def _key(order: str, total: int) -> tuple[int, ...]:
+        if order == "largest":
+            return (-total,)
+        # Cells at or over the pagination cap first, then the ones under it; nearest first
+        return (total < FLICKR_PAGINATION_LIMIT, abs(total - FLICKR_PAGINATION_LIMIT))
+
+    def order(self, cells: Iterable[tuple[int, str, str]], order: str) -> Iterator[tuple[int, str, str]]:
+        """
+        Yields (position, box_id, bbox) in the given order ('file', 'largest' or 'cap').
+        Cells without a probed total follow the planned ones in file order. Orders other
+        than 'file' hold the cells of the zone in memory to sort them.
+        """
+        if order not in ORDERS:
+            raise ValueError(f"Unknown order '{order}'. Expected one of {ORDERS}")
+        if order == "file":
+            yield from cells
+            return
+
+        planned: list[tuple[tuple[int, ...], int, str, str]] = []
+        unplanned: list[tuple[str, str]] = []
+        for idx, box_id, bbox in cells:
+            total = self.totals.get(box_id)
+            if total is None:
+                unplanned.append((box_id, bbox))
+            else:
+                planned.append((self._key(order, total), idx, box_id, bbox))
+        planned.sort()
+
+        position = 0
+        for *_, box_id, bbox in planned:
+            position += 1
+            yield position, box_id, bbox
+        for box_id, bbox in unplanned:
+            position += 1
+            yield position, box_id, bbox
@@ -0,0 +1,123 @@
+from __future__ import annotations
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+from flickr_grid_downloader.console import get_logger
+from flickr_grid_downloader.constants import CONTENT_INDEX_FILE
+
+log = get_logger(__name__)
+
+
+def file_sha256(path: Path, chunk: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while block := f.read(chunk):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def dhash(path: Path) -> str:
+    """64-bit difference hash (needs Pillow): close values mean visually similar images."""
+    from PIL import Image
+
+    with Image.open(path) as im:
+        im.draft("L", (64, 64))
+        pixels = im.convert("L").resize((9, 8), Image.Resampling.BILINEAR).tobytes()
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+
+def link_or_copy(src: Path, dest: Path) -> None:
+    """Replaces `dest` with a hardlink to `src` (a copy across file systems)."""
+    tmp = dest.with_name(dest.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dest)
+
+
+class ContentIndex:
+    """
+    Images stored by every zone, shared through one SQLite file (WAL, so zones can run
+    side by side):
+    • `photos`: photo id → sha256, size and file, so a photo found again (overlapping zones
+      or boxes) is hardlinked from the existing file instead of downloaded.
+    • `contents`: (sha256, size) → canonical file, so a byte-identical re-upload under
+      another id is collapsed into a hardlink of the first copy.
+    Paths are stored relative to the index directory. Entries whose file is gone (e.g.
+    packed into shards or dropped after post-processing) are ignored and replaced.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS photos (
+            photo_id TEXT PRIMARY KEY, sha256 TEXT, size INTEGER, path TEXT, phash TEXT
+        );
+        CREATE TABLE IF NOT EXISTS contents (
+            sha256 TEXT, size INTEGER, path TEXT, PRIMARY KEY (sha256, size)
+        );
+    """
+
+    def __init__(self, path: Path = CONTENT_INDEX_FILE, phash: bool = False) -> None:
+        """:param phash: Also store a perceptual hash (dHash) of every image; needs Pillow."""
+        self.path = path
+        self.root = path.parent
+        self.phash = phash
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=60)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+
+    def _rel(self, path: Path) -> str:
+        return os.path.relpath(path, self.root)
+
+    def _existing(self, rel: str | None) -> Path | None:
+        path = self.root / rel if rel else None
+        return path if path and path.exists() else None
+
+    def find_photo(self, photo_id: str) -> Path | None:
+        """Returns the stored file of `photo_id`, if it is still on disk."""
+        with self._lock:
+            row = self._db.execute("SELECT path FROM photos WHERE photo_id = ?", (photo_id,)).fetchone()
+        return self._existing(row[0] if row else None)
+
+    def add(self, photo_id: str, path: Path) -> dict[str, Any]:
+        """
+        Registers a stored image. When the same bytes are already stored under another
+        file, `path` is replaced by a hardlink to it.
+        :return: The `content` entry of the photo record: sha256, size, phash and
+                 duplicate_of (the canonical file relative to the output directory, or None).
+        """
+        sha, size = file_sha256(path), path.stat().st_size
+        try:
+            phash = dhash(path) if self.phash else None
+        except OSError:         # not an image Pillow can decode; the bytes are still indexed
+            phash = None
+        rel = self._rel(path)
+
+        with self._lock, self._db:
+            row = self._db.execute("SELECT path FROM contents WHERE sha256 = ? AND size = ?",
+                                   (sha, size)).fetchone()
+            canonical = self._existing(row[0] if row else None)
+            if canonical is None:
+                self._db.execute("INSERT OR REPLACE INTO contents VALUES (?, ?, ?)", (sha, size, rel))
+            elif not os.path.samefile(canonical, path):
+                link_or_copy(canonical, path)
+            self._db.execute("INSERT OR REPLACE INTO photos VALUES (?, ?, ?, ?, ?)",
+                             (photo_id, sha, size, rel, phash))
+
+        duplicate_of = row[0] if canonical and row[0] != rel else None
+        return {"sha256": sha, "size": size, "phash": phash, "duplicate_of": duplicate_of}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,128 @@
+from __future__ import annotations
+import time
+from collections import deque
+
+from rich.console import Group
+from rich.live import Live
+from rich.panel import Panel
+from rich.progress_bar import ProgressBar
+from rich.table import Table
+
+from flickr_grid_downloader.console import console
+from flickr_grid_downloader.utils.metrics import Metrics, metrics
+
+MB = 1 << 20
+
+
+def _duration(seconds: float | None) -> str:
+    if seconds is None:
+        return "–"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def _ms(seconds: float | None) -> str:
+    return "–" if seconds is None else f"{seconds * 1000:.0f} ms"
+
+
+class MetricsDashboard:
+    """
+    Live Rich panel over the metrics registry, redrawn below the log lines:
+    progress and ETA of every stage, API latency percentiles, retries and errors per
+    method, rate-limiter waits, CDN throughput and the depth of the stage queues.
+    Rates are measured over the last WINDOW seconds, so they follow changes of pace.
+    """
+    WINDOW = 30.0
+
+    def __init__(self, registry: Metrics = metrics, refresh_per_second: float = 2) -> None:
+        self.registry = registry
+        self._samples: deque[tuple[float, dict[str, float]]] = deque()
+        self.live = Live(console=console, refresh_per_second=refresh_per_second, get_renderable=self._render)
+
+    def start(self) -> MetricsDashboard:
+        self.live.start()
+        return self
+
+    def close(self) -> None:
+        self.live.stop()
+
+    # ---------- Rates ----------
+    def _rates(self, values: dict[str, float]) -> dict[str, float]:
+        """Per-second change of every value over the sliding window."""
+        now = time.monotonic()
+        self._samples.append((now, values))
+        while len(self._samples) > 2 and now - self._samples[1][0] >= self.WINDOW:
+            self._samples.popleft()
+        then, old = self._samples[0]
+        elapsed = now - then
+        if elapsed <= 0:
+            return {key: 0.0 for key in values}
+        return {key: (value - old.get(key, 0.0)) / elapsed for key, value in values.items()}
+
+    # ---------- Rendering ----------
+    def _render(self) -> Panel:
+        r = self.registry
+        stages = r.label_values("progress_done", "stage")
+        methods = r.label_values("api_requests_total", "method")
+
+        values = {f"stage:{s}": r.gauge("progress_done", stage=s) or 0.0 for s in stages}
+        values |= {f"api:{m}": r.counter("api_requests_total", method=m) for m in methods}
+        values |= {"photos": r.counter("photos_total"), "bytes": r.counter("cdn_bytes_total"),
+                   "wait": r.counter("rate_limit_wait_seconds_total")}
+        rates = self._rates(values)
+
+        parts = []
+        if stages:
+            progress = Table.grid(padding=(0, 2))
+            for stage in stages:
+                done = values[f"stage:{stage}"]
+                total = r.gauge("progress_total", stage=stage)
+                rate = rates[f"stage:{stage}"]
+                eta = (total - done) / rate if total and rate > 0 else None
+                progress.add_row(
+                    f"[bold]{stage}[/]",
+                    ProgressBar(total=total or None, completed=done, width=30),
+                    f"{done:,.0f}/{total:,.0f}" if total else f"{done:,.0f}",
+                    f"{rate:.1f}/s", f"ETA {_duration(eta)}",
+                )
+            parts.append(progress)
+
+        if methods:
+            api = Table(box=None, padding=(0, 1), header_style="bold cyan")
+            for column in ("API", "Requests", "Req/s", "p50", "p95", "Retries", "Errors", "Cached"):
+                api.add_column(column, justify="left" if column == "API" else "right", no_wrap=True)
+            for m in methods:
+                h = r.histogram("api_request_seconds", method=m)
+                requests = values[f"api:{m}"]
+                api.add_row(
+                    m.removeprefix("flickr.photos."), f"{requests:,.0f}", f"{rates[f'api:{m}']:.1f}",
+                    _ms(h.quantile(0.5) if h else None), _ms(h.quantile(0.95) if h else None),
+                    f"{r.counter('api_retries_total', method=m):,.0f}",
+                    f"{requests - r.counter('api_requests_total', method=m, outcome='ok'):,.0f}",
+                    f"{r.counter('api_cache_hits_total', method=m):,.0f}",
+                )
+            parts.append(api)
+
+        cdn = r.histogram("cdn_request_seconds")
+        queues = "  ".join(f"{stage} {r.gauge('queue_depth', stage=stage) or 0:,.0f}"
+                           for stage in r.label_values("queue_depth", "stage"))
+        outcomes = "  ".join(f"{outcome} {r.counter('photos_total', outcome=outcome):,.0f}"
+                             for outcome in r.label_values("photos_total", "outcome"))
+        uptime = time.monotonic() - r.started
+        summary = Table.grid(padding=(0, 2))
+        summary.add_row("[bold]Photos[/]", f"{rates['photos']:.1f}/s", outcomes or "–")
+        summary.add_row("[bold]CDN[/]", f"{rates['bytes'] / MB:.2f} MB/s",
+                        f"{values['bytes'] / MB:,.1f} MB, p95 {_ms(cdn.quantile(0.95) if cdn else None)} per image, "
+                        f"{r.counter('cdn_errors_total'):,.0f} errors, "
+                        f"disk {r.counter('disk_write_seconds_total'):.1f}s")
+        summary.add_row("[bold]Rate limit[/]", f"{rates['wait']:.1f} waiting",
+                        f"threads on average; {values['wait']:.1f}s in total over {_duration(uptime)}")
+        if queues:
+            summary.add_row("[bold]Queues[/]", "", queues)
+        parts.append(summary)
+
+        return Panel(Group(*parts), title="flickr-grid-downloader", border_style="blue")
@@ -1,35 +1,177 @@
 import json
+import random
+import time
 from typing import Any
 import certifi
 import requests
+from requests.adapters import HTTPAdapter
 
-from flickr_grid_downloader.constants import API_METHODS, API_BASE_TEMPLATE
+from flickr_grid_downloader.console import get_logger
+from flickr_grid_downloader.constants import (
+    API_METHODS, API_BASE_TEMPLATE, API_REST_URL, RETRY_HTTP_STATUSES, RETRY_FLICKR_CODES
+)
+from flickr_grid_downloader.utils.key_pool import KeyPool
+from flickr_grid_downloader.utils.metrics import metrics
+from flickr_grid_downloader.utils.rate_limiter import TokenBucket
+from flickr_grid_downloader.utils.response_cache import CacheMiss, ResponseCache
+from flickr_grid_downloader.utils.trace import tracer
+
+log = get_logger(__name__)
+
+
+class TransientError(Exception):
+    """A failed API call that may succeed if retried."""
+    def __init__(self, message: str, retry_after: float | None = None, outcome: str = "error") -> None:
+        """:param outcome: Label of the failure in the `api_requests_total` metric."""
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.outcome = outcome
 
 
 class FlickrClient:
-    def __init__(self, *, api_key: str, api_secret: str, timeout: int = 30):
+    def __init__(self, *, api_key: str, api_secret: str, timeout: int = 30,
+                 limiter: TokenBucket | None = None, pool_size: int = 10,
+                 cache: ResponseCache | None = None, retries: int = 5,
+                 backoff: float = 1.0, max_backoff: float = 60.0, keys: KeyPool | None = None,
+                 api_url: str = API_REST_URL):
+        """
+        :param limiter: Optional token bucket shared by every thread using this client.
+        :param pool_size: Max pooled connections; must be >= the number of concurrent workers.
+        :param cache: Optional on-disk response cache. Hits skip the network and the limiter.
+        :param retries: Extra attempts for transient failures (network errors, 429/5xx,
+                        truncated JSON, retryable Flickr error codes).
+        :param backoff: Base delay in seconds; attempt n waits up to backoff * 2**n ("full jitter").
+        :param max_backoff: Upper bound of a single wait.
+        :param keys: Optional pool of API keys. Each request uses the key with the most hourly
+                     budget left, and a rate-limited key is cooled down while the retry goes
+                     to another one. Without it every request uses `api_key`.
+        :param api_url: REST endpoint, e.g. a local mock server for benchmarks.
+        """
         self.api_key    = api_key
         self.api_secret = api_secret
-        self.base = API_BASE_TEMPLATE.format(api_key=api_key)
+        self.api_url = api_url
+        self.base = API_BASE_TEMPLATE.format(rest_url=api_url, api_key=api_key)
         self.session = requests.Session()
         self.session.params = {"format": "json"}   # siempre JSON
         self.session.verify = certifi.where()      #  ✅ bundle actualizado
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self.timeout = timeout
+        self.limiter = limiter
+        self.cache = cache
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.keys = keys
 
     # ---------------- HTTP helpers -----------------
+    def _request(self, method: str, params: dict[str, Any]) -> dict[str, Any]:
+        """
+        One API call. Failures that may go away on their own are raised as TransientError.
+        """
+        api_key = None
+        name = API_METHODS[method]
+        if self.keys:
+            waited = time.perf_counter()
+            api_key, _ = self.keys.acquire()
+            metrics.inc("rate_limit_wait_seconds_total", time.perf_counter() - waited, source="key_pool")
+            url = f"{API_BASE_TEMPLATE.format(rest_url=self.api_url, api_key=api_key)}{name}"
+        else:
+            url = f"{self.base}{name}"
+        if self.limiter:
+            metrics.inc("rate_limit_wait_seconds_total", self.limiter.acquire(), source="token_bucket")
+
+        outcome = "error"
+        nbytes, parse = 0, 0.0
+        start = time.perf_counter()
+        try:
+            data, nbytes, parse = self._send(url, params, api_key)
+            outcome = "ok" if data.get("stat") == "ok" else f"flickr_{data.get('code')}"
+            return data
+        except TransientError as exc:
+            outcome = exc.outcome
+            raise
+        except requests.HTTPError as exc:
+            outcome = f"http_{exc.response.status_code}"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.observe("api_request_seconds", elapsed, method=name)
+            metrics.inc("api_requests_total", method=name, outcome=outcome)
+            if tracer.enabled:
+                ids = {k: params[k] for k in ("photo_id", "page") if k in params}
+                tracer.event("api", elapsed, method=name, status=outcome, bytes=nbytes,
+                             parse=round(parse, 6), **ids)
+
+    def _send(self, url: str, params: dict[str, Any], api_key: str | None) -> tuple[dict[str, Any], int, float]:
+        """:return: (response, bytes received, seconds spent decoding the JSON)"""
+        try:
+            r = self.session.get(url, params=params, timeout=self.timeout)
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            raise TransientError(f"{type(exc).__name__}: {exc}", outcome="network") from exc
+
+        if r.status_code in RETRY_HTTP_STATUSES:
+            header = r.headers.get("Retry-After", "")
+            retry_after = float(header) if header.isdigit() else None
+            if r.status_code == 429 and self.keys and len(self.keys) > 1:
+                self.keys.cooldown(api_key, retry_after)
+                retry_after = 0     # the retry goes to another key
+            raise TransientError(f"HTTP {r.status_code}", retry_after, outcome=f"http_{r.status_code}")
+        r.raise_for_status()
+        # Flickr API retunrns JSONP like: jsonFlickrApi({...}), so we need to strip the callback function: 
+        parsing = time.perf_counter()
+        payload = r.text[14:-1]
+        try:
+            data = json.loads(payload)
+        except json.JSONDecodeError as exc:
+            raise TransientError(f"Invalid JSON ({exc})", outcome="invalid_json") from exc
+        parse = time.perf_counter() - parsing
+
+        if data.get("stat") != "ok" and data.get("code") in RETRY_FLICKR_CODES:
+            raise TransientError(f"Flickr error {data['code']}: {data.get('message', '')}",
+                                 outcome=f"flickr_{data['code']}")
+        return data, len(r.content), parse
+
+    def _delay(self, attempt: int, exc: TransientError) -> float:
+        if exc.retry_after is not None:
+            return min(exc.retry_after, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
     def _get(self, method: str, **params: Any) -> dict[str, Any]:
         """
-        Make a GET request to the Flickr API.
+        Make a GET request to the Flickr API, retrying transient failures with
+        exponential backoff and jitter.
         :param method: The API method to call.
         :param params: Additional parameters for the API request.
         :return: Parsed JSON response from the API.
         """
-        url = f"{self.base}{API_METHODS[method]}"
-        r = self.session.get(url, params=params, timeout=self.timeout)
-        r.raise_for_status()
-        # Flickr API retunrns JSONP like: jsonFlickrApi({...}), so we need to strip the callback function: 
-        payload = r.text[14:-1]
-        return json.loads(payload)
+        if self.cache:
+            cached = self.cache.get(method, params)
+            if cached is not None:
+                metrics.inc("api_cache_hits_total", method=API_METHODS[method])
+                tracer.event("cache", method=API_METHODS[method])
+                return cached
+            if self.cache.offline:
+                raise CacheMiss(f"{API_METHODS[method]} {params} is not cached")
+
+        for attempt in range(self.retries + 1):
+            try:
+                data = self._request(method, params)
+                break
+            except TransientError as exc:
+                if attempt == self.retries:
+                    raise
+                delay = self._delay(attempt, exc)
+                metrics.inc("api_retries_total", method=API_METHODS[method])
+                log.warning("%s failed (%s); retry %d/%d in %.1fs",
+                            API_METHODS[method], exc, attempt + 1, self.retries, delay)
+                time.sleep(delay)
+
+        # Only successful answers are cached; errors must be retried
+        if self.cache and data.get("stat") == "ok":
+            self.cache.put(method, params, data)
+        return data
 
     # ---------------- high‑level API ---------------
     def search_photos(self, **params):
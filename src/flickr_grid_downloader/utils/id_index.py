@@ -0,0 +1,162 @@
+from __future__ import annotations
+import csv
+import os
+import struct
+import zlib
+from array import array
+from bisect import bisect_left
+from heapq import merge
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from flickr_grid_downloader.utils.metadata_store import write_atomic
+
+# File layout: magic, source offset, output size, source fingerprint, id count,
+# then the sorted int64 ids.
+MAGIC  = b"FGDIDX1\0"
+HEADER = struct.Struct("<8sqqIq")
+FINGERPRINT_BYTES = 64 * 1024
+
+
+def fingerprint(path: Path, offset: int) -> int:
+    """CRC of the first bytes of an indexed file; detects a file rewritten since indexing."""
+    if not path.exists():
+        return 0
+    with path.open("rb") as f:
+        return zlib.crc32(f.read(min(offset, FINGERPRINT_BYTES)))
+
+
+def iter_csv_from(path: Path, offset: int = 0) -> Iterator[tuple[list[str], int]]:
+    """
+    Yields (row, end_offset) for every complete CSV row after `offset` bytes.
+    A trailing line without newline (a write in progress or torn by a crash) is not read,
+    so `end_offset` is always a safe place to resume from.
+    """
+    with path.open("rb") as f:
+        f.seek(offset)
+        position = offset
+
+        def lines() -> Iterator[str]:
+            nonlocal position
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return
+                position += len(line)
+                yield line.decode()
+
+        try:
+            for row in csv.reader(lines()):
+                yield row, position
+        except csv.Error:
+            return      # quoted field cut by the torn tail; resume before it next time
+
+
+class PhotoIdIndex:
+    """
+    Compact set of Flickr photo ids (which are numeric):
+    • ids live in a sorted int64 `array` (8 bytes each) searched with bisect.
+    • new ids go to a small set that is merged into the array every MERGE_EVERY adds.
+    • `offset` / `out_size` remember how much of a source CSV (and of the file derived
+      from it) the index covers, so it can be updated with only the appended bytes.
+    """
+    MERGE_EVERY = 65_536
+
+    def __init__(self, ids: array | None = None, offset: int = 0, out_size: int = 0, crc: int = 0) -> None:
+        self._ids = ids if ids is not None else array("q")
+        self._new: set[int] = set()
+        self.offset = offset
+        self.out_size = out_size
+        self.crc = crc
+
+    def matches(self, source: Path) -> bool:
+        """True when `source` still starts with the bytes this index was built from."""
+        return source.exists() and self.offset <= source.stat().st_size \
+            and fingerprint(source, self.offset) == self.crc
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._new)
+
+    def __contains__(self, photo_id: str | int) -> bool:
+        key = int(photo_id)
+        if key in self._new:
+            return True
+        i = bisect_left(self._ids, key)
+        return i < len(self._ids) and self._ids[i] == key
+
+    def add(self, photo_id: str | int) -> bool:
+        """Adds an id. Returns False when it was already present."""
+        if photo_id in self:
+            return False
+        self._new.add(int(photo_id))
+        if len(self._new) >= self.MERGE_EVERY:
+            self.compact()
+        return True
+
+    def compact(self) -> None:
+        """Merges the recently added ids into the sorted array."""
+        if self._new:
+            self._ids = array("q", merge(self._ids, sorted(self._new)))
+            self._new.clear()
+
+    # ---------- Persistence ----------
+    def save(self, path: Path, source: Path) -> None:
+        """Saves the index of `source` (fingerprinted up to `offset`)."""
+        self.compact()
+        self.crc = fingerprint(source, self.offset)
+        header = HEADER.pack(MAGIC, self.offset, self.out_size, self.crc, len(self._ids))
+        write_atomic(path, header + self._ids.tobytes())
+
+    @staticmethod
+    def write(path: Path, source: Path, offset: int, out_size: int, count: int,
+              chunks: Iterable[array]) -> None:
+        """Writes an index file from already sorted, unique id chunks (external-sort output)."""
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("wb") as f:
+            f.write(HEADER.pack(MAGIC, offset, out_size, fingerprint(source, offset), count))
+            for chunk in chunks:
+                chunk.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> PhotoIdIndex | None:
+        """Loads an index file, or returns None when it is missing or unreadable."""
+        if not path.exists():
+            return None
+        with path.open("rb") as f:
+            head = f.read(HEADER.size)
+            if len(head) < HEADER.size:
+                return None
+            magic, offset, out_size, crc, count = HEADER.unpack(head)
+            if magic != MAGIC:
+                return None
+            ids = array("q")
+            try:
+                ids.fromfile(f, count)
+            except EOFError:
+                return None
+        return cls(ids, offset, out_size, crc)
+
+    @classmethod
+    def for_csv(cls, csv_path: Path, column: int = 0) -> PhotoIdIndex:
+        """
+        Returns the index of the ids in `column` of a CSV, kept in '<csv>.idx' and
+        updated with the rows appended since it was last saved.
+        """
+        idx_path = csv_path.with_name(csv_path.name + ".idx")
+        if not csv_path.exists():
+            return cls()
+
+        index = cls.load(idx_path)
+        if index is None or not index.matches(csv_path):    # missing, or the CSV was rewritten
+            index = cls()
+        if index.offset == csv_path.stat().st_size:
+            return index
+
+        for row, end in iter_csv_from(csv_path, index.offset):
+            if row:
+                index.add(row[column])
+            index.offset = end
+        index.save(idx_path, csv_path)
+        return index
@@ -0,0 +1,148 @@
+from __future__ import annotations
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+import certifi
+import requests
+from requests.adapters import HTTPAdapter
+
+from flickr_grid_downloader.console import get_logger
+from flickr_grid_downloader.utils.metrics import metrics
+from flickr_grid_downloader.utils.rate_limiter import TokenBucket
+from flickr_grid_downloader.utils.trace import tracer
+
+log = get_logger(__name__)
+
+CONTENT_RANGE = re.compile(r"bytes (\d+)-\d+/(\d+|\*)")
+
+
+class IncompleteDownload(IOError):
+    """The body received does not match the size announced by the server."""
+
+
+class ImageFetcher:
+    """
+    Downloads images from the Flickr CDN (live.staticflickr.com):
+    • One requests.Session with a connection pool, so workers reuse keep-alive connections.
+    • The body is streamed in CHUNK-sized blocks into '<name>.part' and renamed to the
+      final name only when its size matches Content-Length, so a crash never leaves a
+      truncated image under the final name.
+    • A leftover '.part' is resumed with an HTTP Range request.
+    • An existing image is skipped when its size matches the server's (HEAD request).
+    • With a byte-rate limiter every chunk takes its size in tokens, so all workers
+      together stay under the bandwidth budget.
+    """
+    CHUNK = 1 << 20     # bytes per read / write
+    MIN_CHUNK = 16 << 10
+
+    def __init__(self, pool_size: int = 10, timeout: int = 60, attempts: int = 3,
+                 limiter: TokenBucket | None = None) -> None:
+        """
+        :param pool_size: Max pooled connections; must be >= the number of concurrent workers.
+        :param attempts: Tries per image; after a dropped connection the next try resumes
+                         from the bytes already received.
+        :param limiter: Optional bucket of bytes per second shared by every worker.
+        """
+        self.timeout = timeout
+        self.attempts = attempts
+        self.limiter = limiter
+        # Throttled reads are smaller, so the waits are spread over the transfer
+        self.chunk = self.CHUNK if limiter is None else int(min(self.CHUNK, max(self.MIN_CHUNK, limiter.rate / 10)))
+        self._lock = threading.Lock()
+        self.received = 0           # bytes received by this fetcher, partial images included
+        self.session = requests.Session()
+        self.session.verify = certifi.where()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @staticmethod
+    def part_path(dest: Path) -> Path:
+        return dest.with_name(dest.name + ".part")
+
+    def _remote_size(self, url: str) -> int | None:
+        r = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+        r.raise_for_status()
+        length = r.headers.get("Content-Length")
+        return int(length) if length else None
+
+    def is_complete(self, url: str, dest: Path) -> bool:
+        """True when `dest` exists with the size the CDN reports for `url`."""
+        if not dest.exists():
+            return False
+        size = self._remote_size(url)
+        return size is None or dest.stat().st_size == size
+
+    def fetch(self, url: str, dest: Path) -> bool:
+        """
+        Downloads `url` to `dest`.
+        :return: False when the image was already complete on disk, True when downloaded.
+        :raises: requests exceptions or IncompleteDownload once all attempts fail
+                 (the '.part' file is kept for the next run).
+        """
+        if self.is_complete(url, dest):
+            return False
+
+        start = time.perf_counter()
+        for attempt in range(1, self.attempts + 1):
+            try:
+                self._fetch_part(url, dest)
+                metrics.observe("cdn_request_seconds", time.perf_counter() - start)
+                return True
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                    IncompleteDownload) as exc:
+                if attempt == self.attempts:
+                    raise
+                log.debug("Image %s interrupted (%s); resuming, attempt %d/%d",
+                          url, exc, attempt + 1, self.attempts)
+
+    def _fetch_part(self, url: str, dest: Path) -> None:
+        part = self.part_path(dest)
+        offset = part.stat().st_size if part.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as r:
+            if r.status_code == 416:            # the part is not a prefix of this image any more
+                part.unlink()
+                raise IncompleteDownload(f"range {offset}- not satisfiable, restarting")
+            r.raise_for_status()
+
+            if r.status_code == 206:
+                match = CONTENT_RANGE.match(r.headers.get("Content-Range", ""))
+                if not match or int(match.group(1)) != offset:
+                    part.unlink()
+                    raise IncompleteDownload("unexpected Content-Range, restarting")
+                expected = None if match.group(2) == "*" else int(match.group(2))
+                mode = "ab"
+            else:                               # full body: the server ignored the Range
+                length = r.headers.get("Content-Length")
+                expected = int(length) if length and "Content-Encoding" not in r.headers else None
+                mode = "wb"
+
+            disk, nbytes = 0.0, 0
+            with part.open(mode, buffering=self.CHUNK) as f:
+                for chunk in r.iter_content(chunk_size=self.chunk):
+                    metrics.inc("cdn_bytes_total", len(chunk))
+                    with self._lock:
+                        self.received += len(chunk)
+                    if self.limiter:
+                        metrics.inc("rate_limit_wait_seconds_total", self.limiter.acquire(len(chunk)),
+                                    source="cdn_bandwidth")
+                    written = time.perf_counter()
+                    f.write(chunk)
+                    elapsed = time.perf_counter() - written
+                    metrics.inc("disk_write_seconds_total", elapsed)
+                    disk += elapsed
+                    nbytes += len(chunk)
+
+        size = part.stat().st_size
+        tracer.event("write", disk, what="image", file=dest.name, bytes=nbytes)
+        if expected is not None and size != expected:
+            raise IncompleteDownload(f"got {size} of {expected} bytes")
+        os.replace(part, dest)
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,142 @@
+from __future__ import annotations
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from PIL import Image, ImageOps
+
+from flickr_grid_downloader.console import get_logger
+from flickr_grid_downloader.utils.metrics import metrics
+
+log = get_logger(__name__)
+
+FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+
+
+@dataclass(frozen=True, slots=True)
+class PostProcessSpec:
+    """Derivatives written next to every downloaded image."""
+    sizes: tuple[int, ...]          # max side in pixels of each derivative, e.g. (1024, 256)
+    fmt: str = "webp"               # key of FORMATS
+    quality: int = 85
+    keep_exif: bool = False         # derivatives drop EXIF (GPS, camera serials…) unless set
+    drop_original: bool = False     # delete the downloaded `_b` JPEG once its derivatives exist
+
+    def __post_init__(self) -> None:
+        if not self.sizes or min(self.sizes) <= 0:
+            raise ValueError("PostProcessSpec needs at least one positive size")
+        if self.fmt not in FORMATS:
+            raise ValueError(f"fmt must be one of {tuple(FORMATS)}")
+
+    def derivative_path(self, src: Path, size: int) -> Path:
+        """'<zone>_<box>_<photo>.jpg' → '<zone>_<box>_<photo>_<size>.<fmt>'."""
+        return src.with_name(f"{src.stem}_{size}.{self.fmt}")
+
+
+def process_image(src: str, spec: PostProcessSpec) -> tuple[int, int, float]:
+    """
+    Writes the derivatives of `src` (runs in a worker process).
+    :return: (bytes read, bytes written, CPU seconds).
+    """
+    start = time.process_time()
+    path = Path(src)
+    todo = sorted((size for size in set(spec.sizes) if not spec.derivative_path(path, size).exists()),
+                  reverse=True)
+    if not todo:                                # done by a previous, interrupted run
+        return 0, 0, time.process_time() - start
+
+    size_in = path.stat().st_size
+    size_out = 0
+    with Image.open(path) as im:
+        im.draft("RGB", (todo[0], todo[0]))     # JPEG: decode at a reduced DCT scale when possible
+        im = ImageOps.exif_transpose(im)        # also resets the orientation tag
+        exif = im.info.get("exif") if spec.keep_exif else None
+        if im.mode not in ("RGB", "L"):
+            im = im.convert("RGB")
+
+        # Largest first: each derivative is resized from the previous one
+        for size in todo:
+            im.thumbnail((size, size), Image.Resampling.LANCZOS)
+            dest = spec.derivative_path(path, size)
+            tmp = dest.with_name(dest.name + ".tmp")
+            im.save(tmp, FORMATS[spec.fmt], quality=spec.quality, **({"exif": exif} if exif else {}))
+            os.replace(tmp, dest)
+            size_out += dest.stat().st_size
+
+    if spec.drop_original:
+        path.unlink()
+    return size_in, size_out, time.process_time() - start
+
+
+class ImagePostProcessor:
+    """
+    Runs `process_image` on a process pool while the downloads go on:
+    • `submit` hands over a downloaded file and returns at once; it only blocks when
+      IN_FLIGHT_PER_WORKER images per process are already queued (backpressure on the
+      CDN workers, so the queue never grows without bound).
+    • `on_done(ok)` runs once the derivatives are on disk (or the processing failed).
+    • `close` waits for the queued images and logs the throughput of the stage.
+    Workers are spawned, not forked: the downloader is multi-threaded.
+    """
+    IN_FLIGHT_PER_WORKER = 4
+
+    def __init__(self, spec: PostProcessSpec, workers: int | None = None) -> None:
+        """:param workers: Processes in the pool. None uses one per CPU."""
+        self.spec = spec
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self._slots = threading.BoundedSemaphore(self.workers * self.IN_FLIGHT_PER_WORKER)
+
+        self._lock = threading.Lock()
+        self._started: float | None = None
+        self.images = self.failed = 0
+        self.bytes_in = self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def submit(self, path: Path, on_done: Callable[[bool], None] | None = None) -> None:
+        self._slots.acquire()
+        if self._started is None:
+            self._started = time.monotonic()
+        metrics.add("queue_depth", 1, stage="post")
+        fut = self.pool.submit(process_image, str(path), self.spec)
+        fut.add_done_callback(lambda f: self._finished(path, f, on_done))
+
+    def _finished(self, path: Path, fut: Future, on_done: Callable[[bool], None] | None) -> None:
+        self._slots.release()
+        metrics.add("queue_depth", -1, stage="post")
+        if fut.cancelled():                     # interrupted: the photo stays pending
+            return
+        exc = fut.exception()
+        metrics.inc("post_images_total", outcome="error" if exc else "ok")
+        with self._lock:
+            if exc:
+                self.failed += 1
+            else:
+                size_in, size_out, cpu = fut.result()
+                self.images += 1
+                self.bytes_in += size_in
+                self.bytes_out += size_out
+                self.cpu_seconds += cpu
+        if exc:
+            log.error("Image %s not post-processed → %s", path.name, exc)
+        if on_done:
+            on_done(exc is None)
+
+    def close(self, cancel: bool = False) -> None:
+        """Waits for the queued images; `cancel` drops those not started yet."""
+        self.pool.shutdown(wait=True, cancel_futures=cancel)
+        if not self.images and not self.failed:
+            return
+        wall = time.monotonic() - self._started if self._started else 0.0
+        mb = 1 << 20
+        log.info(
+            "Post-processing: %d images (%d failed) in %.1fs → %.1f img/s, %.1f MB → %.1f MB, "
+            "%.1f CPU-s on %d processes",
+            self.images, self.failed, wall, self.images / wall if wall else 0.0,
+            self.bytes_in / mb, self.bytes_out / mb, self.cpu_seconds, self.workers,
+        )
@@ -0,0 +1,98 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import urlsplit
+
+# Flickr size suffixes → longest side in pixels ('' is the 500 px size without suffix).
+# Up to _b the URL is built from the photo secret; _h and _k have their own secrets and
+# are only known through the `url_h` / `url_k` search extras.
+SIZES = {"m": 240, "n": 320, "w": 400, "": 500, "z": 640, "c": 800, "b": 1024, "h": 1600, "k": 2048}
+SECRET_SIZES = frozenset({"m", "n", "w", "", "z", "c", "b"})
+NAMED_SIZES = ("z", "c", "b", "h", "k", "o")      # accepted by `SizePolicy.parse`
+
+
+@dataclass(frozen=True, slots=True)
+class SizePolicy:
+    """
+    Which variant of every photo is downloaded:
+    • A fixed size ('z' 640 px, 'c' 800, 'b' 1024, 'h' 1600, 'k' 2048 or 'o' the original).
+    • Or the largest variant whose longest side fits in `max_side` pixels.
+    A photo without the requested variant (no url_h / url_k extra, no original secret,
+    or unknown original dimensions) gets the next smaller one, down to the sizes that
+    can always be built from its secret.
+    """
+    size: str | None = "b"
+    max_side: int | None = None
+
+    def __post_init__(self) -> None:
+        if (self.size is None) == (self.max_side is None):
+            raise ValueError("give either a size or a max_side")
+        if self.size is not None and self.size not in NAMED_SIZES:
+            raise ValueError(f"size must be one of {', '.join(NAMED_SIZES)}")
+        if self.max_side is not None and self.max_side < SIZES["m"]:
+            raise ValueError(f"max_side must be at least {SIZES['m']} px")
+
+    @classmethod
+    def parse(cls, value: str) -> SizePolicy:
+        """'b', 'o'… for a fixed size, or a number of pixels for the largest size up to it."""
+        value = value.strip().lower().removeprefix("_")
+        if value.isdigit():
+            return cls(size=None, max_side=int(value))
+        return cls(size=value)
+
+    def __str__(self) -> str:
+        return f"_{self.size}" if self.size else f"largest ≤ {self.max_side} px"
+
+    @property
+    def limit(self) -> float:
+        """Longest side allowed, in pixels."""
+        if self.max_side is not None:
+            return self.max_side
+        return float("inf") if self.size == "o" else SIZES[self.size]
+
+    # ---------- URL building ----------
+    @staticmethod
+    def _original_side(photo: dict[str, Any]) -> int | None:
+        # `o_dims` extra; getInfo does not report the original dimensions
+        try:
+            return max(int(photo["o_width"]), int(photo["o_height"]))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _cdn(url: str, cdn_url: str) -> str:
+        """Moves an extras URL (live.staticflickr.com/…) onto the configured CDN."""
+        return cdn_url + urlsplit(url).path
+
+    def _original(self, cdn_url: str, photo_id: str, photo: dict[str, Any]) -> str | None:
+        if self.size != "o":
+            side = self._original_side(photo)
+            if side is None or side > self.limit:
+                return None
+        if photo.get("url_o"):
+            return self._cdn(photo["url_o"], cdn_url)
+        if photo.get("originalsecret"):
+            fmt = photo.get("originalformat", "jpg")
+            return f"{cdn_url}/{photo['server']}/{photo_id}_{photo['originalsecret']}_o.{fmt}"
+        return None
+
+    def url(self, cdn_url: str, photo_id: str, photo: dict[str, Any]) -> tuple[str, str]:
+        """
+        :param photo: getInfo 'photo' payload or search record (server, secret, and the
+                      url_* / originalsecret / o_width extras when present).
+        :return: (image url, size suffix, 'o' for the original)
+        """
+        if self.size == "o" or self.max_side is not None:
+            original = self._original(cdn_url, photo_id, photo)
+            if original:
+                return original, "o"
+
+        for suffix, side in sorted(SIZES.items(), key=lambda item: item[1], reverse=True):
+            if side > self.limit:
+                continue
+            if photo.get(f"url_{suffix}"):
+                return self._cdn(photo[f"url_{suffix}"], cdn_url), suffix
+            if suffix in SECRET_SIZES:
+                tail = f"_{suffix}" if suffix else ""
+                return f"{cdn_url}/{photo['server']}/{photo_id}_{photo['secret']}{tail}.jpg", suffix
+        raise ValueError(f"no image size of photo {photo_id} fits {self}")
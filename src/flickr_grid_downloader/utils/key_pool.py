@@ -0,0 +1,192 @@
+from __future__ import annotations
+import atexit
+import fcntl
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Sequence
+
+from flickr_grid_downloader.console import get_logger
+from flickr_grid_downloader.constants import FLICKR_REQUESTS_PER_HOUR
+from flickr_grid_downloader.utils.metadata_store import write_atomic
+
+log = get_logger(__name__)
+
+
+class KeyPool:
+    """
+    Flickr API key/secret pairs shared by every request of the process:
+    • Each key has its own sliding one-hour window of request timestamps.
+    • `acquire` picks the key with the most budget left, skipping keys cooling down after
+      a rate-limit answer, and waits when every key is exhausted.
+    • Windows and cooldowns are saved to `state_path` (keys are stored hashed), so a new
+      run starts with the budget the previous one left. Every save merges, under a file
+      lock, the requests booked since the last one into the file and reloads it, so
+      processes sharing the file see each other's usage (up to SAVE_EVERY requests late).
+    """
+    WINDOW = 3600.0         # seconds of the sliding window (Flickr quotas are hourly)
+    SAVE_EVERY = 25         # requests between saves of the accounting
+
+    def __init__(self, keys: Sequence[tuple[str, str]], per_hour: int = FLICKR_REQUESTS_PER_HOUR,
+                 state_path: Path | None = None, cooldown: float = 300.0) -> None:
+        """
+        :param keys: (api_key, api_secret) pairs.
+        :param per_hour: Requests allowed per key and hour.
+        :param state_path: JSON file where the accounting is persisted. None keeps it in memory.
+        :param cooldown: Seconds a key is left aside after a rate-limit answer without Retry-After.
+        """
+        if not keys:
+            raise ValueError("KeyPool needs at least one API key")
+        self.keys = dict(keys)
+        self.per_hour = per_hour
+        self.state_path = state_path
+        self.default_cooldown = cooldown
+
+        self._used: dict[str, deque[float]] = {key: deque() for key in self.keys}
+        self._new: dict[str, list[float]] = {key: [] for key in self.keys}    # booked since the last save
+        self._cool: dict[str, float] = {}
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        self._load()
+        if state_path:
+            atexit.register(self.save)      # keep the last (< SAVE_EVERY) requests
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    # ---------- Parsing ----------
+    @staticmethod
+    def parse(spec: str) -> list[tuple[str, str]]:
+        """Parses 'key:secret' pairs separated by commas, semicolons or newlines."""
+        pairs = []
+        for item in spec.replace("\n", ";").replace(",", ";").split(";"):
+            item = item.strip()
+            if not item or item.startswith("#"):
+                continue
+            key, sep, secret = item.partition(":")
+            if not sep:
+                raise ValueError(f"API key entry '{item[:6]}…' must be 'key:secret'")
+            pairs.append((key.strip(), secret.strip()))
+        return pairs
+
+    @classmethod
+    def read_file(cls, path: Path) -> list[tuple[str, str]]:
+        """Reads one 'key:secret' pair per line ('#' starts a comment)."""
+        lines = (line.split("#", 1)[0].strip() for line in path.read_text().splitlines())
+        return cls.parse("\n".join(line for line in lines if line))
+
+    # ---------- Accounting ----------
+    @staticmethod
+    def _id(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+    def _prune(self, key: str, now: float) -> deque[float]:
+        window = self._used[key]
+        while window and window[0] <= now - self.WINDOW:
+            window.popleft()
+        return window
+
+    def remaining(self, key: str) -> int:
+        with self._lock:
+            return self.per_hour - len(self._prune(key, time.time()))
+
+    def acquire(self) -> tuple[str, str]:
+        """Returns the (key, secret) to use for the next request and books the request."""
+        while True:
+            with self._lock:
+                now = time.time()
+                best, best_left, wait = None, 0, math.inf
+                for key in self.keys:
+                    window = self._prune(key, now)
+                    if self._cool.get(key, 0) > now:
+                        wait = min(wait, self._cool[key] - now)
+                        continue
+                    left = self.per_hour - len(window)
+                    if left <= 0:
+                        wait = min(wait, window[0] + self.WINDOW - now)
+                    elif left > best_left:
+                        best, best_left = key, left
+
+                if best is not None:
+                    self._used[best].append(now)
+                    if self.state_path:
+                        self._new[best].append(now)
+                    self._unsaved += 1
+                    if self._unsaved >= self.SAVE_EVERY:
+                        self._save_locked()
+                    return best, self.keys[best]
+
+            log.warning("All %d API keys are out of budget; waiting %.0fs", len(self.keys), wait)
+            time.sleep(max(wait, 0.01))
+
+    def cooldown(self, key: str, seconds: float | None = None) -> None:
+        """Leaves `key` aside after a rate-limit answer."""
+        seconds = seconds if seconds is not None else self.default_cooldown
+        with self._lock:
+            self._cool[key] = time.time() + seconds
+            self._save_locked()
+        log.warning("API key %s… rate limited; cooling down for %.0fs", key[:6], seconds)
+
+    # ---------- Persistence ----------
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Serializes the read-merge-write of the usage file between processes."""
+        with self.state_path.with_name(self.state_path.name + ".lock").open("a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read(self) -> dict[str, Any]:
+        if not self.state_path.exists():
+            return {}
+        try:
+            return json.loads(self.state_path.read_text())
+        except (OSError, json.JSONDecodeError):
+            log.warning("API key usage file %s unreadable; starting from zero", self.state_path)
+            return {}
+
+    def _apply(self, saved: dict[str, Any], now: float) -> None:
+        """Replaces the windows and cooldowns with the saved ones plus the unsaved requests."""
+        for key in self.keys:
+            entry = saved.get(self._id(key), {})
+            used = [t for t in entry.get("used", []) if t > now - self.WINDOW]
+            self._used[key] = deque(sorted(used + [math.ceil(t) for t in self._new[key]]))
+            self._new[key] = []
+            cool = max(entry.get("cooldown_until", 0), self._cool.get(key, 0))
+            if cool > now:
+                self._cool[key] = cool
+
+    def _load(self) -> None:
+        if not self.state_path:
+            return
+        with self._file_lock():
+            self._apply(self._read(), time.time())
+
+    def _save_locked(self) -> None:
+        self._unsaved = 0
+        if not self.state_path:
+            return
+        now = time.time()
+        with self._file_lock():
+            # Entries of keys this process does not hold (other pools) are kept
+            data = self._read()
+            self._apply(data, now)
+            data.update({
+                self._id(key): {
+                    "used": list(self._prune(key, now)),
+                    "cooldown_until": self._cool.get(key, 0),
+                }
+                for key in self.keys
+            })
+            write_atomic(self.state_path, json.dumps(data, separators=(",", ":")))
+
+    def save(self) -> None:
+        with self._lock:
+            self._save_locked()
@@ -0,0 +1,132 @@
+from __future__ import annotations
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+from flickr_grid_downloader.console import get_logger
+
+log = get_logger(__name__)
+
+
+def write_atomic(path: Path, data: str | bytes) -> None:
+    """Writes `data` to a temp file next to `path` and renames it over `path`."""
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class MetadataStore:
+    """
+    Append-only sink for the per-box photo metadata:
+    • Each record is appended as one line to `json/<zone>_<box>.jsonl` (O(1) per photo).
+    • Records are buffered in memory and written in batches by `flush`.
+    • `compact` folds a box log into the usual dict-shaped `json/<zone>_<box>.json`,
+      replacing it atomically, so readers never see a half-written file.
+    """
+    def __init__(self, json_dir: Path, zone: str, compact_every: int = 1000) -> None:
+        """
+        :param json_dir: Directory holding the box JSON files.
+        :param zone: Zone name, used as the file prefix.
+        :param compact_every: Compact a box once its log holds this many records.
+        """
+        self.json_dir = json_dir
+        self.zone = zone
+        self.compact_every = compact_every
+
+        self._buffer: dict[str, list[str]] = {}
+        self._log_sizes: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # ---------- Paths ----------
+    def json_path(self, box_id: str) -> Path:
+        return self.json_dir / f"{self.zone}_{box_id}.json"
+
+    def log_path(self, box_id: str) -> Path:
+        return self.json_dir / f"{self.zone}_{box_id}.jsonl"
+
+    # ---------- Writing ----------
+    def add(self, box_id: str, photo_id: str, record: dict[str, Any]) -> None:
+        """Buffers one record; it reaches the disk on the next `flush`."""
+        line = json.dumps({"id": photo_id, "record": record}, separators=(",", ":"))
+        with self._lock:
+            self._buffer.setdefault(box_id, []).append(line)
+
+    def flush(self) -> None:
+        """Appends the buffered records to their box logs and syncs them to disk."""
+        with self._lock:
+            buffer, self._buffer = self._buffer, {}
+
+            for box_id, lines in buffer.items():
+                log_path = self.log_path(box_id)
+                if box_id not in self._log_sizes and self._torn(log_path):
+                    lines.insert(0, "")     # end the torn line so the new records stay parseable
+
+                with log_path.open("a") as f:
+                    f.write("\n".join(lines) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                size = self._log_sizes.get(box_id, 0) + len(lines)
+                self._log_sizes[box_id] = size
+                if size >= self.compact_every:
+                    self._compact(box_id)
+
+    @staticmethod
+    def _torn(path: Path) -> bool:
+        """True when a log left by a previous run does not end with a newline."""
+        if not path.exists() or path.stat().st_size == 0:
+            return False
+        with path.open("rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    # ---------- Compaction ----------
+    def _read_log(self, path: Path) -> dict[str, Any]:
+        records: dict[str, Any] = {}
+        with path.open() as f:
+            for n, line in enumerate(f, start=1):
+                try:
+                    entry = json.loads(line) if line.strip() else None
+                except json.JSONDecodeError:
+                    # Only the tail can be torn by a crash; everything before it is intact.
+                    log.warning("Skipping corrupt line %d in %s", n, path.name)
+                    continue
+                if entry:
+                    records[entry["id"]] = entry["record"]
+        return records
+
+    def _compact(self, box_id: str) -> None:
+        log_path = self.log_path(box_id)
+        if not log_path.exists():
+            return
+
+        json_path = self.json_path(box_id)
+        data: dict[str, Any] = {}
+        if json_path.exists():
+            data = json.loads(json_path.read_text())
+        data.update(self._read_log(log_path))
+
+        write_atomic(json_path, json.dumps(data, indent=2))
+        log_path.unlink()
+        self._log_sizes[box_id] = 0
+
+    def compact(self, box_id: str) -> None:
+        """Merges the box log into the box JSON and removes the log."""
+        with self._lock:
+            self._compact(box_id)
+
+    def finalize(self) -> None:
+        """
+        Flushes pending records and compacts every box log of the zone,
+        including logs left behind by an interrupted run.
+        """
+        self.flush()
+        prefix = f"{self.zone}_"
+        with self._lock:
+            for log_path in sorted(self.json_dir.glob(f"{prefix}*.jsonl")):
+                self._compact(log_path.stem[len(prefix):])
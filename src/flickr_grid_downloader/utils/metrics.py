@@ -0,0 +1,282 @@
+from __future__ import annotations
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from flickr_grid_downloader.console import get_logger
+
+log = get_logger(__name__)
+
+LabelKey = tuple[tuple[str, str], ...]
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Help text of the Prometheus exposition; every metric is prefixed with `fgd_`
+HELP = {
+    "api_request_seconds": "Latency of Flickr API requests (one attempt).",
+    "api_requests_total": "Flickr API attempts by outcome (ok, http_<status>, network, invalid_json, flickr_<code>).",
+    "api_retries_total": "Flickr API attempts retried after a transient failure.",
+    "api_cache_hits_total": "API calls answered by the response cache.",
+    "rate_limit_wait_seconds_total": "Time spent waiting for the token bucket or the API key pool.",
+    "cdn_request_seconds": "Time to download one image from the CDN (all attempts).",
+    "cdn_bytes_total": "Image bytes received from the CDN.",
+    "cdn_errors_total": "Images that could not be downloaded.",
+    "disk_write_seconds_total": "Time spent writing image bytes to disk.",
+    "flush_seconds": "Time to flush metadata, shards and the download log.",
+    "photos_total": "Photos processed by outcome (downloaded, on_disk, linked, packed, error).",
+    "post_images_total": "Images post-processed by outcome (ok, error).",
+    "cells_total": "Grid cells checked by outcome (ok, error, or empty: probed with 0 photos and not searched).",
+    "pages_total": "Search result pages stored.",
+    "photos_found_total": "Photos found by the grid search.",
+    "queue_depth": "Items waiting in a stage queue.",
+    "progress_done": "Items done by a stage in this run (cells or photos, with skipped ones).",
+    "progress_total": "Items of a stage in this run.",
+    "queue_tasks_total": "Work queue tasks finished by this worker, by stage and outcome (done, failed, released).",
+}
+
+
+def _key(labels: dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _num(value: float) -> str:
+    # Counters are floats; whole values are written without exponent or decimals
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as in the Prometheus exposition format."""
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # last slot: above the largest bound
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate interpolated inside the bucket holding the q-th observation."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = self.bounds[i - 1] if i else 0.0
+                if i == len(self.bounds):           # open bucket: best bound we have
+                    return lower
+                return lower + (self.bounds[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+    def mean(self) -> float | None:
+        return self.sum / self.count if self.count else None
+
+
+class Metrics:
+    """
+    Thread-safe registry of the counters, gauges and histograms of a run.
+    Metrics are created on first use and identified by name and labels, e.g.
+    `metrics.inc("api_requests_total", method="flickr.photos.search", outcome="ok")`.
+    Gauges can also be callables sampled on export (e.g. the size of a queue).
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.counters: dict[str, dict[LabelKey, float]] = {}
+        self.gauges: dict[str, dict[LabelKey, float]] = {}
+        self.histograms: dict[str, dict[LabelKey, Histogram]] = {}
+        self._sampled: dict[str, dict[LabelKey, Callable[[], float]]] = {}
+
+    # ---------- Recording ----------
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            key = _key(labels)
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            self.gauges.setdefault(name, {})[_key(labels)] = value
+
+    def add(self, name: str, value: float, **labels: Any) -> None:
+        """Moves a gauge up or down (e.g. items entering and leaving a queue)."""
+        with self._lock:
+            series = self.gauges.setdefault(name, {})
+            key = _key(labels)
+            series[key] = series.get(key, 0.0) + value
+
+    def sample(self, name: str, fn: Callable[[], float], **labels: Any) -> None:
+        """Registers a gauge read from `fn` on every snapshot."""
+        with self._lock:
+            self._sampled.setdefault(name, {})[_key(labels)] = fn
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            key = _key(labels)
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        """Observes the duration of the block in histogram `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def progress(self, stage: str, done: int, total: int | None = None) -> None:
+        self.set("progress_done", done, stage=stage)
+        if total is not None:
+            self.set("progress_total", total, stage=stage)
+
+    # ---------- Reading ----------
+    def counter(self, name: str, **labels: Any) -> float:
+        """Sum of the series of `name` matching `labels` (all series when none is given)."""
+        wanted = set(_key(labels))
+        with self._lock:
+            return sum(v for k, v in self.counters.get(name, {}).items() if wanted <= set(k))
+
+    def gauge(self, name: str, **labels: Any) -> float | None:
+        key = _key(labels)
+        with self._lock:
+            fn = self._sampled.get(name, {}).get(key)
+            value = self.gauges.get(name, {}).get(key)
+        return fn() if fn else value
+
+    def histogram(self, name: str, **labels: Any) -> Histogram | None:
+        with self._lock:
+            return self.histograms.get(name, {}).get(_key(labels))
+
+    def label_values(self, name: str, label: str) -> list[str]:
+        """Values of `label` seen in any series of `name`, e.g. the API methods called."""
+        with self._lock:
+            keys = [*self.counters.get(name, {}), *self.gauges.get(name, {}),
+                    *self.histograms.get(name, {}), *self._sampled.get(name, {})]
+        return sorted({v for key in keys for k, v in key if k == label})
+
+    def _gauges(self) -> dict[str, dict[LabelKey, float]]:
+        with self._lock:
+            gauges = {name: dict(series) for name, series in self.gauges.items()}
+            sampled = [(name, key, fn) for name, series in self._sampled.items() for key, fn in series.items()]
+        for name, key, fn in sampled:
+            try:
+                gauges.setdefault(name, {})[key] = float(fn())
+            except Exception:       # e.g. a queue already torn down
+                log.debug("Sampled gauge %s%s failed", name, dict(key), exc_info=True)
+        return gauges
+
+    def snapshot(self) -> dict[str, Any]:
+        """JSON-serializable view of every metric."""
+        def series(values: dict[LabelKey, Any], render: Callable[[Any], Any]) -> list[dict[str, Any]]:
+            return [{"labels": dict(key), "value": render(value)} for key, value in values.items()]
+
+        gauges = self._gauges()
+        with self._lock:
+            return {
+                "uptime_seconds": round(time.monotonic() - self.started, 3),
+                "counters": {name: series(v, lambda x: x) for name, v in self.counters.items()},
+                "gauges": {name: series(v, lambda x: x) for name, v in gauges.items()},
+                "histograms": {
+                    name: series(v, lambda h: {
+                        "count": h.count, "sum": round(h.sum, 6),
+                        "p50": h.quantile(0.5), "p95": h.quantile(0.95), "p99": h.quantile(0.99),
+                        "buckets": dict(zip([*map(str, h.bounds), "+Inf"], h.counts)),
+                    })
+                    for name, v in self.histograms.items()
+                },
+            }
+
+    def to_prometheus(self, prefix: str = "fgd_") -> str:
+        """Text exposition format, e.g. for the node_exporter textfile collector."""
+        def fmt(key: LabelKey, extra: tuple[tuple[str, str], ...] = ()) -> str:
+            pairs = [*key, *extra]
+            if not pairs:
+                return ""
+            escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        lines: list[str] = []
+
+        def header(name: str, kind: str) -> None:
+            if name in HELP:
+                lines.append(f"# HELP {prefix}{name} {HELP[name]}")
+            lines.append(f"# TYPE {prefix}{name} {kind}")
+
+        gauges = self._gauges()
+        with self._lock:
+            for name, values in sorted(self.counters.items()):
+                header(name, "counter")
+                lines += [f"{prefix}{name}{fmt(key)} {_num(value)}" for key, value in values.items()]
+            for name, values in sorted(gauges.items()):
+                header(name, "gauge")
+                lines += [f"{prefix}{name}{fmt(key)} {_num(value)}" for key, value in values.items()]
+            for name, values in sorted(self.histograms.items()):
+                header(name, "histogram")
+                for key, h in values.items():
+                    cumulative = 0
+                    for bound, n in zip([*map(str, h.bounds), "+Inf"], h.counts):
+                        cumulative += n
+                        lines.append(f"{prefix}{name}_bucket{fmt(key, (('le', bound),))} {cumulative}")
+                    lines.append(f"{prefix}{name}_sum{fmt(key)} {_num(h.sum)}")
+                    lines.append(f"{prefix}{name}_count{fmt(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+# ---------- «global» registry, shared like the console ----------
+metrics = Metrics()
+
+
+class MetricsReporter:
+    """
+    Writes `metrics` to a file every `interval` seconds and once more on `close`:
+    Prometheus text format, or a JSON snapshot when the file ends in '.json'.
+    Files are replaced atomically, so a scraper never reads a half-written one.
+    """
+    def __init__(self, path: Path, interval: float = 10.0, registry: Metrics = metrics) -> None:
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="metrics", daemon=True)
+
+    def start(self) -> MetricsReporter:
+        self._thread.start()
+        return self
+
+    def write(self) -> None:
+        if self.path.suffix == ".json":
+            text = json.dumps(self.registry.snapshot(), indent=2)
+        else:
+            text = self.registry.to_prometheus()
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(text)
+        os.replace(tmp, self.path)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as exc:
+                log.warning("Metrics not written to %s → %s", self.path, exc)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.write()
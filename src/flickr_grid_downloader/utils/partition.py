@@ -0,0 +1,92 @@
+from __future__ import annotations
+import datetime
+from dataclasses import dataclass
+
+DATE_FMT = "%Y-%m-%d %H:%M:%S"
+
+# Smallest partitions the adaptive search will produce
+MIN_SPLIT_DEGREES = 0.001                    # ~100 m: below this, bisect the time window instead
+MIN_WINDOW = datetime.timedelta(hours=1)     # below this, accept the truncated results
+
+
+@dataclass(frozen=True, slots=True)
+class Partition:
+    """A bbox plus a taken-date window: the unit queried against flickr.photos.search."""
+    min_lon: float
+    min_lat: float
+    max_lon: float
+    max_lat: float
+    min_taken: datetime.datetime
+    max_taken: datetime.datetime
+
+    @classmethod
+    def from_bbox(cls, bbox: str, start_year: int, end_year: int) -> Partition:
+        """Builds the root partition of a grid cell from its 'x1,y1,x2,y2' bbox string."""
+        x1, y1, x2, y2 = (float(v) for v in bbox.split(","))
+        return cls(
+            min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2),
+            datetime.datetime(start_year, 1, 1, 0, 0, 0),
+            datetime.datetime(end_year, 12, 31, 23, 59, 59),
+        )
+
+    @classmethod
+    def from_row(cls, bbox: str, min_taken: str, max_taken: str) -> Partition:
+        """Rebuilds a partition stored as (bbox, min_taken_date, max_taken_date)."""
+        x1, y1, x2, y2 = (float(v) for v in bbox.split(","))
+        return cls(
+            x1, y1, x2, y2,
+            datetime.datetime.strptime(min_taken, DATE_FMT),
+            datetime.datetime.strptime(max_taken, DATE_FMT),
+        )
+
+    # ---------- API parameters ----------
+    @property
+    def bbox(self) -> str:
+        return f"{self.min_lon:.7f},{self.min_lat:.7f},{self.max_lon:.7f},{self.max_lat:.7f}"
+
+    @property
+    def min_taken_date(self) -> str:
+        return self.min_taken.strftime(DATE_FMT)
+
+    @property
+    def max_taken_date(self) -> str:
+        return self.max_taken.strftime(DATE_FMT)
+
+    @property
+    def key(self) -> str:
+        """Stable identifier, used to checkpoint partitions in the checked-grids file."""
+        return f"{self.bbox}|{self.min_taken_date}|{self.max_taken_date}"
+
+    def params(self) -> dict[str, str]:
+        return {
+            "bbox": self.bbox,
+            "min_taken_date": self.min_taken_date,
+            "max_taken_date": self.max_taken_date,
+        }
+
+    # ---------- Splitting ----------
+    def split(self) -> list[Partition]:
+        """
+        Returns the children of this partition:
+        • 4 spatial quadrants while the cell is larger than MIN_SPLIT_DEGREES.
+        • 2 halves of the taken-date window otherwise, down to MIN_WINDOW.
+        • An empty list when the partition cannot be split any further.
+        """
+        if max(self.max_lon - self.min_lon, self.max_lat - self.min_lat) / 2 >= MIN_SPLIT_DEGREES:
+            mid_lon = (self.min_lon + self.max_lon) / 2
+            mid_lat = (self.min_lat + self.max_lat) / 2
+            return [
+                Partition(x1, y1, x2, y2, self.min_taken, self.max_taken)
+                for x1, x2 in ((self.min_lon, mid_lon), (mid_lon, self.max_lon))
+                for y1, y2 in ((self.min_lat, mid_lat), (mid_lat, self.max_lat))
+            ]
+
+        window = self.max_taken - self.min_taken
+        if window >= 2 * MIN_WINDOW:
+            mid = (self.min_taken + window / 2).replace(microsecond=0)
+            return [
+                Partition(self.min_lon, self.min_lat, self.max_lon, self.max_lat, self.min_taken, mid),
+                Partition(self.min_lon, self.min_lat, self.max_lon, self.max_lat,
+                          mid + datetime.timedelta(seconds=1), self.max_taken),
+            ]
+        return []
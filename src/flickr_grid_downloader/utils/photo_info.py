@@ -57,3 +57,76 @@ def build_photo_info(
         "image_downloaded": downloaded,
         "original_downloaded": original_downloaded,
     }
+
+
+# Fields that flickr.photos.search extras cannot provide; asking for any of them
+# in lean mode falls back to a flickr.photos.getInfo call.
+INFO_ONLY_FIELDS = frozenset({
+    "reply_count", "locality", "county", "region", "country", "neighbourhood",
+})
+
+# Names accepted by --info-fields: the keys of `photo_info`, geo keys included
+PHOTO_INFO_FIELDS = frozenset({
+    "id", "text", "description", "created_at", "created_at_timestamp", "taken_at", "views_count",
+    "reply_count", "box_id", "location_id", "original_secret", "original_format", "geo",
+    "coordinates", "accuracy", "context", "locality", "county", "region", "country", "neighbourhood",
+    "author_id", "username", "tags", "attachments", "image_url", "status", "image_downloaded",
+    "original_downloaded",
+})
+
+
+def build_photo_info_from_search(
+    photo_id: str,
+    box_id: str,
+    search_payload: Dict[str, Any],
+    image_url: str,
+    downloaded: bool,
+    original_downloaded: bool,
+) -> Dict[str, Any]:
+    """
+    Return a `photo_info` dict built from a flickr.photos.search record with extras.
+    Fields listed in INFO_ONLY_FIELDS are set to None.
+    """
+    p = search_payload
+
+    original_secret = p.get("originalsecret")
+    original_format = p.get("originalformat", "jpg")
+    posted = p.get("dateupload")
+
+    return {
+        "id": photo_id,
+        "text": p.get("title"),
+        "description": (p.get("description") or {}).get("_content"),
+        "created_at": datetime.datetime.fromtimestamp(
+            int(posted)
+        ).strftime("%Y-%m-%d %H:%M:%S+00:00") if posted else None,
+        "created_at_timestamp": posted,
+        "taken_at": p.get("datetaken"),
+        "views_count": p.get("views"),
+        "reply_count": None,
+        "box_id": box_id,
+        "location_id": "NA",
+        "original_secret": original_secret,
+        "original_format": original_format if original_secret else None,
+        "geo": {
+            "coordinates": {
+                "type": "Point",
+                "coordinates": [p.get("longitude"), p.get("latitude")],
+            },
+            "accuracy": p.get("accuracy"),
+            "context": p.get("context"),
+            "locality": None,
+            "county": None,
+            "region": None,
+            "country": None,
+            "neighbourhood": None,
+        },
+        "author_id": p.get("owner"),
+        "username": p.get("ownername"),
+        "tags": p["tags"].split() if p.get("tags") else [],
+        "attachments": {"media_keys": {photo_id: image_url}},
+        "image_url": image_url,
+        "status": "ok",
+        "image_downloaded": downloaded,
+        "original_downloaded": original_downloaded,
+    }
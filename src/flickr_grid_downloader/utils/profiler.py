@@ -0,0 +1,113 @@
+from __future__ import annotations
+import cProfile
+import io
+import pstats
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+
+from rich.table import Table
+
+from flickr_grid_downloader.console import console, get_logger
+
+log = get_logger(__name__)
+
+MODES = ("cprofile", "sample")
+
+# Not sampled: the diagnostics threads, and pool threads waiting for work (their
+# innermost Python frame is the executor loop blocked on its queue)
+IGNORED_THREADS = frozenset({"trace", "metrics", "log-writer", "progress"})
+IDLE_LEAVES = frozenset({"thread:_worker"})
+
+
+class Profiler:
+    """
+    Profiles a command (`--profile`):
+    • 'cprofile': deterministic profile of the main thread, i.e. the stages in sequential
+      mode. Written as pstats (`python -m pstats <file>`, snakeviz…).
+    • 'sample': the stacks of every thread are sampled `hz` times per second, so the worker
+      pools and the asyncio engine are covered at a small, fixed cost. Wall-clock samples:
+      threads waiting on the network or a lock count too, idle pool threads do not.
+      Written as folded stacks ('thread;module:function;… count', for flamegraph.pl
+      or speedscope).
+    The `top` busiest functions are printed on close.
+    """
+    def __init__(self, path: Path, mode: str = "cprofile", hz: float = 100.0, top: int = 15) -> None:
+        if mode not in MODES:
+            raise ValueError(f"profile mode must be one of {', '.join(MODES)}")
+        self.path = path
+        self.mode = mode
+        self.interval = 1 / hz
+        self.top = top
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._profile = cProfile.Profile() if mode == "cprofile" else None
+        self._stacks: Counter[tuple[str, ...]] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+
+    def start(self) -> Profiler:
+        if self._profile:
+            self._profile.enable()
+        else:
+            self._thread.start()
+        return self
+
+    # ---------- Sampling ----------
+    @staticmethod
+    def _label(frame) -> str:
+        code = frame.f_code
+        return f"{Path(code.co_filename).stem}:{code.co_qualname}"
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, str(ident))
+                if ident == own or name in IGNORED_THREADS:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame))
+                    frame = frame.f_back
+                if stack[0] in IDLE_LEAVES:
+                    continue
+                stack.append(name)
+                self._stacks[tuple(reversed(stack))] += 1
+
+    def _write_folded(self) -> None:
+        with self.path.open("w") as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+    def _summary_samples(self) -> None:
+        total = sum(self._stacks.values())
+        leaf: Counter[str] = Counter()
+        inclusive: Counter[str] = Counter()
+        for stack, count in self._stacks.items():
+            leaf[stack[-1]] += count
+            for label in set(stack[1:]):
+                inclusive[label] += count
+        table = Table(title=f"Profile: {total:,} samples, all threads")
+        for column in ("Function", "Self %", "Total %"):
+            table.add_column(column, justify="left" if column == "Function" else "right")
+        for label, count in leaf.most_common(self.top):
+            table.add_row(label, f"{100 * count / total:.1f}", f"{100 * inclusive[label] / total:.1f}")
+        console.print(table)
+
+    # ---------- Close ----------
+    def close(self) -> None:
+        if self._profile:
+            self._profile.disable()
+            self._profile.dump_stats(self.path)
+            out = io.StringIO()
+            pstats.Stats(self._profile, stream=out).sort_stats("cumulative").print_stats(self.top)
+            console.print(out.getvalue(), markup=False, highlight=False, soft_wrap=True)
+        else:
+            self._stop.set()
+            self._thread.join()
+            self._write_folded()
+            if self._stacks:
+                self._summary_samples()
+        log.info("Profile written to %s", self.path)
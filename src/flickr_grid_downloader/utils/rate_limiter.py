@@ -0,0 +1,48 @@
+from __future__ import annotations
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every worker that talks to the same quota.
+    • `rate` tokens are added per second, up to `capacity`.
+    • `acquire` reserves tokens immediately and sleeps off any deficit, so callers
+      are served in arrival order and the long-run rate never exceeds `rate`.
+    """
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        """
+        :param rate: Tokens added per second.
+        :param capacity: Maximum burst size. Defaults to one second worth of tokens.
+        """
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        self.rate     = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens  = self.capacity
+        self._stamp   = time.monotonic()
+        self._lock    = threading.Lock()
+
+    @classmethod
+    def per_hour(cls, requests_per_hour: int, burst: float | None = None) -> TokenBucket:
+        """Builds a bucket from a requests-per-hour budget (Flickr quotas are hourly)."""
+        return cls(requests_per_hour / 3600, burst)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp  = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Takes `tokens` from the bucket, blocking until they are available.
+        :return: Seconds spent waiting.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
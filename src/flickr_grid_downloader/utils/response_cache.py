@@ -0,0 +1,118 @@
+from __future__ import annotations
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from flickr_grid_downloader.console import get_logger
+
+log = get_logger(__name__)
+
+
+class CacheMiss(LookupError):
+    """Raised in cache-only mode when a response is not in the cache."""
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of Flickr API responses:
+    • Key: sha256 of the method plus the params (sorted, stringified).
+    • Stored gzip-compressed in a 2-level sharded tree: <root>/ab/cd/<key>.json.gz.
+    • Entries older than `ttl` seconds are ignored (file mtime = write time).
+    • When the cache grows over `max_bytes`, least recently used entries are evicted
+      (file atime = last hit, set explicitly on every read).
+    """
+    EVICT_TO = 0.9      # evict down to this fraction of max_bytes
+
+    def __init__(self, root: Path, ttl: float | None = None, max_bytes: int | None = None,
+                 offline: bool = False) -> None:
+        """
+        :param root: Cache directory.
+        :param ttl: Seconds an entry stays valid. None keeps entries forever.
+        :param max_bytes: Size budget of the cache. None disables eviction.
+        :param offline: Replay mode: misses raise CacheMiss instead of hitting the network.
+        """
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = self.misses = 0
+
+        self._size: int | None = None   # computed lazily on the first write
+        self._lock = threading.Lock()
+        root.mkdir(parents=True, exist_ok=True)
+
+    # ---------- Keys ----------
+    @staticmethod
+    def key(method: str, params: dict[str, Any]) -> str:
+        normalized = sorted((k, str(v)) for k, v in params.items())
+        blob = json.dumps([method, normalized], separators=(",", ":"))
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key[2:4] / f"{key}.json.gz"
+
+    # ---------- Read / write ----------
+    def get(self, method: str, params: dict[str, Any]) -> dict[str, Any] | None:
+        """Returns the cached response, or None when missing or expired."""
+        path = self._path(self.key(method, params))
+        try:
+            stat = path.stat()
+            if self.ttl is not None and time.time() - stat.st_mtime > self.ttl:
+                raise FileNotFoundError(path)
+            payload = json.loads(gzip.decompress(path.read_bytes()))
+            os.utime(path, (time.time(), stat.st_mtime))     # LRU: refresh atime, keep mtime
+        except (FileNotFoundError, EOFError, gzip.BadGzipFile, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return payload
+
+    def put(self, method: str, params: dict[str, Any], payload: dict[str, Any]) -> None:
+        path = self._path(self.key(method, params))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = gzip.compress(json.dumps(payload, separators=(",", ":")).encode(), compresslevel=6)
+
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+        if self.max_bytes is not None:
+            with self._lock:
+                if self._size is None:
+                    self._size = self._scan_size()
+                self._size += len(data)
+                if self._size > self.max_bytes:
+                    self._evict()
+
+    # ---------- Eviction ----------
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in self.root.glob("*/*/*.json.gz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries())
+        size = sum(s for _, s, _ in entries)
+        target = self.max_bytes * self.EVICT_TO
+        removed = 0
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+            removed += 1
+        self._size = size
+        log.debug("Response cache: evicted %d entries (%.1f MB left)", removed, size / 1e6)
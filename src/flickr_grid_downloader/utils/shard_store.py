@@ -0,0 +1,174 @@
+from __future__ import annotations
+import csv
+import mmap
+import os
+import tarfile
+import threading
+from pathlib import Path
+from typing import Iterator, Sequence
+
+from flickr_grid_downloader.utils.id_index import PhotoIdIndex
+
+INDEX_NAME = "index.csv"
+INDEX_HEADER = ["name", "photo_id", "box_id", "shard", "offset", "size"]
+BLOCK = tarfile.BLOCKSIZE
+
+
+class ShardWriter:
+    """
+    Packs images into size-capped, uncompressed tar shards ('<zone>-000000.tar', …):
+    • Members are named '<zone>_<box_id>_<photo_id>[_<size>].<ext>', so WebDataset-style
+      loaders group the files of a photo into one sample.
+    • `index.csv` maps every member to (shard, offset, size) of its bytes inside the tar,
+      so `ShardReader` reads an image with one mmap slice, without extracting.
+    • `flush` syncs the shard before the index, so an indexed member is always complete.
+      A run never appends to an older shard: after a crash the unindexed tail of the last
+      shard is just dead space.
+    """
+    def __init__(self, shard_dir: Path, prefix: str, max_bytes: int = 1 << 30) -> None:
+        """
+        :param prefix: Shard file prefix (the zone).
+        :param max_bytes: A shard is closed before it would grow past this size.
+        """
+        self.shard_dir = shard_dir
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = shard_dir / INDEX_NAME
+
+        self.photos = PhotoIdIndex()
+        for row in self._index_rows(self.index_path):
+            self.photos.add(row[1])
+        self.photos.compact()
+
+        numbers = [int(path.stem.rsplit("-", 1)[1]) for path in shard_dir.glob(f"{prefix}-*.tar")]
+        self._next = max(numbers, default=-1) + 1
+        self._tar: tarfile.TarFile | None = None
+        self._file = None
+        self._name = ""
+        self._rows: list[list[str]] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _index_rows(path: Path) -> Iterator[list[str]]:
+        if not path.exists():
+            return
+        with path.open(newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if len(row) == len(INDEX_HEADER):      # skip a line torn by a crash
+                    yield row
+
+    def has(self, photo_id: str) -> bool:
+        return photo_id in self.photos
+
+    # ---------- Writing ----------
+    def _open_next(self) -> None:
+        self._name = f"{self.prefix}-{self._next:06d}.tar"
+        self._next += 1
+        # Kept open across `add` calls: closed by `_close_current`
+        file = (self.shard_dir / self._name).open("wb")
+        try:
+            self._tar = tarfile.open(fileobj=file, mode="w")
+        except BaseException:
+            file.close()
+            raise
+        self._file = file
+
+    def _close_current(self) -> None:
+        if self._tar is None:
+            return
+        try:
+            self._flush_locked()
+            self._tar.close()           # writes the end-of-archive blocks
+        finally:
+            self._file.close()
+            self._tar = self._file = None
+
+    def add(self, photo_id: str, box_id: str, files: Sequence[Path]) -> None:
+        """Appends the files of a photo to the current shard (indexed on the next flush)."""
+        with self._lock:
+            size = sum(path.stat().st_size + 2 * BLOCK for path in files)
+            if self._tar is not None and self._tar.offset + size > self.max_bytes:
+                self._close_current()
+            if self._tar is None:
+                self._open_next()
+
+            # Indexed only once every file of the photo is in the shard
+            rows = []
+            try:
+                for path in files:
+                    info = tarfile.TarInfo(path.name)
+                    info.size = path.stat().st_size
+                    info.mtime = int(path.stat().st_mtime)
+                    with path.open("rb") as f:
+                        self._tar.addfile(info, f)
+                    # addfile leaves the offset after the block-padded data (whatever the header size)
+                    offset = self._tar.offset - -(-info.size // BLOCK) * BLOCK
+                    rows.append([path.name, photo_id, box_id, self._name, str(offset), str(info.size)])
+            except BaseException:
+                # A member cut short leaves the tar offset out of step with the file:
+                # the shard is closed with the members indexed so far
+                self._close_current()
+                raise
+            self._rows += rows
+            self.photos.add(photo_id)
+
+    def _flush_locked(self) -> None:
+        if not self._rows:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        new_index = not self.index_path.exists()
+        with self.index_path.open("a", newline="") as f:
+            writer = csv.writer(f)
+            if new_index:
+                writer.writerow(INDEX_HEADER)
+            writer.writerows(self._rows)
+            f.flush()
+            os.fsync(f.fileno())
+        self._rows = []
+
+    def flush(self) -> None:
+        """Makes the members added so far durable and visible in the index."""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_current()
+
+
+class ShardReader:
+    """Random access to the images of a shard directory through its index and mmap."""
+
+    def __init__(self, shard_dir: Path) -> None:
+        self.shard_dir = shard_dir
+        self.members: dict[str, tuple[str, int, int]] = {}
+        self.by_photo: dict[str, list[str]] = {}
+        for name, photo_id, _, shard, offset, size in ShardWriter._index_rows(shard_dir / INDEX_NAME):
+            self.members[name] = (shard, int(offset), int(size))
+            self.by_photo.setdefault(photo_id, []).append(name)
+        self._maps: dict[str, mmap.mmap] = {}
+
+    def _map(self, shard: str) -> mmap.mmap:
+        if shard not in self._maps:
+            with (self.shard_dir / shard).open("rb") as f:
+                self._maps[shard] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._maps[shard]
+
+    def read(self, name: str) -> bytes:
+        """Returns the bytes of a member, e.g. 'zone_12_5301.jpg'."""
+        shard, offset, size = self.members[name]
+        return self._map(shard)[offset:offset + size]
+
+    def names(self, photo_id: str) -> list[str]:
+        """Members of a photo (the image and its derivatives)."""
+        return self.by_photo.get(photo_id, [])
+
+    def close(self) -> None:
+        for m in self._maps.values():
+            m.close()
+        self._maps.clear()
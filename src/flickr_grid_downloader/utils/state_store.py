@@ -0,0 +1,423 @@
+from __future__ import annotations
+import csv
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator, Sequence
+
+from flickr_grid_downloader.config import STATE_BACKENDS
+from flickr_grid_downloader.console import get_logger
+from flickr_grid_downloader.tools.duplicate_cleaner import DuplicateCleaner
+from flickr_grid_downloader.utils.id_index import PhotoIdIndex
+
+log = get_logger(__name__)
+
+
+class CsvStateStore:
+    """
+    Default backend, backed by the per-zone CSV files:
+    • checked_grids_<y>_<y>.csv     → [cell_id, total, had_errors, (bbox, min_date, max_date)]
+    • checked_pages_<y>_<y>.csv     → [cell_id, page, pages, count]
+    • upload_marks_<y>_<y>.csv      → [box_id, max dateupload] (later rows win)
+    • results_<y>_<y>.csv           → [box_id, page, photo_id, owner, secret, title, (extras)]
+    • downloaded_images_<y>_<y>.csv → [photo_id, box_id, status, ok]
+    The cleaned results and the downloaded ids are indexed incrementally (see PhotoIdIndex).
+    """
+    def __init__(self, csv_dir: Path, start_year: int, end_year: int) -> None:
+        self.done_csv        = csv_dir / f"checked_grids_{start_year}_{end_year}.csv"
+        self.pages_csv       = csv_dir / f"checked_pages_{start_year}_{end_year}.csv"
+        self.marks_csv       = csv_dir / f"upload_marks_{start_year}_{end_year}.csv"
+        self.results_csv     = csv_dir / f"results_{start_year}_{end_year}.csv"
+        self.results_cleaned = csv_dir / f"results_{start_year}_{end_year}_cleaned.csv"
+        self.downloaded_csv  = csv_dir / f"downloaded_images_{start_year}_{end_year}.csv"
+
+        csv_dir.mkdir(parents=True, exist_ok=True)
+        self._done_cells: set[str] | None = None
+        self._pages: dict[str, dict[int, tuple[int, int]]] | None = None
+
+    def _append_rows(self, path: Path, rows: Iterable[Sequence[str]]) -> None:
+        """Append rows to the CSV file, creating it if it doesn't exist."""
+        with path.open("a", newline="") as f:
+            csv.writer(f).writerows(rows)
+
+    @staticmethod
+    def _read_rows(path: Path) -> Iterator[list[str]]:
+        if not path.exists():
+            return
+        with path.open() as f:
+            yield from csv.reader(f)
+
+    # ---------- Cells ----------
+    def is_cell_done(self, cell_id: str) -> bool:
+        if self._done_cells is None:
+            self._done_cells = {row[0] for row in self._read_rows(self.done_csv)}
+        return cell_id in self._done_cells
+
+    def mark_cell(self, row: Sequence[str]) -> None:
+        self._append_rows(self.done_csv, [row])
+        if self._done_cells is not None:
+            self._done_cells.add(row[0])
+
+    def mark_page(self, cell_id: str, page: int, pages: int, count: int) -> None:
+        self._append_rows(self.pages_csv, [[cell_id, str(page), str(pages), str(count)]])
+        if self._pages is not None:
+            self._pages.setdefault(cell_id, {})[page] = (pages, count)
+
+    def clear_pages(self, cell_id: str) -> None:
+        """Forgets the page checkpoints of a cell (appends a page 0 tombstone)."""
+        self._append_rows(self.pages_csv, [[cell_id, "0", "0", "0"]])
+        if self._pages is not None:
+            self._pages.pop(cell_id, None)
+
+    def _load_pages(self) -> dict[str, dict[int, tuple[int, int]]]:
+        if self._pages is None:
+            self._pages = {}
+            for row in self._read_rows(self.pages_csv):
+                try:
+                    cell, page, pages, count = row
+                    if page == "0":
+                        self._pages.pop(cell, None)
+                    else:
+                        self._pages.setdefault(cell, {})[int(page)] = (int(pages), int(count))
+                except ValueError:
+                    continue    # line torn by a crash; the page is fetched again
+        return self._pages
+
+    def fetched_pages(self, cell_id: str) -> dict[int, tuple[int, int]]:
+        """Returns {page: (pages, count)} for the stored pages of a cell."""
+        return dict(self._load_pages().get(cell_id, {}))
+
+    def cells(self) -> Iterator[list[str]]:
+        return self._read_rows(self.done_csv)
+
+    def failed_cells(self) -> list[list[str]]:
+        """Returns the rows of the cells whose last check had errors (later rows win)."""
+        latest = {row[0]: row for row in self._read_rows(self.done_csv)}
+        return [row for row in latest.values() if row[2] == "True"]
+
+    def pages(self) -> Iterator[list[str]]:
+        for cell_id, pages in self._load_pages().items():
+            for page, (total_pages, count) in pages.items():
+                yield [cell_id, str(page), str(total_pages), str(count)]
+
+    def mark_upload(self, box_id: str, max_upload: int) -> None:
+        self._append_rows(self.marks_csv, [[box_id, str(max_upload)]])
+
+    def upload_marks(self) -> dict[str, int]:
+        """Returns {box_id: latest dateupload (unix time) stored for the cell}."""
+        marks = {}
+        for row in self._read_rows(self.marks_csv):
+            if len(row) == 2 and row[1].isdigit():     # skips a line torn by a crash
+                marks[row[0]] = int(row[1])
+        return marks
+
+    # ---------- Photos ----------
+    def add_results(self, rows: Sequence[Sequence[str]]) -> None:
+        self._append_rows(self.results_csv, rows)
+
+    def results(self) -> Iterator[list[str]]:
+        return self._read_rows(self.results_csv)
+
+    def _clean(self) -> None:
+        # Deduplicate CSV (If cleaned does not exist or if results_csv is newer)
+        if not self.results_csv.exists():
+            return
+        if not self.results_cleaned.exists() or \
+           self.results_csv.stat().st_mtime > self.results_cleaned.stat().st_mtime:
+            DuplicateCleaner(self.results_csv, self.results_cleaned).clean()
+
+    def photo_count(self) -> int:
+        self._clean()
+        return sum(1 for _ in self._read_rows(self.results_cleaned))
+
+    def photos(self) -> Iterator[tuple[int, list[str]]]:
+        """Yields (position, row) for every deduplicated photo (the file has no header)."""
+        self._clean()
+        yield from enumerate(self._read_rows(self.results_cleaned), start=1)
+
+    def pending_photos(self) -> Iterator[tuple[int, list[str]]]:
+        """Yields (position, row) for every deduplicated photo not downloaded yet."""
+        self._clean()
+        done = self.downloaded_ids()
+        if done:
+            log.info("Skipping %d already downloaded photos\n",  len(done))
+
+        for idx, row in self.photos():
+            if row[2] not in done:
+                yield idx, row
+
+    # ---------- Downloads ----------
+    def mark_downloaded(self, rows: Sequence[Sequence[str]]) -> None:
+        self._append_rows(self.downloaded_csv, rows)
+
+    def downloaded_ids(self) -> PhotoIdIndex:
+        return PhotoIdIndex.for_csv(self.downloaded_csv, column=0)
+
+    def downloads(self) -> Iterator[list[str]]:
+        return self._read_rows(self.downloaded_csv)
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteStateStore:
+    """
+    Indexed state backend (one SQLite file per zone and year range, WAL mode):
+    • Cells and downloads are keyed by id, so resume checks are single index lookups.
+    • Photos are deduplicated on insert by their primary key; rowid keeps search order.
+    • Writes are batched: each call is one transaction.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cells (
+            cell_id TEXT PRIMARY KEY, total INTEGER, had_errors INTEGER,
+            bbox TEXT, min_taken TEXT, max_taken TEXT
+        );
+        CREATE TABLE IF NOT EXISTS pages (
+            cell_id TEXT, page INTEGER, pages INTEGER, count INTEGER,
+            PRIMARY KEY (cell_id, page)
+        );
+        CREATE TABLE IF NOT EXISTS marks (
+            box_id TEXT PRIMARY KEY, max_upload INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS photos (
+            photo_id TEXT UNIQUE NOT NULL, box_id TEXT, page TEXT,
+            owner TEXT, secret TEXT, title TEXT, extras TEXT
+        );
+        CREATE TABLE IF NOT EXISTS downloads (
+            photo_id TEXT PRIMARY KEY, box_id TEXT, status TEXT, ok INTEGER
+        );
+    """
+    CHUNK = 1000   # rows read per query while iterating pending photos
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+
+    # ---------- Cells ----------
+    def is_cell_done(self, cell_id: str) -> bool:
+        with self._lock:
+            cur = self._db.execute("SELECT 1 FROM cells WHERE cell_id = ?", (cell_id,))
+            return cur.fetchone() is not None
+
+    def _cell_values(self, row: Sequence[str]) -> tuple:
+        cell_id, total, had_errors, *part = row
+        bbox, min_taken, max_taken = (list(part) + [None] * 3)[:3]
+        return (cell_id, int(total), had_errors == "True", bbox, min_taken, max_taken)
+
+    def mark_cell(self, row: Sequence[str]) -> None:
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO cells VALUES (?, ?, ?, ?, ?, ?)", self._cell_values(row))
+
+    def mark_page(self, cell_id: str, page: int, pages: int, count: int) -> None:
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)", (cell_id, page, pages, count))
+
+    @staticmethod
+    def _page_values(row: Sequence[str]) -> tuple | None:
+        try:
+            cell_id, page, pages, count = row
+            return (cell_id, int(page), int(pages), int(count))
+        except ValueError:
+            return None     # torn CSV line
+
+    def clear_pages(self, cell_id: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM pages WHERE cell_id = ?", (cell_id,))
+
+    def fetched_pages(self, cell_id: str) -> dict[int, tuple[int, int]]:
+        """Returns {page: (pages, count)} for the stored pages of a cell."""
+        with self._lock:
+            rows = self._db.execute("SELECT page, pages, count FROM pages WHERE cell_id = ?",
+                                    (cell_id,)).fetchall()
+        return {page: (pages, count) for page, pages, count in rows}
+
+    @staticmethod
+    def _cell_row(values: Sequence) -> list[str]:
+        cell_id, total, had_errors, *part = values
+        return [cell_id, str(total), str(bool(had_errors)), *(p for p in part if p is not None)]
+
+    def cells(self) -> Iterator[list[str]]:
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM cells ORDER BY rowid").fetchall()
+        return (self._cell_row(r) for r in rows)
+
+    def failed_cells(self) -> list[list[str]]:
+        """Returns the rows of the cells whose last check had errors."""
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM cells WHERE had_errors ORDER BY rowid").fetchall()
+        return [self._cell_row(r) for r in rows]
+
+    def pages(self) -> Iterator[list[str]]:
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM pages ORDER BY rowid").fetchall()
+        for cell_id, page, pages, count in rows:
+            yield [cell_id, str(page), str(pages), str(count)]
+
+    def mark_upload(self, box_id: str, max_upload: int) -> None:
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO marks VALUES (?, ?)", (box_id, max_upload))
+
+    def upload_marks(self) -> dict[str, int]:
+        """Returns {box_id: latest dateupload (unix time) stored for the cell}."""
+        with self._lock:
+            return dict(self._db.execute("SELECT box_id, max_upload FROM marks").fetchall())
+
+    # ---------- Photos ----------
+    @staticmethod
+    def _photo_values(row: Sequence[str]) -> tuple:
+        box_id, page, photo_id, owner, secret, title = row[:6]
+        extras = row[6] if len(row) > 6 and row[6] else None
+        return (photo_id, box_id, page, owner, secret, title, extras)
+
+    @staticmethod
+    def _photo_row(values: Sequence) -> list[str]:
+        photo_id, box_id, page, owner, secret, title, extras = values
+        row = [box_id, page, photo_id, owner, secret, title]
+        return row + [extras] if extras else row
+
+    def add_results(self, rows: Sequence[Sequence[str]]) -> None:
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO photos VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self._photo_values(r) for r in rows),
+            )
+
+    def _iter_photos(self, where: str = "") -> Iterator[tuple[int, list[str]]]:
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    f"SELECT p.rowid, p.* FROM photos p {where} "
+                    f"{'AND' if where else 'WHERE'} p.rowid > ? ORDER BY p.rowid LIMIT ?",
+                    (last, self.CHUNK),
+                ).fetchall()
+            if not rows:
+                return
+            for rowid, *values in rows:
+                yield rowid, self._photo_row(values)
+            last = rows[-1][0]
+
+    def results(self) -> Iterator[list[str]]:
+        return (row for _, row in self._iter_photos())
+
+    def photo_count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT count(*) FROM photos").fetchone()[0]
+
+    def photos(self) -> Iterator[tuple[int, list[str]]]:
+        """Yields (position, row) for every photo."""
+        return self._iter_photos()
+
+    def pending_photos(self) -> Iterator[tuple[int, list[str]]]:
+        """Yields (position, row) for every photo without a download record."""
+        with self._lock:
+            done = self._db.execute("SELECT count(*) FROM downloads").fetchone()[0]
+        if done:
+            log.info("Skipping %d already downloaded photos\n",  done)
+        return self._iter_photos(
+            "LEFT JOIN downloads d ON d.photo_id = p.photo_id WHERE d.photo_id IS NULL"
+        )
+
+    # ---------- Downloads ----------
+    def mark_downloaded(self, rows: Sequence[Sequence[str]]) -> None:
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?)",
+                ((photo_id, box_id, status, ok == "True") for photo_id, box_id, status, ok in rows),
+            )
+
+    def downloaded_ids(self) -> PhotoIdIndex:
+        with self._lock:
+            rows = self._db.execute("SELECT CAST(photo_id AS INTEGER) AS id FROM downloads ORDER BY id")
+            return PhotoIdIndex(array("q", (photo_id for photo_id, in rows)))
+
+    def downloads(self) -> Iterator[list[str]]:
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM downloads ORDER BY rowid").fetchall()
+        for photo_id, box_id, status, ok in rows:
+            yield [photo_id, box_id, status, str(bool(ok))]
+
+    # ---------- CSV interchange ----------
+    BATCH = 10_000
+
+    def _batched(self, rows: Iterable[list[str]], write) -> int:
+        batch, n = [], 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.BATCH:
+                write(batch); n += len(batch); batch = []
+        if batch:
+            write(batch); n += len(batch)
+        return n
+
+    def import_csv(self, source: CsvStateStore) -> tuple[int, int, int, int]:
+        """
+        Loads the CSV state of a zone (duplicates are dropped by the photos key).
+        Upload marks are imported too.
+        :return: Rows read from (checked_grids, checked_pages, results, downloaded_images).
+        """
+        def mark_cells(rows: list[list[str]]) -> None:
+            with self._lock, self._db:
+                self._db.executemany("INSERT OR REPLACE INTO cells VALUES (?, ?, ?, ?, ?, ?)",
+                                     (self._cell_values(r) for r in rows))
+
+        def mark_pages(rows: list[list[str]]) -> None:
+            with self._lock, self._db:
+                self._db.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)",
+                                     (r for r in map(self._page_values, rows) if r))
+
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO marks VALUES (?, ?)", source.upload_marks().items())
+
+        return (
+            self._batched(source.cells(), mark_cells),
+            self._batched(source.pages(), mark_pages),
+            self._batched(source.results(), self.add_results),
+            self._batched(source.downloads(), self.mark_downloaded),
+        )
+
+    def export_csv(self, target: CsvStateStore) -> tuple[int, int, int, int]:
+        """
+        Writes the state back to the CSV layout, replacing the target files.
+        Upload marks are exported too.
+        :return: Rows written to (checked_grids, checked_pages, results, downloaded_images).
+        """
+        target.marks_csv.unlink(missing_ok=True)
+        target._append_rows(target.marks_csv, ([box_id, str(m)] for box_id, m in self.upload_marks().items()))
+
+        counts = []
+        for path, rows in (
+            (target.done_csv, self.cells()),
+            (target.pages_csv, self.pages()),
+            (target.results_csv, self.results()),
+            (target.downloaded_csv, self.downloads()),
+        ):
+            path.unlink(missing_ok=True)
+            counts.append(self._batched(rows, lambda batch, path=path: target._append_rows(path, batch)))
+        return counts[0], counts[1], counts[2], counts[3]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+StateStore = CsvStateStore | SqliteStateStore
+
+
+def sqlite_path(csv_dir: Path, start_year: int, end_year: int) -> Path:
+    return csv_dir / f"state_{start_year}_{end_year}.sqlite"
+
+
+def open_state(csv_dir: Path, start_year: int, end_year: int, backend: str = "csv") -> StateStore:
+    """Opens the state of a zone and year range with the given backend ('csv' or 'sqlite')."""
+    if backend == "sqlite":
+        return SqliteStateStore(sqlite_path(csv_dir, start_year, end_year))
+    if backend == "csv":
+        return CsvStateStore(csv_dir, start_year, end_year)
+    raise ValueError(f"Unknown state backend '{backend}'. Expected one of {STATE_BACKENDS}")
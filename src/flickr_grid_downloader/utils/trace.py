@@ -0,0 +1,103 @@
+from __future__ import annotations
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from flickr_grid_downloader.console import get_logger
+
+log = get_logger(__name__)
+
+# Event kinds written to the trace (see `fgd analyze-trace`):
+# • api    one REST call: method, status, bytes, parse (JSON decoding seconds), photo / page
+# • cache  one REST call answered by the response cache: method
+# • page   one search page with retries: cell, page, photos, status
+# • image  one photo from the CDN: box, photo, bytes, status (downloaded, on_disk, error)
+# • write  one file write: what (page, image, flush), bytes or rows, cell / photo
+EVENTS = ("api", "cache", "page", "image", "write")
+
+_STOP = object()
+
+
+class Tracer:
+    """
+    Opt-in sink of trace events, one compact JSON object per line:
+    {"t": <epoch seconds>, "ev": <kind>, "dur": <seconds>, <fields>…}
+    While no file is open `event` returns at once. Once started, the hot path only puts
+    a tuple on a queue; a background thread serializes the events and writes them in
+    batches through a buffered file, flushed every `interval` seconds.
+    """
+    def __init__(self) -> None:
+        self.path: Path | None = None
+        self._queue: queue.SimpleQueue | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._queue is not None
+
+    def start(self, path: Path, interval: float = 1.0) -> Tracer:
+        """Appends the events of this run to `path`."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._loop, args=(path, self._queue, interval),
+                                        name="trace", daemon=True)
+        self._thread.start()
+        return self
+
+    def event(self, ev: str, dur: float | None = None, **fields: Any) -> None:
+        q = self._queue
+        if q is not None:
+            q.put((time.time(), ev, dur, fields))
+
+    @staticmethod
+    def _line(item: tuple[float, str, float | None, dict[str, Any]]) -> str:
+        t, ev, dur, fields = item
+        record = {"t": round(t, 6), "ev": ev}
+        if dur is not None:
+            record["dur"] = round(dur, 6)
+        record.update(fields)
+        return json.dumps(record, separators=(",", ":"), default=str) + "\n"
+
+    def _loop(self, path: Path, q: queue.SimpleQueue, interval: float) -> None:
+        with path.open("a", buffering=1 << 16) as f:
+            while True:
+                try:
+                    item = q.get(timeout=interval)
+                except queue.Empty:
+                    continue
+                stop = False
+                lines = []
+                while True:
+                    if item is _STOP:
+                        stop = True
+                        break
+                    lines.append(self._line(item))
+                    try:
+                        item = q.get_nowait()
+                    except queue.Empty:
+                        break
+                try:
+                    f.writelines(lines)
+                    f.flush()
+                except OSError as exc:
+                    log.warning("Trace events not written to %s → %s", path, exc)
+                if stop:
+                    return
+
+    def close(self) -> None:
+        """Writes the events still queued and closes the file."""
+        q, thread = self._queue, self._thread
+        if q is None:
+            return
+        self._queue = None
+        q.put(_STOP)
+        thread.join()
+        log.info("Trace written to %s", self.path)
+
+
+# ---------- «global» sink, shared like `metrics` ----------
+tracer = Tracer()
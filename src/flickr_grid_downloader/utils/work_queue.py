@@ -0,0 +1,276 @@
+from __future__ import annotations
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable
+
+from flickr_grid_downloader.console import get_logger
+from flickr_grid_downloader.utils.rate_limiter import TokenBucket
+
+log = get_logger(__name__)
+
+STAGES = ("grid", "images")     # an images task waits for the grid task of its zone
+
+
+@dataclass(slots=True)
+class Task:
+    id: int
+    zone: str
+    start_year: int
+    end_year: int
+    stage: str
+    spec: dict[str, Any]        # job options given to `fgd enqueue`
+    attempts: int
+
+    def __str__(self) -> str:
+        return f"{self.stage} {self.zone} {self.start_year}-{self.end_year} (#{self.id})"
+
+
+class WorkQueue:
+    """
+    Shared queue of zone tasks (one SQLite file, e.g. on storage mounted by every node):
+    • A task is one stage ('grid' or 'images') of a zone and year range. The state of a
+      zone is written by a single process, so the holder of its lease is the only writer.
+    • `claim` leases the oldest runnable task for `lease` seconds; the holder extends it
+      with `heartbeat`. A task whose lease ran out (crashed or hung worker) is claimed
+      again and resumes from the checkpoints of its zone.
+    • Tasks failing `max_attempts` times are parked as 'failed' until enqueued again. The
+      images task of a parked grid task is 'blocked' with it: it could never run.
+    The file uses the rollback journal instead of WAL, which needs shared memory on a
+    single host. Leases compare wall-clock times, so node clocks must be in sync.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY, zone TEXT NOT NULL, start_year INTEGER, end_year INTEGER,
+            stage TEXT NOT NULL, spec TEXT, status TEXT NOT NULL DEFAULT 'pending',
+            owner TEXT, lease_until REAL, attempts INTEGER DEFAULT 0, error TEXT, updated REAL,
+            UNIQUE (zone, start_year, end_year, stage)
+        );
+        CREATE TABLE IF NOT EXISTS budget (
+            name TEXT PRIMARY KEY, tokens REAL, stamp REAL
+        );
+    """
+
+    def __init__(self, path: Path, lease: float = 300.0, max_attempts: int = 3) -> None:
+        """
+        :param lease: Seconds a claimed task stays reserved without a heartbeat.
+        :param max_attempts: Claims of a task before it is parked as failed.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=DELETE")
+        self._db.executescript(self.SCHEMA)
+
+    def _write(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._db.execute(sql, params)
+
+    # ---------- Producer ----------
+    def enqueue(self, zone: str, start_year: int, end_year: int, stages: Iterable[str],
+                spec: dict[str, Any]) -> int:
+        """
+        Adds the stages of a zone. A task already queued gets the new spec and is made
+        runnable again (unless it is leased), e.g. for a `since_last_run` update.
+        :return: Tasks added or reset.
+        """
+        now = time.time()
+        changed = 0
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for stage in stages:
+                    if stage not in STAGES:
+                        raise ValueError(f"Unknown stage '{stage}'. Expected one of {STAGES}")
+                    cur = self._db.execute(
+                        """INSERT INTO tasks (zone, start_year, end_year, stage, spec, updated)
+                           VALUES (?, ?, ?, ?, ?, ?)
+                           ON CONFLICT (zone, start_year, end_year, stage) DO UPDATE
+                           SET spec = excluded.spec, status = 'pending', attempts = 0,
+                               error = NULL, owner = NULL, lease_until = NULL, updated = excluded.updated
+                           WHERE status != 'leased'""",
+                        (zone, start_year, end_year, stage, json.dumps(spec), now))
+                    changed += cur.rowcount
+                self._cascade(now)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return changed
+
+    # ---------- Worker ----------
+    def claim(self) -> Task | None:
+        """Leases the oldest runnable task, or returns None when there is none right now."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired leases that used up their attempts are parked first
+                self._db.execute(
+                    """UPDATE tasks SET status = 'failed', owner = NULL, updated = ?,
+                       error = coalesce(error, 'lease expired')
+                       WHERE status = 'leased' AND lease_until < ? AND attempts >= ?""",
+                    (now, now, self.max_attempts))
+                self._cascade(now)
+                row = self._db.execute(
+                    """SELECT id, zone, start_year, end_year, stage, spec, attempts FROM tasks t
+                       WHERE (status = 'pending' OR (status = 'leased' AND lease_until < ?))
+                         AND NOT (stage = 'images' AND EXISTS (
+                             SELECT 1 FROM tasks g WHERE g.stage = 'grid' AND g.zone = t.zone
+                             AND g.start_year = t.start_year AND g.end_year = t.end_year
+                             AND g.status != 'done'))
+                       ORDER BY id LIMIT 1""", (now,)).fetchone()
+                if row:
+                    self._db.execute(
+                        """UPDATE tasks SET status = 'leased', owner = ?, lease_until = ?,
+                           attempts = attempts + 1, updated = ? WHERE id = ?""",
+                        (self.owner, now + self.lease, now, row[0]))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        if not row:
+            return None
+        return Task(row[0], row[1], row[2], row[3], row[4], json.loads(row[5] or "{}"), row[6] + 1)
+
+    def _cascade(self, now: float) -> None:
+        """
+        Blocks the pending images tasks whose grid task is parked as failed, and unblocks
+        them once it is enqueued again. Runs inside the caller's transaction.
+        """
+        failed_grid = """EXISTS (SELECT 1 FROM tasks g WHERE g.stage = 'grid' AND g.zone = tasks.zone
+                         AND g.start_year = tasks.start_year AND g.end_year = tasks.end_year
+                         AND g.status = 'failed')"""
+        self._db.execute(f"""UPDATE tasks SET status = 'blocked', error = 'grid task failed', updated = ?
+                             WHERE stage = 'images' AND status = 'pending' AND {failed_grid}""", (now,))
+        self._db.execute(f"""UPDATE tasks SET status = 'pending', error = NULL, updated = ?
+                             WHERE stage = 'images' AND status = 'blocked' AND NOT {failed_grid}""", (now,))
+
+    def heartbeat(self, task: Task) -> bool:
+        """Extends the lease of `task`. False when another worker has taken it over."""
+        now = time.time()
+        cur = self._write("UPDATE tasks SET lease_until = ?, updated = ? WHERE id = ? AND owner = ? "
+                          "AND status = 'leased'", (now + self.lease, now, task.id, self.owner))
+        return cur.rowcount == 1
+
+    def complete(self, task: Task) -> None:
+        self._write("UPDATE tasks SET status = 'done', owner = NULL, lease_until = NULL, error = NULL, "
+                    "updated = ? WHERE id = ? AND owner = ?", (time.time(), task.id, self.owner))
+
+    def fail(self, task: Task, error: str) -> None:
+        """Puts the task back in the queue, or parks it once it has used up its attempts."""
+        status = "failed" if task.attempts >= self.max_attempts else "pending"
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("UPDATE tasks SET status = ?, owner = NULL, lease_until = NULL, error = ?, "
+                                 "updated = ? WHERE id = ? AND owner = ?",
+                                 (status, error[:500], now, task.id, self.owner))
+                self._cascade(now)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def release(self, task: Task) -> None:
+        """Gives an interrupted task back without counting the attempt."""
+        self._write("UPDATE tasks SET status = 'pending', owner = NULL, lease_until = NULL, "
+                    "attempts = attempts - 1, updated = ? WHERE id = ? AND owner = ?",
+                    (time.time(), task.id, self.owner))
+
+    # ---------- Reporting ----------
+    def tasks(self) -> list[dict[str, Any]]:
+        with self._lock:
+            cur = self._db.execute(
+                "SELECT id, zone, start_year, end_year, stage, status, owner, lease_until, attempts, error "
+                "FROM tasks ORDER BY id")
+            names = [d[0] for d in cur.description]
+            return [dict(zip(names, row)) for row in cur.fetchall()]
+
+    def counts(self) -> dict[str, int]:
+        """Tasks by status; leases that ran out count as pending."""
+        counts = dict.fromkeys(("pending", "leased", "done", "failed", "blocked"), 0)
+        now = time.time()
+        for task in self.tasks():
+            expired = task["status"] == "leased" and task["lease_until"] < now
+            counts["pending" if expired else task["status"]] += 1
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket kept in the queue file, so the API budget is shared by every worker of
+    every node. Each acquire is one short transaction; every node must be started with
+    the same rate (REQUESTS_PER_HOUR and key count).
+    """
+    def __init__(self, queue: WorkQueue, rate: float, capacity: float | None = None,
+                 name: str = "api") -> None:
+        super().__init__(rate, capacity)
+        self.queue = queue
+        self.name = name
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        q = self.queue
+        with q._lock:
+            q._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = q._db.execute("SELECT tokens, stamp FROM budget WHERE name = ?", (self.name,)).fetchone()
+                level = self.capacity if row is None else min(self.capacity, row[0] + (now - row[1]) * self.rate)
+                level -= tokens
+                q._db.execute("INSERT OR REPLACE INTO budget (name, tokens, stamp) VALUES (?, ?, ?)",
+                              (self.name, level, now))
+                q._db.execute("COMMIT")
+            except BaseException:
+                q._db.execute("ROLLBACK")
+                raise
+        wait = -level / self.rate if level < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class LeaseKeeper:
+    """
+    Heartbeat thread of the running task. If the lease is lost (the worker was stalled
+    for longer than the lease and another one took the task over) the process exits at
+    once: two writers on the same zone state would corrupt it.
+    """
+    def __init__(self, queue: WorkQueue, task: Task) -> None:
+        self.queue = queue
+        self.task = task
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="lease", daemon=True)
+
+    def __enter__(self) -> LeaseKeeper:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.queue.lease / 3):
+            try:
+                alive = self.queue.heartbeat(self.task)
+            except sqlite3.Error as exc:     # e.g. shared storage briefly unavailable
+                log.warning("Heartbeat of %s failed → %s", self.task, exc)
+                continue
+            if not alive:
+                log.error("Lease of %s lost to another worker; exiting", self.task)
+                os._exit(75)
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+import pytest
+from mock_flickr import MockConfig, serve
+
+
+@pytest.fixture(scope="module")
+def mock_server():
+    """The mock Flickr API and CDN of benchmarks/, on a free port."""
+    server = serve(MockConfig(density=3, image_kb=4))
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture(scope="module")
+def mock_url(mock_server) -> str:
+    return f"http://127.0.0.1:{mock_server.server_port}"
@@ -0,0 +1,47 @@
+from __future__ import annotations
+from pathlib import Path
+
+import pytest
+
+from flickr_grid_downloader.utils.cell_plan import CellPlan
+
+CELLS = [(1, "a", "0,0,1,1"), (2, "b", "1,0,2,1"), (3, "c", "2,0,3,1"),
+         (4, "d", "3,0,4,1"), (5, "e", "4,0,5,1"), (6, "f", "5,0,6,1")]
+
+
+@pytest.fixture
+def plan(tmp_path: Path) -> CellPlan:
+    plan = CellPlan.for_zone(tmp_path, 2015, 2024)
+    plan.add([("a", 10), ("b", 3999), ("c", 100_000), ("d", 4000), ("f", 5000)])     # e not probed
+    return plan
+
+
+def _order(plan: CellPlan, order: str) -> list[str]:
+    return [box_id for _, box_id, _ in plan.order(iter(CELLS), order)]
+
+
+def test_orders(plan):
+    assert _order(plan, "file") == ["a", "b", "c", "d", "e", "f"]
+    assert _order(plan, "largest") == ["c", "f", "d", "b", "a", "e"]
+    # At or over the cap first, then under it; nearest first, unprobed cells last
+    assert _order(plan, "cap") == ["d", "f", "c", "b", "a", "e"]
+    assert [idx for idx, _, _ in plan.order(iter(CELLS), "cap")] == [1, 2, 3, 4, 5, 6]
+    with pytest.raises(ValueError, match="Unknown order"):
+        _order(plan, "random")
+
+
+def test_reload_later_rows_win(plan, tmp_path: Path):
+    plan.add([("a", 0)])
+    again = CellPlan.for_zone(tmp_path, 2015, 2024)
+    assert len(again) == 5
+    assert again.total("a") == 0 and again.total("e") is None
+
+
+def test_torn_and_malformed_rows_are_skipped(plan, tmp_path: Path):
+    with plan.path.open("a") as f:
+        f.write("g,\nh,x\nid,12")              # the last row was cut by a crash
+    again = CellPlan.for_zone(tmp_path, 2015, 2024)
+    assert len(again) == 5 and again.total("id") is None
+
+    again.add([("id", 1234)])                  # appended after the dropped tail
+    assert CellPlan.for_zone(tmp_path, 2015, 2024).total("id") == 1234
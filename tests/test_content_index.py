@@ -0,0 +1,46 @@
+from __future__ import annotations
+from pathlib import Path
+
+import pytest
+
+from flickr_grid_downloader.utils.content_index import ContentIndex
+
+
+@pytest.fixture
+def index(tmp_path: Path):
+    index = ContentIndex(tmp_path / "content_index.sqlite")
+    yield index
+    index.close()
+
+
+def _write(path: Path, data: bytes) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def test_identical_bytes_are_hardlinked(index, tmp_path: Path):
+    first = _write(tmp_path / "zone_a" / "1.jpg", b"same image")
+    second = _write(tmp_path / "zone_b" / "2.jpg", b"same image")
+    other = _write(tmp_path / "zone_b" / "3.jpg", b"another image")
+
+    assert index.add("1", first)["duplicate_of"] is None
+    content = index.add("2", second)
+    assert content["duplicate_of"] == "zone_a/1.jpg"
+    assert content["size"] == len(b"same image") and len(content["sha256"]) == 64
+    assert second.samefile(first)
+    assert index.add("3", other)["duplicate_of"] is None
+
+    assert index.add("1", first)["duplicate_of"] is None    # registering again is a no-op
+
+
+def test_find_photo_ignores_files_gone_from_disk(index, tmp_path: Path):
+    path = _write(tmp_path / "zone_a" / "1.jpg", b"image")
+    index.add("1", path)
+    assert index.find_photo("1") == path
+    assert index.find_photo("2") is None
+
+    path.unlink()
+    assert index.find_photo("1") is None
+    again = _write(tmp_path / "zone_b" / "9.jpg", b"image")
+    assert index.add("9", again)["duplicate_of"] is None    # the canonical file is replaced
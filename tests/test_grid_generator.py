@@ -0,0 +1,78 @@
+from __future__ import annotations
+import csv
+import json
+from pathlib import Path
+
+import pytest
+
+# Needs the optional NumPy dependency
+grid_generator = pytest.importorskip("flickr_grid_downloader.tools.grid_generator")
+CSV_HEADER, Grid, Region = grid_generator.CSV_HEADER, grid_generator.Grid, grid_generator.Region
+
+CELL_M = 1000
+
+
+def _boxes(grid: Grid) -> dict[str, tuple[float, ...]]:
+    return {box_id: tuple(map(float, bbox.split(","))) for box_id, bbox in grid}
+
+
+def _square(x0: float, y0: float, x1: float, y1: float) -> list[list[float]]:
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]
+
+
+def test_bbox_rows_cover_the_region():
+    grid = Grid(Region.from_bbox("-3.7,40.4,-3.6,40.45"), CELL_M)
+    boxes = _boxes(grid)
+    assert len(grid) == len(boxes) > 0
+
+    rows: dict[tuple[float, float], list[tuple[float, ...]]] = {}
+    for box in boxes.values():
+        rows.setdefault((box[1], box[3]), []).append(box)
+    lats = sorted(rows)
+    assert lats[0][0] <= 40.4 < lats[0][1] and lats[-1][0] < 40.45 <= lats[-1][1]
+    for (y0, y1), cells in rows.items():
+        cells.sort()
+        assert y1 - y0 == pytest.approx(CELL_M / 111_195, rel=1e-3)
+        assert cells[0][0] <= -3.7 and cells[-1][2] >= -3.6
+        assert all(a[2] == b[0] for a, b in zip(cells, cells[1:]))      # contiguous
+
+
+def test_ids_are_stable_across_regions_and_chunks():
+    big = _boxes(Grid(Region.from_bbox("10,50,10.2,50.1"), CELL_M))
+    small = _boxes(Grid(Region.from_bbox("10.05,50.02,10.1,50.05"), CELL_M, chunk_rows=1))
+    assert small and all(big[box_id] == box for box_id, box in small.items())
+
+
+def test_holes_and_multipolygons(tmp_path: Path):
+    outer, hole = _square(0, 0, 0.2, 0.2), _square(0.05, 0.05, 0.15, 0.15)
+    island = _square(1, 1, 1.02, 1.02)
+    path = tmp_path / "region.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": [
+        {"type": "Feature", "geometry": {"type": "MultiPolygon", "coordinates": [[outer, hole], [island]]}},
+    ]}))
+
+    boxes = _boxes(Grid(Region.from_geojson(path), CELL_M))
+    full = _boxes(Grid(Region.from_bbox("0,0,0.2,0.2"), CELL_M))
+    inside_hole = [b for b in boxes.values() if b[0] >= 0.05 and b[2] <= 0.15 and b[1] >= 0.05 and b[3] <= 0.15]
+    assert not inside_hole
+    assert any(b[0] >= 1 for b in boxes.values())
+    assert len([b for b in boxes.values() if b[0] < 1]) < len(full)
+
+
+def test_write_csv(tmp_path: Path):
+    grid = Grid(Region.from_bbox("0,0,0.03,0.03"), CELL_M)
+    path = tmp_path / "zone_coordinates.csv"
+    assert grid.write_csv(path) == len(grid)
+    with path.open() as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == CSV_HEADER
+    assert [(r[0], f"{r[1]},{r[2]},{r[5]},{r[6]}") for r in rows[1:]] == list(grid)
+
+
+def test_invalid_regions():
+    with pytest.raises(ValueError, match="min < max"):
+        Region.from_bbox("1,1,0,2")
+    with pytest.raises(ValueError, match="lon/lat"):
+        Region.from_bbox("0,0,200,1")
+    with pytest.raises(ValueError, match="greater than 0"):
+        Grid(Region.from_bbox("0,0,1,1"), 0)
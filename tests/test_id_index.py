@@ -0,0 +1,56 @@
+from __future__ import annotations
+from pathlib import Path
+
+from flickr_grid_downloader.utils.id_index import PhotoIdIndex, iter_csv_from
+
+
+def test_add_and_contains_across_compaction(monkeypatch):
+    monkeypatch.setattr(PhotoIdIndex, "MERGE_EVERY", 3)
+    index = PhotoIdIndex()
+    assert index.add("30") and index.add(10) and index.add("20")     # third add compacts
+    assert not index.add("10")
+    assert index.add("15")
+    assert len(index) == 4
+    assert all(i in index for i in ("10", "15", 20, "30"))
+    assert "11" not in index
+
+
+def test_save_and_load(tmp_path: Path):
+    source = tmp_path / "ids.csv"
+    source.write_text("1\n2\n")
+    index = PhotoIdIndex(offset=source.stat().st_size)
+    index.add("2")
+    index.add("1")
+    index.save(tmp_path / "ids.idx", source)
+
+    loaded = PhotoIdIndex.load(tmp_path / "ids.idx")
+    assert loaded is not None and len(loaded) == 2 and "1" in loaded
+    assert loaded.matches(source)
+    assert PhotoIdIndex.load(tmp_path / "missing.idx") is None
+    (tmp_path / "bad.idx").write_bytes(b"not an index")
+    assert PhotoIdIndex.load(tmp_path / "bad.idx") is None
+
+
+def test_for_csv_is_incremental_and_detects_rewrites(tmp_path: Path):
+    path = tmp_path / "downloaded.csv"
+    path.write_text("1,a\n2,a\n")
+    assert len(PhotoIdIndex.for_csv(path)) == 2
+    assert (tmp_path / "downloaded.csv.idx").exists()
+
+    with path.open("a") as f:
+        f.write("3,b\n4,b")                     # the last row is still being written
+    index = PhotoIdIndex.for_csv(path)
+    assert len(index) == 3 and "4" not in index
+
+    path.write_text("9,c\n")                    # rewritten: the index is rebuilt
+    index = PhotoIdIndex.for_csv(path)
+    assert len(index) == 1 and "9" in index and "1" not in index
+
+
+def test_iter_csv_from_stops_before_a_torn_line(tmp_path: Path):
+    path = tmp_path / "rows.csv"
+    path.write_bytes(b"a,1\nb,2\nc,")
+    rows = list(iter_csv_from(path))
+    assert [row for row, _ in rows] == [["a", "1"], ["b", "2"]]
+    assert rows[-1][1] == len(b"a,1\nb,2\n")
+    assert [row for row, _ in iter_csv_from(path, rows[0][1])] == [["b", "2"]]
@@ -0,0 +1,63 @@
+from __future__ import annotations
+from pathlib import Path
+
+import pytest
+import requests
+
+from flickr_grid_downloader.utils.image_fetcher import ImageFetcher
+
+PHOTO_ID = "4242"
+
+
+@pytest.fixture
+def fetcher():
+    fetcher = ImageFetcher(pool_size=2, timeout=10)
+    yield fetcher
+    fetcher.close()
+
+
+@pytest.fixture
+def image(mock_server) -> bytes:
+    return mock_server.RequestHandlerClass.mock.image(PHOTO_ID)
+
+
+def _url(mock_url: str) -> str:
+    return f"{mock_url}/65535/{PHOTO_ID}_abc123_b.jpg"
+
+
+def _cdn_bytes(mock_server) -> int:
+    return mock_server.RequestHandlerClass.mock.stats["cdn_bytes"]
+
+
+def test_fetch_then_skip_a_complete_image(fetcher, mock_server, mock_url, image, tmp_path: Path):
+    dest = tmp_path / "a.jpg"
+    assert fetcher.fetch(_url(mock_url), dest) is True
+    assert dest.read_bytes() == image
+    assert not ImageFetcher.part_path(dest).exists()
+
+    before = _cdn_bytes(mock_server)
+    assert fetcher.fetch(_url(mock_url), dest) is False
+    assert _cdn_bytes(mock_server) == before
+
+
+def test_resumes_a_part_with_a_range_request(fetcher, mock_server, mock_url, image, tmp_path: Path):
+    dest = tmp_path / "a.jpg"
+    ImageFetcher.part_path(dest).write_bytes(image[:1000])
+
+    before = _cdn_bytes(mock_server)
+    assert fetcher.fetch(_url(mock_url), dest) is True
+    assert dest.read_bytes() == image
+    assert _cdn_bytes(mock_server) - before == len(image) - 1000
+    assert fetcher.received == len(image) - 1000
+
+
+def test_restarts_when_the_part_is_not_a_prefix(fetcher, mock_url, image, tmp_path: Path):
+    dest = tmp_path / "a.jpg"
+    ImageFetcher.part_path(dest).write_bytes(b"x" * (len(image) + 10))     # 416 from the server
+    assert fetcher.fetch(_url(mock_url), dest) is True
+    assert dest.read_bytes() == image
+
+
+def test_missing_image_raises(fetcher, mock_url, tmp_path: Path):
+    with pytest.raises(requests.HTTPError, match="404"):
+        fetcher.fetch(f"{mock_url}/not-an-image", tmp_path / "a.jpg")
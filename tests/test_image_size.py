@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import pytest
+
+from flickr_grid_downloader.utils.image_size import SizePolicy
+
+CDN = "http://cdn"
+PHOTO = {"server": "65535", "secret": "abc"}
+EXTRAS = {**PHOTO, "url_k": "https://live.staticflickr.com/65535/1_kkk_k.jpg",
+          "url_o": "https://live.staticflickr.com/65535/1_ooo_o.png", "o_width": "6000", "o_height": "4000"}
+
+
+@pytest.mark.parametrize("policy, photo, expected", [
+    (SizePolicy(), PHOTO, ("http://cdn/65535/1_abc_b.jpg", "b")),
+    (SizePolicy("z"), PHOTO, ("http://cdn/65535/1_abc_z.jpg", "z")),
+    # _h / _k / originals need their own secrets: fall back to the largest buildable size
+    (SizePolicy("k"), PHOTO, ("http://cdn/65535/1_abc_b.jpg", "b")),
+    (SizePolicy("o"), PHOTO, ("http://cdn/65535/1_abc_b.jpg", "b")),
+    (SizePolicy("k"), EXTRAS, ("http://cdn/65535/1_kkk_k.jpg", "k")),
+    (SizePolicy("o"), EXTRAS, ("http://cdn/65535/1_ooo_o.png", "o")),
+    (SizePolicy("o"), {**PHOTO, "originalsecret": "sss", "originalformat": "gif"},
+     ("http://cdn/65535/1_sss_o.gif", "o")),
+    # Largest variant that fits: the original is too big, _k fits
+    (SizePolicy(None, 2048), EXTRAS, ("http://cdn/65535/1_kkk_k.jpg", "k")),
+    (SizePolicy(None, 8000), EXTRAS, ("http://cdn/65535/1_ooo_o.png", "o")),
+    (SizePolicy(None, 500), PHOTO, ("http://cdn/65535/1_abc.jpg", "")),
+    (SizePolicy(None, 499), PHOTO, ("http://cdn/65535/1_abc_w.jpg", "w")),
+])
+def test_url(policy, photo, expected):
+    assert policy.url(CDN, "1", photo) == expected
+
+
+def test_parse():
+    assert SizePolicy.parse("_B") == SizePolicy("b")
+    assert SizePolicy.parse("1600") == SizePolicy(None, 1600)
+    assert str(SizePolicy.parse("1600")) == "largest ≤ 1600 px"
+    with pytest.raises(ValueError):
+        SizePolicy.parse("q")
+    with pytest.raises(ValueError):
+        SizePolicy.parse("100")
+    with pytest.raises(ValueError):
+        SizePolicy("b", 1024)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from flickr_grid_downloader.utils import key_pool
+from flickr_grid_downloader.utils.key_pool import KeyPool
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake time for the pool: sleeping advances it."""
+    now = SimpleNamespace(t=1_000_000.0)
+
+    def sleep(seconds: float) -> None:
+        now.t += seconds
+
+    monkeypatch.setattr(key_pool, "time", SimpleNamespace(time=lambda: now.t, sleep=sleep))
+    return now
+
+
+def test_parse():
+    assert KeyPool.parse("k1:s1, k2:s2;k3:s3\n# comment\n") == [("k1", "s1"), ("k2", "s2"), ("k3", "s3")]
+    with pytest.raises(ValueError, match="key:secret"):
+        KeyPool.parse("k1:s1,badentry")
+
+
+def test_read_file(tmp_path: Path):
+    path = tmp_path / "keys.txt"
+    path.write_text("k1:s1  # main\n\n# spare\nk2:s2\n")
+    assert KeyPool.read_file(path) == [("k1", "s1"), ("k2", "s2")]
+
+
+def test_spreads_requests_over_the_key_with_most_budget(clock):
+    pool = KeyPool([("a", "sa"), ("b", "sb")], per_hour=10)
+    picked = [pool.acquire()[0] for _ in range(6)]
+    assert sorted(picked) == ["a"] * 3 + ["b"] * 3
+    assert pool.remaining("a") == pool.remaining("b") == 7
+
+
+def test_waits_for_the_window_to_slide(clock):
+    pool = KeyPool([("a", "sa")], per_hour=2)
+    pool.acquire()
+    clock.t += 600
+    pool.acquire()
+    assert pool.remaining("a") == 0
+
+    start = clock.t
+    pool.acquire()          # waits until the first request leaves the window
+    assert clock.t - start == pytest.approx(KeyPool.WINDOW - 600)
+    assert pool.remaining("a") == 0
+
+
+def test_cooldown_skips_the_key(clock):
+    pool = KeyPool([("a", "sa"), ("b", "sb")], per_hour=10)
+    pool.cooldown("a", 60)
+    assert {pool.acquire()[0] for _ in range(5)} == {"b"}
+    clock.t += 61
+    assert pool.acquire()[0] == "a"
+
+
+def test_processes_sharing_the_file_merge_their_usage(clock, tmp_path: Path):
+    path = tmp_path / "usage.json"
+    first = KeyPool([("a", "sa")], per_hour=100, state_path=path)
+    second = KeyPool([("a", "sa")], per_hour=100, state_path=path)
+    other = KeyPool([("z", "sz")], per_hour=100, state_path=path)
+    for _ in range(KeyPool.SAVE_EVERY):
+        first.acquire()
+        second.acquire()
+    other.acquire()
+    other.save()
+
+    # The second pool saved after the first one, so it has seen both
+    assert second.remaining("a") == 100 - 2 * KeyPool.SAVE_EVERY
+    first.save()
+    assert first.remaining("a") == 100 - 2 * KeyPool.SAVE_EVERY
+
+    saved = json.loads(path.read_text())
+    assert len(saved) == 2 and "a" not in saved         # keys are stored hashed
+    fresh = KeyPool([("a", "sa"), ("z", "sz")], per_hour=100, state_path=path)
+    assert fresh.remaining("a") == 100 - 2 * KeyPool.SAVE_EVERY
+    assert fresh.remaining("z") == 99
+
+    clock.t += KeyPool.WINDOW
+    assert fresh.remaining("a") == 100
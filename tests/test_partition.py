@@ -0,0 +1,38 @@
+from __future__ import annotations
+import datetime
+
+from flickr_grid_downloader.utils.partition import MIN_WINDOW, Partition
+
+
+def test_from_bbox_orders_the_corners():
+    part = Partition.from_bbox("1.0,2.0,0.0,1.0", 2015, 2016)
+    assert (part.min_lon, part.min_lat, part.max_lon, part.max_lat) == (0.0, 1.0, 1.0, 2.0)
+    assert part.params() == {
+        "bbox": "0.0000000,1.0000000,1.0000000,2.0000000",
+        "min_taken_date": "2015-01-01 00:00:00",
+        "max_taken_date": "2016-12-31 23:59:59",
+    }
+    assert Partition.from_row(part.bbox, part.min_taken_date, part.max_taken_date) == part
+
+
+def test_split_into_quadrants_covering_the_cell():
+    part = Partition.from_bbox("0,0,0.01,0.01", 2015, 2015)
+    children = part.split()
+    assert len(children) == 4
+    assert {(c.min_lon, c.min_lat) for c in children} == {(0, 0), (0, 0.005), (0.005, 0), (0.005, 0.005)}
+    assert all(c.max_lon - c.min_lon == 0.005 and c.min_taken == part.min_taken for c in children)
+    assert len({c.key for c in children}) == 4
+
+
+def test_split_time_window_below_the_minimum_size():
+    part = Partition.from_bbox("0,0,0.001,0.001", 2015, 2015)
+    first, second = part.split()
+    assert first.bbox == second.bbox == part.bbox
+    assert first.min_taken == part.min_taken and second.max_taken == part.max_taken
+    assert second.min_taken - first.max_taken == datetime.timedelta(seconds=1)
+
+
+def test_split_stops_at_the_minimum_window():
+    start = datetime.datetime(2015, 1, 1)
+    part = Partition(0, 0, 0.001, 0.001, start, start + MIN_WINDOW)
+    assert part.split() == []
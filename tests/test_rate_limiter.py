@@ -0,0 +1,36 @@
+from __future__ import annotations
+import threading
+import time
+
+import pytest
+
+from flickr_grid_downloader.utils.rate_limiter import TokenBucket
+
+
+def test_burst_is_free_then_paced():
+    bucket = TokenBucket(rate=20, capacity=5)
+    assert sum(bucket.acquire() for _ in range(5)) == 0
+
+    start = time.monotonic()
+    waited = sum(bucket.acquire() for _ in range(4))
+    assert waited == pytest.approx(4 / 20, abs=0.03)
+    assert time.monotonic() - start == pytest.approx(4 / 20, abs=0.05)
+
+
+def test_shared_between_threads():
+    bucket = TokenBucket(rate=50, capacity=1)
+    threads = [threading.Thread(target=lambda: [bucket.acquire() for _ in range(5)]) for _ in range(4)]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # 20 tokens with a burst of 1 at 50/s: never faster than the rate
+    assert time.monotonic() - start >= 19 / 50 - 0.01
+
+
+def test_per_hour_and_invalid_rate():
+    bucket = TokenBucket.per_hour(3600)
+    assert bucket.rate == 1 and bucket.capacity == 1
+    with pytest.raises(ValueError):
+        TokenBucket(0)
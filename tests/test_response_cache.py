@@ -0,0 +1,55 @@
+from __future__ import annotations
+import os
+import time
+from pathlib import Path
+
+from flickr_grid_downloader.utils.response_cache import ResponseCache
+
+PAYLOAD = {"photos": {"photo": [{"id": str(i)} for i in range(20)]}}
+
+
+def _age(cache: ResponseCache, params: dict, *, atime: float | None = None, mtime: float | None = None) -> Path:
+    path = cache._path(cache.key("search", params))
+    stat = path.stat()
+    os.utime(path, (atime or stat.st_atime, mtime or stat.st_mtime))
+    return path
+
+
+def test_key_ignores_param_order_and_types():
+    assert ResponseCache.key("m", {"a": 1, "b": "x"}) == ResponseCache.key("m", {"b": "x", "a": "1"})
+    assert ResponseCache.key("m", {"a": 1}) != ResponseCache.key("n", {"a": 1})
+
+
+def test_hit_miss_and_ttl(tmp_path: Path):
+    cache = ResponseCache(tmp_path, ttl=60)
+    assert cache.get("search", {"page": 1}) is None
+    cache.put("search", {"page": 1}, PAYLOAD)
+    assert cache.get("search", {"page": 1}) == PAYLOAD
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    _age(cache, {"page": 1}, mtime=time.time() - 120)
+    assert cache.get("search", {"page": 1}) is None
+
+
+def test_corrupt_entry_is_a_miss(tmp_path: Path):
+    cache = ResponseCache(tmp_path)
+    cache.put("search", {"page": 1}, PAYLOAD)
+    cache._path(cache.key("search", {"page": 1})).write_bytes(b"garbage")
+    assert cache.get("search", {"page": 1}) is None
+
+
+def test_evicts_least_recently_used(tmp_path: Path):
+    probe = ResponseCache(tmp_path / "probe")
+    probe.put("search", {"page": 0}, PAYLOAD)
+    entry = probe._path(probe.key("search", {"page": 0})).stat().st_size
+
+    cache = ResponseCache(tmp_path / "cache", max_bytes=int(entry * 3.5))
+    now = time.time()
+    for page in (1, 2, 3):
+        cache.put("search", {"page": page}, PAYLOAD)
+        _age(cache, {"page": page}, atime=now - 100 + page)
+    assert cache.get("search", {"page": 1}) == PAYLOAD      # 1 is now the most recently used
+
+    cache.put("search", {"page": 4}, PAYLOAD)               # over budget: evict down to 90%
+    kept = {page for page in (1, 2, 3, 4) if cache._path(cache.key("search", {"page": page})).exists()}
+    assert kept == {1, 3, 4}
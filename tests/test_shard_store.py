@@ -0,0 +1,67 @@
+from __future__ import annotations
+import tarfile
+from pathlib import Path
+
+from flickr_grid_downloader.utils.shard_store import INDEX_NAME, ShardReader, ShardWriter
+
+
+def _image(tmp_path: Path, name: str, size: int) -> Path:
+    path = tmp_path / "img" / name
+    path.parent.mkdir(exist_ok=True)
+    path.write_bytes(bytes(i % 251 for i in range(size)))
+    return path
+
+
+def test_offsets_point_at_the_member_bytes(tmp_path: Path):
+    shards = tmp_path / "shards"
+    writer = ShardWriter(shards, "zone", max_bytes=6000)
+    files = {
+        "1": [_image(tmp_path, "zone_a_1.jpg", 700), _image(tmp_path, "zone_a_1_thumb.jpg", 100)],
+        "2": [_image(tmp_path, "zone_a_2.jpg", 2048)],
+        "3": [_image(tmp_path, "zone_b_3.jpg", 3000)],      # does not fit: second shard
+    }
+    for photo_id, paths in files.items():
+        writer.add(photo_id, "a", paths)
+    writer.close()
+    assert sorted(p.name for p in shards.glob("*.tar")) == ["zone-000000.tar", "zone-000001.tar"]
+
+    reader = ShardReader(shards)
+    assert reader.names("1") == ["zone_a_1.jpg", "zone_a_1_thumb.jpg"]
+    for paths in files.values():
+        for path in paths:
+            assert reader.read(path.name) == path.read_bytes()
+    reader.close()
+
+    # The shards are plain tar files
+    with tarfile.open(shards / "zone-000000.tar") as tar:
+        assert tar.getnames() == ["zone_a_1.jpg", "zone_a_1_thumb.jpg", "zone_a_2.jpg"]
+
+
+def test_members_are_indexed_on_flush_and_reopen_starts_a_new_shard(tmp_path: Path):
+    shards = tmp_path / "shards"
+    writer = ShardWriter(shards, "zone")
+    writer.add("1", "a", [_image(tmp_path, "zone_a_1.jpg", 500)])
+    assert writer.has("1")
+    assert ShardReader(shards).members == {}
+    writer.flush()
+    assert list(ShardReader(shards).members) == ["zone_a_1.jpg"]
+    writer.close()
+
+    again = ShardWriter(shards, "zone")
+    assert again.has("1") and not again.has("2")
+    again.add("2", "a", [_image(tmp_path, "zone_a_2.jpg", 500)])
+    again.close()
+    assert (shards / "zone-000001.tar").exists()
+    assert ShardReader(shards).read("zone_a_2.jpg") == (tmp_path / "img" / "zone_a_2.jpg").read_bytes()
+
+
+def test_torn_index_row_is_skipped(tmp_path: Path):
+    shards = tmp_path / "shards"
+    writer = ShardWriter(shards, "zone")
+    writer.add("1", "a", [_image(tmp_path, "zone_a_1.jpg", 500)])
+    writer.close()
+    with (shards / INDEX_NAME).open("a") as f:
+        f.write("zone_a_2.jpg,2,a,zone-0")
+
+    assert list(ShardReader(shards).members) == ["zone_a_1.jpg"]
+    assert not ShardWriter(shards, "zone").has("2")
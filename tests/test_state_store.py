@@ -0,0 +1,94 @@
+from __future__ import annotations
+from pathlib import Path
+
+import pytest
+
+from flickr_grid_downloader.utils.state_store import CsvStateStore, SqliteStateStore, open_state
+
+
+def _photo(box_id: str, photo_id: str) -> list[str]:
+    return [box_id, "1", photo_id, "owner", "secret", "title"]
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def store(request, tmp_path: Path):
+    state = open_state(tmp_path, 2015, 2024, request.param)
+    yield state
+    state.close()
+
+
+def test_cells_resume_and_latest_row_wins(store, tmp_path):
+    store.mark_cell(["a", "10", "True"])
+    store.mark_cell(["b", "3", "False"])
+    assert store.is_cell_done("a") and not store.is_cell_done("c")
+    assert [row[0] for row in store.failed_cells()] == ["a"]
+
+    store.mark_cell(["a", "10", "False"])      # recovered by retry-failed
+    assert store.failed_cells() == []
+
+
+def test_page_checkpoints(store):
+    store.mark_page("a", 1, 3, 100)
+    store.mark_page("a", 2, 3, 100)
+    store.mark_page("b", 1, 1, 7)
+    assert store.fetched_pages("a") == {1: (3, 100), 2: (3, 100)}
+
+    store.clear_pages("a")
+    assert store.fetched_pages("a") == {}
+    assert store.fetched_pages("b") == {1: (1, 7)}
+
+
+def test_upload_marks_latest_wins(store):
+    store.mark_upload("a", 100)
+    store.mark_upload("a", 200)
+    store.mark_upload("b", 50)
+    assert store.upload_marks() == {"a": 200, "b": 50}
+
+
+def test_photos_are_deduplicated_and_pending_skips_downloads(store):
+    store.add_results([_photo("a", "1"), _photo("a", "2")])
+    store.add_results([_photo("b", "2"), _photo("b", "3")])     # photo 2 is in both cells
+    assert store.photo_count() == 3
+    assert [row[2] for _, row in store.photos()] == ["1", "2", "3"]
+    assert len(list(store.results())) == (4 if isinstance(store, CsvStateStore) else 3)   # CSV keeps every hit
+
+    store.mark_downloaded([["2", "a", "downloaded", "True"]])
+    assert [row[2] for _, row in store.pending_photos()] == ["1", "3"]
+    assert "2" in store.downloaded_ids() and "1" not in store.downloaded_ids()
+
+
+def test_csv_state_survives_reopen_and_torn_page_rows(tmp_path):
+    store = CsvStateStore(tmp_path, 2015, 2024)
+    store.mark_cell(["a", "1", "False"])
+    store.mark_page("b", 1, 2, 100)
+    with store.pages_csv.open("a") as f:
+        f.write("b,2,2")                        # torn by a crash
+
+    again = CsvStateStore(tmp_path, 2015, 2024)
+    assert again.is_cell_done("a")
+    assert again.fetched_pages("b") == {1: (2, 100)}
+
+
+def test_sqlite_round_trips_the_csv_layout(tmp_path):
+    source = CsvStateStore(tmp_path / "src", 2015, 2024)
+    source.mark_cell(["a", "2", "False"])
+    source.mark_page("a", 1, 1, 2)
+    source.mark_upload("a", 123)
+    source.add_results([_photo("a", "1"), _photo("a", "2"), _photo("a", "2")])
+    source.mark_downloaded([["1", "a", "downloaded", "True"]])
+
+    db = SqliteStateStore(tmp_path / "state.sqlite")
+    assert db.import_csv(source) == (1, 1, 3, 1)
+    assert db.photo_count() == 2
+    assert db.upload_marks() == {"a": 123}
+
+    target = CsvStateStore(tmp_path / "dst", 2015, 2024)
+    assert db.export_csv(target) == (1, 1, 2, 1)
+    db.close()
+    assert target.fetched_pages("a") == {1: (1, 2)}
+    assert [row[2] for _, row in target.pending_photos()] == ["2"]
+
+
+def test_unknown_backend(tmp_path):
+    with pytest.raises(ValueError, match="Unknown state backend"):
+        open_state(tmp_path, 2015, 2024, "redis")
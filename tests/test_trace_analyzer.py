@@ -0,0 +1,50 @@
+from __future__ import annotations
+import json
+from pathlib import Path
+
+import pytest
+
+from flickr_grid_downloader.tools.trace_analyzer import analyze
+
+
+def _trace(tmp_path: Path, events: list[dict], extra: str = "") -> Path:
+    path = tmp_path / "trace.jsonl"
+    path.write_text("".join(json.dumps(e) + "\n" for e in events) + extra)
+    return path
+
+
+def test_analyze(tmp_path: Path):
+    events = [
+        {"ev": "api", "t": 0.0, "dur": 0.4, "method": "search", "parse": 0.1, "bytes": 1000},
+        {"ev": "api", "t": 1.0, "dur": 0.2, "method": "search", "parse": 0.1, "bytes": 500},
+        {"ev": "page", "t": 1.5, "dur": 0.5, "cell": "a", "photos": 100},
+        {"ev": "page", "t": 2.0, "dur": 0.7, "cell": "a#0.00,0.00", "photos": 50},
+        {"ev": "page", "t": 2.5, "dur": 0.3, "cell": "b@1700000000", "photos": 5},
+        {"ev": "page", "t": 2.6, "dur": 0.1},
+        {"ev": "image", "t": 3.0, "dur": 1.0, "status": "downloaded", "bytes": 4000},
+        {"ev": "image", "t": 3.5, "dur": 2.0, "status": "failed"},
+        {"ev": "write", "t": 4.0, "dur": 0.25, "what": "image"},
+        {"ev": "write", "t": 4.5, "dur": 0.5, "what": "page"},
+    ]
+    summary = analyze(_trace(tmp_path, events, "not json\n{\"t\": 1}\n"))
+
+    assert (summary.events, summary.invalid) == (10, 2)
+    assert summary.wall == 4.5
+    assert (summary.api_bytes, summary.cdn_bytes) == (1500, 4000)
+    assert summary.parsing == pytest.approx(0.2)
+    assert summary.network == pytest.approx(0.4 + 3.0 - 0.25)     # image writes are inside the image events
+    assert summary.disk == pytest.approx(0.75)
+    assert summary.errors == {("image", "failed"): 1}
+
+    assert [(c.cell, c.pages, c.photos) for c in summary.cells] == [("a", 2, 150), ("b", 1, 5), ("?", 1, 0)]
+    assert summary.cells[0].seconds == pytest.approx(1.2)
+    latencies = {lat.name: lat for lat in summary.latencies}
+    assert latencies["api search"].count == 2 and latencies["api search"].p50 == 0.2
+    assert latencies["search page"].max == 0.7
+    assert set(latencies) == {"api search", "search page", "image downloaded", "image failed",
+                              "write image", "write page"}
+
+
+def test_top_cells(tmp_path: Path):
+    events = [{"ev": "page", "t": i, "dur": i, "cell": str(i)} for i in range(5)]
+    assert [c.cell for c in analyze(_trace(tmp_path, events), top=2).cells] == ["4", "3"]
@@ -0,0 +1,89 @@
+from __future__ import annotations
+import time
+from pathlib import Path
+
+import pytest
+
+from flickr_grid_downloader.utils.work_queue import WorkQueue
+
+
+@pytest.fixture
+def queues(tmp_path: Path):
+    """Two workers sharing one queue file."""
+    first = WorkQueue(tmp_path / "queue.sqlite", lease=0.5, max_attempts=2)
+    second = WorkQueue(tmp_path / "queue.sqlite", lease=0.5, max_attempts=2)
+    second.owner += "-b"
+    yield first, second
+    first.close()
+    second.close()
+
+
+def _statuses(queue: WorkQueue) -> dict[str, str]:
+    return {task["stage"]: task["status"] for task in queue.tasks()}
+
+
+def test_images_wait_for_the_grid_task(queues):
+    first, second = queues
+    assert first.enqueue("z", 2015, 2024, ["grid", "images"], {"workers": 2}) == 2
+
+    grid = first.claim()
+    assert (grid.stage, grid.spec, grid.attempts) == ("grid", {"workers": 2}, 1)
+    assert second.claim() is None                   # images waits for the grid task
+    first.complete(grid)
+    assert second.claim().stage == "images"
+
+
+def test_heartbeat_keeps_the_lease_and_expiry_hands_it_over(queues):
+    first, second = queues
+    first.enqueue("z", 2015, 2024, ["grid"], {})
+    task = first.claim()
+    for _ in range(3):
+        time.sleep(0.2)
+        assert first.heartbeat(task)
+        assert second.claim() is None
+
+    time.sleep(0.6)                                # the first worker stalls
+    taken = second.claim()
+    assert taken.id == task.id and taken.attempts == 2
+    assert not first.heartbeat(task)
+    first.complete(task)                            # ignored: not the owner any more
+    assert _statuses(first) == {"grid": "leased"}
+
+
+def test_failed_grid_blocks_images_until_enqueued_again(queues):
+    first, _ = queues
+    first.enqueue("z", 2015, 2024, ["grid", "images"], {})
+    first.fail(first.claim(), "boom")
+    assert _statuses(first) == {"grid": "pending", "images": "pending"}
+    first.fail(first.claim(), "boom")               # second attempt: parked
+    assert _statuses(first) == {"grid": "failed", "images": "blocked"}
+    assert first.counts()["blocked"] == 1
+    assert first.claim() is None
+
+    first.enqueue("z", 2015, 2024, ["grid"], {})
+    assert _statuses(first) == {"grid": "pending", "images": "pending"}
+
+
+def test_expired_lease_out_of_attempts_is_parked(queues):
+    first, second = queues
+    first.enqueue("z", 2015, 2024, ["grid", "images"], {})
+    first.claim()
+    time.sleep(0.6)
+    second.claim()
+    time.sleep(0.6)
+    assert second.claim() is None
+    assert _statuses(first) == {"grid": "failed", "images": "blocked"}
+
+
+def test_release_does_not_count_the_attempt(queues):
+    first, _ = queues
+    first.enqueue("z", 2015, 2024, ["grid"], {})
+    first.release(first.claim())
+    assert first.claim().attempts == 1
+
+
+def test_unknown_stage_is_rejected(queues):
+    first, _ = queues
+    with pytest.raises(ValueError, match="Unknown stage"):
+        first.enqueue("z", 2015, 2024, ["grid", "thumbs"], {})
+    assert first.tasks() == []